@@ -1,13 +1,16 @@
+import numpy as np
 from arcade import (
     Sprite, draw_arc_filled, draw_scaled_texture_rectangle, load_texture, draw_rectangle_filled
 )
 from arcade.color import RED, GREEN
-from copy import deepcopy
 from constants import ASSETS, CELL_SIZE, CHIN_HEIGHT, MAP_TARGET_J, MAP_WIDTH, PROJECTILES, TRANSPARENT_BLACK
-from explosions import MjolnirExplosion
-from grid import nearest_cell_ij, cell_centerxy
-from pathfind import find_path
+from explosions import MjolnirExplosion, ExplosionTemplate
+from grid import TerrainMap, GROUND, SHALLOW, nearest_cell_ij, cell_centerxy
+from pathfind import find_blocking_cells
 from towers import Projectile
+from utils import GameContext
+
+MJOLNIR_IMPACT = ExplosionTemplate(MjolnirExplosion)
 
 class Ability():
     def __init__(self, name: str, icon_file: str, preview_image_file: str, 
@@ -57,20 +60,22 @@ class SellTowerAbility(Ability):
        
     def trigger(self, x, y):
         # sell tower ability can't actually handle its own trigger actions. 
-        # GameWindow.attempt_tower_sell() needs to be called instead...
+        # Simulation.sell_tower() needs to be called instead...
         return super().trigger(x, y)
         
 class MjolnirAbility(Ability):
-    def __init__(self) -> None:
+    def __init__(self, context: GameContext) -> None:
         super().__init__(name='mjolnir', icon_file='./images/mjolnir-icon.png', 
                          preview_image_file='./images/mjolnir-preview.png', 
                          cooldown = 120.0, range = 3.0*CELL_SIZE)
+        self.context = context # the hammer is a projectile of this game
         
     def trigger(self, x, y):
-        mjolnir = Projectile(
+        mjolnir = Projectile.make(
+            self.context,
             texture=PROJECTILES['mjolnir'], 
             scale=1.0,
-            speed=6.0,
+            speed=360,
             center_x=MAP_WIDTH+10,
             center_y=CHIN_HEIGHT-10,
             angle_rate=-1.5*360,
@@ -79,25 +84,24 @@ class MjolnirAbility(Ability):
             damage=100,
             do_splash_damage=True,
             splash_radius=self.range,
-            impact_effect=MjolnirExplosion()
+            impact_effect=MJOLNIR_IMPACT
         )
         super().trigger(x, y)
         return mjolnir
 
 
 class PlatformAbility(Ability):
-    def __init__(self, map_reference: list = None) -> None:
+    def __init__(self, map_reference: TerrainMap = None) -> None:
         super().__init__(name='platform', icon_file='./images/platform-icon.png', 
                          preview_image_file='./images/platform.png', 
                          cooldown = 90.0, range = 0.1)
         self.map = map_reference
-        self.safe_cell_tuples = []
-        self.unsafe_cell_tuples = []
+        self.blocking_cells = None # cells where a platform would cut enemies off from the exit
         
     def preview(self, x, y):
         i, j = nearest_cell_ij(x, y)
         cx, cy = cell_centerxy(i, j)
-        can_be_placed = (self.map[i][j].terrain_type == "shallow") and not(self.placement_would_block_path(i,j))
+        can_be_placed = (self.map.terrain[i, j] == SHALLOW) and not(self.placement_would_block_path(i,j))
         color = GREEN if can_be_placed else RED
         draw_rectangle_filled(cx, cy, 36, 36, color)
         draw_scaled_texture_rectangle(cx, cy, texture=ASSETS["platform"])
@@ -105,10 +109,10 @@ class PlatformAbility(Ability):
     def trigger(self, x, y):
         i, j = nearest_cell_ij(x, y)
         cx, cy = cell_centerxy(i, j)
-        can_be_placed = (self.map[i][j].terrain_type == "shallow") and not(self.placement_would_block_path(i,j))
+        can_be_placed = (self.map.terrain[i, j] == SHALLOW) and not(self.placement_would_block_path(i,j))
         if can_be_placed:
-            self.map[i][j].terrain_type = "ground"
-            self.safe_cell_tuples = []
+            self.map.terrain[i, j] = GROUND
+            self.blocking_cells = None
             super().trigger(x, y)
             return Sprite(center_x=cx, center_y=cy, texture=ASSETS["platform"])
         
@@ -117,39 +121,16 @@ class PlatformAbility(Ability):
         if i==0:
             return True
         
-        # See if we've already tested this cell
-        if (i,j) in self.safe_cell_tuples:
-            return False
-        if (i,j) in self.unsafe_cell_tuples:
-            return True
-        
-        # form a list of test cases / test cells where enemies could spawn
-        all_spawn_cells_js = []
-        for test_j in range(len(self.map[0])):
-            if self.map[0][test_j] == "shallow" or self.map[0][test_j] == "deep":
-                all_spawn_cells_js.append(test_j)
-        minimal_spawn_js = []
-        for test_j in all_spawn_cells_js:
-            if not (test_j+1 in all_spawn_cells_js):
-                minimal_spawn_js.append(test_j)
-
-        hypothetical_map = deepcopy(self.map)
-        hypothetical_map[i][j].terrain_type = "ground"
-
-        # test route from each individual spawn cell
-        for spawn_j in minimal_spawn_js:
-            try:
-                find_path(
-                    start_cell=(0, spawn_j), 
-                    target_cell=(15, MAP_TARGET_J),
-                    map=hypothetical_map
-                )
-            except ArithmeticError:
-                self.unsafe_cell_tuples.append((i,j))
-                return True
-        # if we get to this point, then even with this cell added, all enemies would still have a valid path
-        self.safe_cell_tuples.append((i,j))
-        return False
+        # the set of blocking cells only changes with the terrain, so it is computed once after 
+        # each platform placement and then re-used by every preview
+        if self.blocking_cells is None:
+            spawn_cells = [(0, test_j) for test_j in np.flatnonzero(self.map.terrain[0] != GROUND).tolist()]
+            self.blocking_cells = find_blocking_cells(
+                map=self.map, 
+                target_cell=(15, MAP_TARGET_J), 
+                source_cells=spawn_cells
+            )
+        return (i,j) in self.blocking_cells
 
 
 class CommandAbility(Ability):
@@ -0,0 +1,157 @@
+"""Plays a campaign map many times without a window, with a fixed tower layout, to see how hard
+a range of waves is. Each game gets its own seed, and games run in parallel on a process pool.
+Example, from the game folder :
+    python balance.py 2 "Watchtower@3,6; Catapult@4,5+kenaz" --waves 1-10 --runs 200
+Towers are placed on cell (i, j), i being the row (counted from the top) and j the column, 2x2
+buildings on their top left cell. A layout can also be a text file with one tower per line."""
+import argparse
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from grid import cell_centerxy
+from simulation import Simulation
+import glb
+
+
+def parse_layout(spec: str) -> list:
+    """Turns "name@i,j+rune; ..." (or a file with one of those per line) into a list of
+    (tower name, i, j, rune name or None)"""
+    if os.path.isfile(spec):
+        with open(spec) as layout_file:
+            entries = layout_file.read().splitlines()
+    else:
+        entries = spec.split(';')
+    layout = []
+    for entry in entries:
+        entry = entry.split('#')[0].strip()
+        if not entry:
+            continue
+        try:
+            name, cell = entry.split('@')
+            rune_name = None
+            if '+' in cell:
+                cell, rune_name = cell.split('+')
+                rune_name = rune_name.strip().lower()
+            i, j = [int(k) for k in cell.split(',')]
+        except ValueError:
+            raise ValueError(f"Can't read '{entry}', towers should look like 'Watchtower@3,4' or 'Catapult@5,6+kenaz'")
+        layout.append((name.strip(), i, j, rune_name))
+    return layout
+
+
+def build_layout(sim: Simulation, layout: list) -> list:
+    """Buys and places every tower of the layout, returns the towers in the same order"""
+    shop_items = {item.tower.name.lower(): item for shop_list in sim.shop_listlist for item in shop_list}
+    runes = {rune.name: rune for rune in sim.runes_list}
+    towers = []
+    for (name, i, j, rune_name) in layout:
+        shop_item = shop_items.get(name.lower())
+        if shop_item is None:
+            raise ValueError(f"Unknown tower '{name}', pick one of : " +
+                             ', '.join(item.tower.name for shop_list in sim.shop_listlist for item in shop_list))
+        if sim.money < shop_item.cost:
+            raise ValueError(f"Not enough money for {name} at ({i}, {j}), try a larger --money")
+        tower = sim.place_tower(shop_item, *cell_centerxy(i, j))
+        if tower is None:
+            raise ValueError(f"Can't build {name} at ({i}, {j})")
+        if rune_name:
+            if rune_name not in runes:
+                raise ValueError(f"Unknown rune '{rune_name}', pick one of : " + ', '.join(runes))
+            if tower.is_2x2:
+                raise ValueError(f"{name} at ({i}, {j}) can't be enchanted")
+            if sim.money < runes[rune_name].cost:
+                raise ValueError(f"Not enough money for {rune_name} on {name} at ({i}, {j}), try a larger --money")
+            sim.enchant_tower(runes[rune_name], tower.center_x, tower.center_y)
+        towers.append(tower)
+    return towers
+
+
+def play_game(map_number: int, layout: list, first_wave: int, last_wave: int, money: float, seed: int) -> dict:
+    """Plays waves first_wave to last_wave (counted from 1) of a campaign map with the given
+    layout, until they are all over or the village is lost. Each wave starts as soon as the
+    previous one is over. Runs in the worker processes."""
+    glb.MUTED = True
+    sim = Simulation(map_number=map_number, seed=seed)
+    if money is not None:
+        sim.money = money
+    if first_wave > len(sim.wave_list):
+        raise ValueError(f"Map {map_number} only has {len(sim.wave_list)} waves")
+    towers = build_layout(sim, layout)
+    last_wave = min(last_wave, len(sim.wave_list))
+    sim.wave_number = first_wave - 1 # the earlier waves never happen
+    while sim.outcome != 'lost' and (sim.wave_is_happening or sim.wave_number < last_wave):
+        if not sim.wave_is_happening:
+            # nothing happens between waves, so start the next one right away like a player can
+            sim.start_wave()
+        sim.step()
+    return {
+        'seed': seed,
+        'lost': sim.outcome == 'lost',
+        # the wave the village fell on doesn't count as cleared
+        'waves cleared': sim.wave_number - first_wave + (not sim.wave_is_happening and sim.outcome != 'lost'),
+        'population lost': 10 - max(sim.population, 0), # several enemies can get through on the last step
+        'money': sim.money,
+        'tower damage': [sim.damage_dealt.get(tower, 0) for tower in towers],
+        'burning damage': sim.damage_dealt.get(None, 0),
+    }
+
+
+def summary_line(label: str, values: list) -> str:
+    values = np.array(values, dtype=float)
+    p10, median, p90 = np.percentile(values, [10, 50, 90])
+    return (f"{label:<28}{values.mean():>10.1f}{values.min():>10.1f}{p10:>10.1f}"
+            f"{median:>10.1f}{p90:>10.1f}{values.max():>10.1f}")
+
+
+def print_report(results: list, layout: list):
+    n_lost = sum(result['lost'] for result in results)
+    print(f"{len(results)} games, village lost in {n_lost} ({100*n_lost/len(results):.1f}%)")
+    print(f"{'':<28}{'mean':>10}{'min':>10}{'10%':>10}{'median':>10}{'90%':>10}{'max':>10}")
+    print(summary_line('waves cleared', [result['waves cleared'] for result in results]))
+    print(summary_line('population lost', [result['population lost'] for result in results]))
+    print(summary_line('money', [result['money'] for result in results]))
+    print('damage dealt :')
+    for k, (name, i, j, rune_name) in enumerate(layout):
+        label = f"  {name} ({i},{j})" + (f" +{rune_name}" if rune_name else '')
+        print(summary_line(label, [result['tower damage'][k] for result in results]))
+    print(summary_line('  burning', [result['burning damage'] for result in results]))
+
+
+def parse_wave_range(text: str) -> tuple:
+    first, _, last = text.partition('-')
+    first = int(first)
+    last = int(last) if last else first
+    if not (1 <= first <= last):
+        raise argparse.ArgumentTypeError(f"'{text}' is not a wave range like 3-8")
+    return first, last
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plays a campaign map many times with a fixed tower layout, "
+                                                 "and sums up how it went.")
+    parser.add_argument('map_number', type=int, help="campaign map, 1 to 5")
+    parser.add_argument('layout', help="towers to build, like 'Watchtower@3,4; Catapult@5,6+kenaz', "
+                                       "or a text file with one tower per line")
+    parser.add_argument('--waves', type=parse_wave_range, default=(1, 10**6),
+                        help="first and last wave to play, like 3-8 (default : all of them)")
+    parser.add_argument('--runs', type=int, default=100, help="number of games (default : 100)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game, the next ones count up from there")
+    parser.add_argument('--money', type=float, default=None,
+                        help="money before buying the layout (default : what a new game starts with)")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default : one per CPU)")
+    args = parser.parse_args()
+    if not os.path.isfile("./files/map"+str(args.map_number)+".txt"):
+        parser.error(f"There is no map {args.map_number}, campaign maps go from 1 to 5")
+
+    first_wave, last_wave = args.waves
+    seeds = range(args.seed, args.seed + args.runs)
+    try:
+        layout = parse_layout(args.layout)
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(
+                play_game, [args.map_number]*args.runs, [layout]*args.runs, [first_wave]*args.runs,
+                [last_wave]*args.runs, [args.money]*args.runs, seeds
+            ))
+    except ValueError as error: # a bad layout fails the same way in every game
+        parser.error(str(error))
+    print_report(results, layout)
@@ -25,6 +25,10 @@ LEVEL_WIDTH = (SCREEN_WIDTH - 6*LEVEL_SPACING)/5
 MAP_TARGET_J = 7
 HBAR_HEIGHT = 4
 HBAR_WIDTH_FACTOR = 1.0
+SIM_TIME_STEP = 1/60 # game time simulated by each Simulation.step(), in seconds
+MAX_STEPS_PER_FRAME = 4 # slower frames than that slow the game down instead of catching up
+GAME_SPEEDS = [1, 2, 4, 8] # fast forward settings
+SIM_TIME_BUDGET = 0.012 # real time the simulation may use per frame, in seconds
 
 TRANSPARENT_BLACK = make_transparent_color(BLACK, transparency=180)
 
@@ -1,8 +1,12 @@
-from arcade import Sprite, Texture
-from random import randint
+from arcade import Sprite, SpriteList, Texture
+from copy import copy
+from heapq import heappush, heappop
+from random import Random
 from constants import EFFECTS
 
 class Effect(Sprite):
+    has_random_angle = False # drawn by TimedEffects when the effect is inflicted
+
     def __init__(self, name, texture: Texture = None, damage_per_second: float = 0, 
                  speed_multiplier: float = 1, duration: float = 3, 
                  angle_rate: float=720, angle: float=0):
@@ -13,11 +17,10 @@ class Effect(Sprite):
         self.angle_rate = angle_rate
         self.duration = duration
         self.duration_remaining = duration
-
-    def on_update(self, delta_time: float = 1 / 60):
-        self.duration_remaining -= delta_time
-        self.angle += self.angle_rate*delta_time
-        return super().on_update(delta_time)
+        self.target = None # the enemy this effect is on
+        self.started_at = 0.0 # TimedEffects clock times
+        self.expires_at = 0.0
+        self.start_angle = angle
 
 
 class SlowDown(Effect):
@@ -33,6 +36,109 @@ class Inflame(Effect):
 
 
 class Freeze(Effect):
+    has_random_angle = True
+
     def __init__(self):
         super().__init__(name='freeze', texture=EFFECTS['freeze'], 
-                         speed_multiplier=0, duration=3, angle_rate=0, angle=randint(0, 359))
+                         speed_multiplier=0, duration=3, angle_rate=0)
+
+
+class EffectTemplate():
+    """Read-only description of an Effect, shared by every projectile, rune or particle that 
+    can inflict it. The Effect sprite itself is only built by make(), when a hit actually adds
+    the effect to an enemy."""
+    def __init__(self, effect_class, duration_factor: float = 1.0):
+        prototype = effect_class()
+        self.effect_class = effect_class
+        self.name = prototype.name
+        self.duration = prototype.duration
+        self.duration_factor = duration_factor # the new Effect only lasts this fraction of duration
+
+    def scaled(self, factor: float):
+        """Returns a template of the same effect, lasting factor times as long"""
+        template = copy(self)
+        template.duration_factor *= factor
+        return template
+
+    def make(self) -> Effect:
+        effect = self.effect_class()
+        effect.duration_remaining = self.duration*self.duration_factor
+        return effect
+
+
+SLOWDOWN = EffectTemplate(SlowDown)
+INFLAME = EffectTemplate(Inflame)
+FREEZE = EffectTemplate(Freeze)
+
+
+class TimedEffects():
+    """Every effect currently on an enemy. Expiry times are kept in a min-heap, so only the 
+    effects that actually expire are looked at on each update. The combined speed multiplier
+    and damage per second of each enemy's effects are cached in its EnemyTable slot, and only 
+    recomputed when one of its effects is added or expires."""
+    def __init__(self, enemy_table, rng: Random):
+        self.enemy_table = enemy_table
+        self.rng = rng # for the look of new effects
+        self.time = 0.0
+        self.expiries = [] # (expires_at, serial, effect), entries outdated by a refresh are skipped
+        self.serial = 0
+        self.sprite_list = SpriteList()
+
+    def inflict(self, enemy, template: EffectTemplate) -> Effect:
+        """Attempts to set the effect described by template on the enemy. Returns the new Effect
+        sprite only if the effect was added and was not already present, None otherwise."""
+        if enemy.resists(template):
+            return None
+        # an effect that is already present only lasts longer
+        for eff in enemy.effects:
+            if eff.name == template.name:
+                self.schedule(eff, self.time + template.duration)
+                return None
+
+        effect = template.make()
+        if effect.has_random_angle:
+            effect.start_angle = self.rng.randint(0, 359)
+        effect.scale = 1.2*max(enemy.width, enemy.height)/50
+        effect.target = enemy
+        effect.started_at = self.time
+        enemy.effects.append(effect)
+        self.sprite_list.append(effect)
+        self.schedule(effect, self.time + effect.duration_remaining)
+        self.update_enemy(enemy)
+        return effect # 1 new effect added
+
+    def schedule(self, effect: Effect, expires_at: float):
+        effect.expires_at = expires_at
+        self.serial += 1
+        heappush(self.expiries, (expires_at, self.serial, effect))
+
+    def update_enemy(self, enemy):
+        """Recomputes the cached totals of the enemy's effects"""
+        if enemy.table is None:
+            return
+        speed_multiplier = 1.0
+        damage_per_second = 0.0
+        for eff in enemy.effects:
+            speed_multiplier *= eff.speed_multiplier
+            damage_per_second += eff.damage_per_second
+        enemy.table.speed_multiplier[enemy.slot] = speed_multiplier
+        enemy.table.damage_per_second[enemy.slot] = damage_per_second
+
+    def on_update(self, delta_time: float = 1/60):
+        self.time += delta_time
+        while self.expiries and self.expiries[0][0] <= self.time:
+            expires_at, serial, effect = heappop(self.expiries)
+            if expires_at != effect.expires_at or effect.target is None:
+                continue # refreshed since, or its enemy is gone
+            enemy = effect.target
+            effect.target = None
+            enemy.effects.remove(effect)
+            effect.remove_from_sprite_lists()
+            self.update_enemy(enemy)
+
+    def draw(self):
+        """Moves the effect sprites onto their enemies and spins them, then draws them"""
+        for effect in self.sprite_list.sprite_list:
+            effect.position = effect.target.position
+            effect.angle = effect.start_angle + effect.angle_rate*(self.time - effect.started_at)
+        self.sprite_list.draw()
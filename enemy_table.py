@@ -0,0 +1,274 @@
+import numpy as np
+from constants import CELL_SIZE, SCREEN_HEIGHT
+from grid import cell_centerxy
+
+class TableColumn():
+    """Enemy attribute that lives in the EnemyTable array of the same name while the enemy is in
+    a table, and in the enemy itself before it spawns and after it dies or leaves the map"""
+    def __init__(self, column: str):
+        self.column = column
+        self.private_name = '_' + column
+
+    def __get__(self, enemy, owner=None):
+        if enemy is None:
+            return self
+        if enemy.table is None:
+            return enemy.__dict__[self.private_name]
+        return getattr(enemy.table, self.column).item(enemy.slot)
+
+    def __set__(self, enemy, value):
+        if enemy.table is None:
+            enemy.__dict__[self.private_name] = value
+        else:
+            getattr(enemy.table, self.column)[enemy.slot] = value
+
+
+class EnemyTable():
+    """Movement and bookkeeping state of every enemy on the map, kept in NumPy arrays indexed by
+    a slot id that an enemy keeps for as long as it is in the table. Movement, regeneration,
+    slowdowns and targeting priority are computed for all enemies at once in on_update(), and
+    positions and angles are then copied back into the sprites. Enemy attributes declared as
+    TableColumn read and write these arrays directly."""
+    # enemy attributes mirrored by a column of the same name
+    COLUMNS = ['current_health', 'max_health', 'regen_rate', 'speed', 'priority', 'is_hidden']
+    FLOATING_COLUMNS = ['steps_left', 'route_steps', 'flow_field_version']
+
+    def __init__(self, deep_water: np.ndarray = None, capacity: int = 64):
+        self.deep_water = deep_water # deep_water[i,j] is True if map cell (i,j) is deep water
+        self.capacity = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.vx = np.zeros(0) # velocity in pixels per second, slowdowns included
+        self.vy = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.speed_multiplier = np.zeros(0) # from effects, kept up to date by TimedEffects
+        self.damage_per_second = np.zeros(0)
+        self.angle = np.zeros(0)
+        self.hit_box_x = np.zeros((0, 8)) # hit box points before rotation, scale included
+        self.hit_box_y = np.zeros((0, 8))
+        self.current_health = np.zeros(0)
+        self.max_health = np.zeros(0)
+        self.regen_rate = np.zeros(0)
+        self.priority = np.zeros(0)
+        self.is_hidden = np.zeros(0, dtype=bool)
+        self.can_hide = np.zeros(0, dtype=bool)
+        self.nearest_i = np.zeros(0, dtype=np.int32) # nearest cell when hiding was last checked
+        self.nearest_j = np.zeros(0, dtype=np.int32)
+        self.is_floating = np.zeros(0, dtype=bool)
+        # floating enemies only : where they are on their path
+        self.steps_left = np.zeros(0, dtype=np.int32)
+        self.route_steps = np.zeros(0, dtype=np.int32) # steps_left when the route started
+        self.flow_field_version = np.zeros(0, dtype=np.int32)
+        self.current_i = np.zeros(0, dtype=np.int32) # last cell fully inside of, -1 if none
+        self.current_j = np.zeros(0, dtype=np.int32)
+        self.has_target = np.zeros(0, dtype=bool)
+        self.target_x = np.zeros(0) # center of the next cell on the path
+        self.target_y = np.zeros(0)
+        self.wander_r = np.zeros(0)
+        self.wander_theta0 = np.zeros(0)
+        self.wander_omega = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)
+        self.enemies = []
+        self.free_slots = []
+        self.flow_field = None # shared by all floating enemies
+        self.grow(capacity)
+
+    def grow(self, new_capacity: int):
+        """Makes room for more enemies, keeping the existing ones in their slots"""
+        added = new_capacity - self.capacity
+        for name in ['x', 'y', 'vx', 'vy', 'speed', 'speed_multiplier', 'damage_per_second', 'angle',
+                     'hit_box_x', 'hit_box_y', 'current_health', 'max_health', 'regen_rate', 'priority',
+                     'is_hidden', 'can_hide', 'nearest_i', 'nearest_j', 'is_floating', 'steps_left', 'route_steps', 'flow_field_version', 'current_i',
+                     'current_j', 'has_target', 'target_x', 'target_y', 'wander_r', 'wander_theta0',
+                     'wander_omega', 'active']:
+            old_array = getattr(self, name)
+            new_rows = np.zeros((added,) + old_array.shape[1:], dtype=old_array.dtype)
+            setattr(self, name, np.concatenate([old_array, new_rows]))
+        self.enemies += [None] * added
+        # new slots are handed out lowest first
+        self.free_slots = list(range(new_capacity-1, self.capacity-1, -1)) + self.free_slots
+        self.capacity = new_capacity
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def add(self, enemy):
+        """Gives the enemy a slot and moves its state into the table"""
+        if not self.free_slots:
+            self.grow(2*self.capacity)
+        k = self.free_slots.pop()
+        for name in self.COLUMNS:
+            getattr(self, name)[k] = getattr(enemy, name)
+        self.x[k] = enemy.center_x
+        self.y[k] = enemy.center_y
+        self.vx[k], self.vy[k] = enemy.velocity
+        self.speed_multiplier[k] = 1
+        self.damage_per_second[k] = 0
+        self.angle[k] = enemy.angle
+        hit_box = enemy.get_hit_box()
+        if len(hit_box) > self.hit_box_x.shape[1]:
+            # more points than any hit box so far, repeat the first point to make room
+            missing = len(hit_box) - self.hit_box_x.shape[1]
+            self.hit_box_x = np.hstack([self.hit_box_x] + missing*[self.hit_box_x[:, :1]])
+            self.hit_box_y = np.hstack([self.hit_box_y] + missing*[self.hit_box_y[:, :1]])
+        # shorter hit boxes repeat their last point
+        padding = [hit_box[-1]]*(self.hit_box_x.shape[1] - len(hit_box))
+        self.hit_box_x[k] = [point[0]*enemy.scale for point in list(hit_box) + padding]
+        self.hit_box_y[k] = [point[1]*enemy.scale for point in list(hit_box) + padding]
+        self.is_floating[k] = not enemy.is_flying
+        self.can_hide[k] = enemy.can_hide
+        self.nearest_i[k], self.nearest_j[k] = -1, -1 # check as soon as it moves
+        if not enemy.is_flying:
+            for name in self.FLOATING_COLUMNS:
+                getattr(self, name)[k] = getattr(enemy, name)
+            self.flow_field = enemy.flow_field
+            self.wander_r[k] = enemy.wander_r
+            self.wander_theta0[k] = enemy.wander_theta0
+            self.wander_omega[k] = enemy.wander_omega
+            self.read_route(k, enemy)
+        self.active[k] = True
+        self.enemies[k] = enemy
+        enemy.table = self
+        enemy.slot = k
+
+    def remove(self, enemy):
+        """Frees the enemy's slot, its state goes back into the enemy itself"""
+        k = enemy.slot
+        names = self.COLUMNS if enemy.is_flying else self.COLUMNS + self.FLOATING_COLUMNS
+        values = [(name, getattr(enemy, name)) for name in names]
+        velocity = (self.vx.item(k), self.vy.item(k))
+        enemy.table = None
+        enemy.slot = -1
+        for name, value in values:
+            setattr(enemy, name, value)
+        enemy.velocity = velocity
+        self.active[k] = False
+        self.enemies[k] = None
+        self.free_slots.append(k)
+
+    def read_route(self, k: int, enemy):
+        """Copies a floating enemy's current and target cells into slot k"""
+        if enemy.current_cell is None:
+            self.current_i[k], self.current_j[k] = -1, -1
+        else:
+            self.current_i[k], self.current_j[k] = enemy.current_cell
+        if enemy.target_cell is None:
+            self.has_target[k] = False
+        else:
+            self.has_target[k] = True
+            self.target_x[k], self.target_y[k] = cell_centerxy(*enemy.target_cell)
+
+    def on_update(self, delta_time: float = 1/60):
+        live = np.flatnonzero(self.active)
+        if len(live) == 0:
+            return
+        # move, with the velocity computed last frame
+        x = self.x[live] + self.vx[live]*delta_time
+        y = self.y[live] + self.vy[live]*delta_time
+        self.x[live] = x
+        self.y[live] = y
+
+        if self.deep_water is not None:
+            self.update_hiding(live, x, y)
+
+        # regeneration
+        health = self.current_health[live] + self.regen_rate[live]*delta_time
+        self.current_health[live] = np.minimum(health, self.max_health[live])
+
+        # flying enemies head straight down
+        speed = self.speed[live]
+        heading_x = np.zeros(len(live))
+        heading_y = -speed.copy()
+        steps_left = np.where(self.is_floating[live], self.steps_left[live], 0)
+
+        floating = self.is_floating[live]
+        if floating.any():
+            self.update_routes(live[floating], x[floating], y[floating])
+            floaters = live[floating]
+            fx = x[floating]
+            fy = y[floating]
+            steps = self.steps_left[floaters]
+            steps_left[floating] = steps
+            # aim for the next cell's center, with a bit of wobble around it that changes with
+            # the index of that cell on the route
+            step_index = self.route_steps[floaters] - steps
+            wobble = self.wander_theta0[floaters] + step_index*self.wander_omega[floaters]
+            has_target = self.has_target[floaters]
+            target_x = np.where(has_target, self.target_x[floaters] + self.wander_r[floaters]*np.cos(wobble), fx)
+            target_y = np.where(has_target, self.target_y[floaters] + self.wander_r[floaters]*np.sin(wobble), fy-200)
+            # steer : blend the direction to the target into the current velocity
+            floater_speed = speed[floating]
+            dx = target_x - fx
+            dy = target_y - fy
+            norm = np.maximum(np.sqrt(dx*dx + dy*dy), 0.001)
+            new_vx = 0.15*floater_speed*dx/norm + 0.85*self.vx[floaters]
+            new_vy = 0.15*floater_speed*dy/norm + 0.85*self.vy[floaters]
+            norm = np.maximum(np.sqrt(new_vx*new_vx + new_vy*new_vy), 0.001)
+            heading_x[floating] = floater_speed*new_vx/norm
+            heading_y[floating] = floater_speed*new_vy/norm
+        # slowdowns from the effects currently on each enemy
+        multiplier = self.speed_multiplier[live]
+        self.vx[live] = heading_x*multiplier
+        self.vy[live] = heading_y*multiplier
+
+        # Priority mostly depends on how many steps are left on the path to the exit, and towers
+        # shoot the lowest priority first. Priority millions only change through the Command ability.
+        millions = np.round(self.priority[live]/1000000)
+        self.priority[live] = y + 1000*steps_left + millions*1000000
+
+        # write back what the sprites need to be drawn and collided with
+        angles = np.degrees(np.arctan2(heading_y, heading_x))
+        self.angle[live[floating]] = angles[floating]
+        for k, sprite_x, sprite_y, is_floating, angle in zip(live.tolist(), x.tolist(), y.tolist(),
+                                                             floating.tolist(), angles.tolist()):
+            enemy = self.enemies[k]
+            enemy.position = (sprite_x, sprite_y)
+            if is_floating:
+                enemy.angle = angle
+
+    def update_hiding(self, live: np.ndarray, x: np.ndarray, y: np.ndarray):
+        """Hides the enemies that can, when they move over deep water, and unhides them when they
+        leave it. Only enemies that just moved to another cell are looked at."""
+        can_hide = self.can_hide[live]
+        if not can_hide.any():
+            return
+        hiders = live[can_hide]
+        # same as grid.nearest_cell_ij, for all of them at once
+        j = np.clip(x[can_hide] // CELL_SIZE, 0, 14).astype(np.int32)
+        i = np.clip((SCREEN_HEIGHT - y[can_hide]) // CELL_SIZE, 0, 14).astype(np.int32)
+        moved = (i != self.nearest_i[hiders]) | (j != self.nearest_j[hiders])
+        if not moved.any():
+            return
+        movers = hiders[moved]
+        self.nearest_i[movers] = i[moved]
+        self.nearest_j[movers] = j[moved]
+        over_deep_water = self.deep_water[i[moved], j[moved]]
+        for k in movers[over_deep_water != self.is_hidden[movers]].tolist():
+            enemy = self.enemies[k]
+            if enemy.is_hidden:
+                enemy.unhide()
+            else:
+                enemy.hide()
+
+    def update_routes(self, floaters: np.ndarray, x: np.ndarray, y: np.ndarray):
+        """Finds the floating enemies that entered a new cell (or whose flow field changed), and
+        lets only those read the flow field"""
+        # same as grid.containing_cell_ij, for all floaters at once
+        j = (x // CELL_SIZE).astype(np.int32)
+        reverse_y = SCREEN_HEIGHT - y
+        i = (reverse_y // CELL_SIZE).astype(np.int32)
+        offset_from_top = reverse_y - i*CELL_SIZE
+        inside = ((i >= 0) & (j >= 0) & (i <= 14) & (j <= 14) & (x - j*CELL_SIZE < CELL_SIZE-1)
+                  & (offset_from_top > 0) & (offset_from_top <= CELL_SIZE-1))
+        entered = inside & ((i != self.current_i[floaters]) | (j != self.current_j[floaters]))
+        stale = self.flow_field_version[floaters] != self.flow_field.version
+        for m in np.flatnonzero(entered | stale).tolist():
+            k = floaters[m]
+            enemy = self.enemies[k]
+            if stale[m]:
+                # the terrain changed since we last looked, start over from where we are
+                enemy.position = (x.item(m), y.item(m))
+                enemy.follow_flow_field(self.flow_field)
+            else:
+                enemy.enter_cell(int(i[m]), int(j[m]))
+            self.read_route(k, enemy)
@@ -1,19 +1,99 @@
+import numpy as np
 from arcade import Sprite
 from arcade.color import BRONZE as bronze, BLUE as blue, DARK_BLUE as dark_blue, HOT_PINK as pink
 from constants import CELL_SIZE, SCREEN_HEIGHT
 
+# terrain types, as stored in a TerrainMap
+GROUND = 0
+SHALLOW = 1
+DEEP = 2
+TERRAIN_NAMES = ["ground", "shallow", "deep"]
+TERRAIN_CODES = {"g": GROUND, "ground": GROUND, "s": SHALLOW, "shallow": SHALLOW, 
+                 "d": DEEP, "deep": DEEP}
+
+def terrain_code(terrain_type: str = None) -> int:
+    if terrain_type is None:
+        return GROUND
+    if terrain_type not in TERRAIN_CODES:
+        raise ValueError("invalid terrain type: " + terrain_type)
+    return TERRAIN_CODES[terrain_type]
+
+
+class TerrainMap():
+    """The map's terrain, one uint8 per cell (GROUND, SHALLOW or DEEP), and which cells are 
+    occupied by a tower, one bool per cell. Both are NumPy arrays indexed by [i, j], so copies
+    are cheap and lookups compare small integers. map[i][j] gives a GridCell view of one cell
+    for code that works cell by cell."""
+    def __init__(self, terrain: np.ndarray, occupied: np.ndarray = None) -> None:
+        self.terrain = terrain
+        if occupied is None:
+            occupied = np.zeros(terrain.shape, dtype=bool)
+        self.occupied = occupied
+
+    @classmethod
+    def from_rows(cls, rows: list):
+        """Builds the map from rows of terrain letters or names"""
+        return cls(np.array([[terrain_code(t) for t in row] for row in rows], dtype=np.uint8))
+
+    def copy(self):
+        return TerrainMap(self.terrain.copy(), self.occupied.copy())
+
+    def __len__(self):
+        return self.terrain.shape[0]
+
+    def __getitem__(self, i: int):
+        return GridRow(self, i)
+
+    def __iter__(self):
+        return (GridRow(self, i) for i in range(len(self)))
+
+
+class GridRow():
+    """View of row i of a TerrainMap, so that map[i][j] keeps working"""
+    __slots__ = ['map', 'i']
+
+    def __init__(self, map: TerrainMap, i: int) -> None:
+        self.map = map
+        self.i = i
+
+    def __len__(self):
+        return self.map.terrain.shape[1]
+
+    def __getitem__(self, j: int):
+        return GridCell(self.map, self.i, j)
+
+    def __iter__(self):
+        return (GridCell(self.map, self.i, j) for j in range(len(self)))
+
+
 class GridCell():
-    def __init__(self, terrain_type: str = None, cellnum: int = -1) -> None:
-        self.is_occupied = False
-        if (terrain_type is None) or (terrain_type == "g") or (terrain_type == "ground"):
-            self.terrain_type = "ground"
-        elif (terrain_type == "s") or (terrain_type == "shallow"):
-            self.terrain_type = "shallow"
-        elif (terrain_type == "d") or (terrain_type == "deep"):
-            self.terrain_type = "deep"
-        else:
-            raise ValueError("invalid terrain type: " + terrain_type)
-        self.num = cellnum
+    """View of cell (i,j) of a TerrainMap, reads and writes go straight to the map's arrays"""
+    __slots__ = ['map', 'i', 'j']
+
+    def __init__(self, map: TerrainMap, i: int, j: int) -> None:
+        self.map = map
+        self.i = i
+        self.j = j
+
+    @property
+    def terrain_type(self) -> str:
+        return TERRAIN_NAMES[self.map.terrain[self.i, self.j]]
+
+    @terrain_type.setter
+    def terrain_type(self, terrain_type: str):
+        self.map.terrain[self.i, self.j] = terrain_code(terrain_type)
+
+    @property
+    def is_occupied(self) -> bool:
+        return bool(self.map.occupied[self.i, self.j])
+
+    @is_occupied.setter
+    def is_occupied(self, is_occupied: bool):
+        self.map.occupied[self.i, self.j] = is_occupied
+
+    @property
+    def num(self) -> int:
+        return self.i*self.map.terrain.shape[1] + self.j
 
     def __eq__(self, __o: object) -> bool:
         if __o == self.terrain_type:
@@ -54,6 +134,22 @@ def nearest_cell_ij(x: float, y:float):
     j = min(14, j)
     return i, j
 
+def containing_cell_ij(x: float, y: float):
+    """Returns the (i,j) indices of the map cell that contains point (x,y), or None if the point 
+    is outside the map or on the 1-pixel border between two cells. Same result as calling 
+    nearest_cell_ij followed by is_in_cell, in a single pass."""
+    j = int(x // CELL_SIZE)
+    reverse_y = SCREEN_HEIGHT - y 
+    i = int(reverse_y // CELL_SIZE)
+    if i < 0 or j < 0 or i > 14 or j > 14:
+        return None
+    if x - j*CELL_SIZE >= CELL_SIZE-1:
+        return None
+    offset_from_top = reverse_y - i*CELL_SIZE
+    if offset_from_top <= 0 or offset_from_top > CELL_SIZE-1:
+        return None
+    return i, j
+
 def cell_centerxy(i: int, j:int):
     center_x = (j+0.5)*CELL_SIZE - 1
     center_y = SCREEN_HEIGHT - (i+0.5)*CELL_SIZE + 1
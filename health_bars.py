@@ -0,0 +1,80 @@
+import numpy as np
+from arcade import get_window
+from arcade.color import RED, GREEN
+from arcade.gl import BufferDescription, TRIANGLES
+from constants import HBAR_HEIGHT, HBAR_WIDTH_FACTOR
+from enemy_table import EnemyTable
+
+# one vertex of the bars' geometry : position, then color
+VERTEX = np.dtype([('x', np.float32), ('y', np.float32), ('color', np.uint8, 4)])
+
+class HealthBars():
+    """Draws the health bars of every enemy in an EnemyTable as one batch of rectangles, green
+    for the health left and red for the health lost. The vertices of all bars are rebuilt from
+    the table into a single buffer on each draw. Bar widths are only recomputed for enemies
+    whose health changed since the previous draw."""
+    def __init__(self, table: EnemyTable):
+        self.table = table
+        # health and widths the bars were last drawn with, per table slot
+        self.drawn_health = np.zeros(0)
+        self.drawn_max_health = np.zeros(0)
+        self.green_width = np.zeros(0)
+        self.full_width = np.zeros(0)
+        self.vertices = np.zeros(0, dtype=VERTEX)
+        ctx = get_window().ctx
+        self.program = ctx.line_generic_with_colors_program
+        self.buffer = ctx.buffer(reserve=12*VERTEX.itemsize, usage='stream')
+        self.geometry = ctx.geometry([BufferDescription(self.buffer, '2f 4f1', ['in_vert', 'in_color'],
+                                                        normalized=['in_color'])])
+
+    def update_widths(self, live: np.ndarray):
+        """Recomputes the bar widths of the enemies (among slots live) whose health changed"""
+        if len(self.drawn_health) < self.table.capacity:
+            added = self.table.capacity - len(self.drawn_health)
+            self.drawn_health = np.concatenate([self.drawn_health, np.full(added, np.nan)])
+            self.drawn_max_health = np.concatenate([self.drawn_max_health, np.full(added, np.nan)])
+            self.green_width = np.concatenate([self.green_width, np.zeros(added)])
+            self.full_width = np.concatenate([self.full_width, np.zeros(added)])
+        health = self.table.current_health[live]
+        max_health = self.table.max_health[live]
+        changed = (health != self.drawn_health[live]) | (max_health != self.drawn_max_health[live])
+        if not changed.any():
+            return
+        changed_slots = live[changed]
+        self.drawn_health[changed_slots] = health[changed]
+        self.drawn_max_health[changed_slots] = max_health[changed]
+        full_width = np.round(max_health[changed]*HBAR_WIDTH_FACTOR)
+        self.full_width[changed_slots] = full_width
+        self.green_width[changed_slots] = np.clip(np.round(health[changed]*HBAR_WIDTH_FACTOR), 0, full_width)
+
+    def draw(self):
+        live = np.flatnonzero(self.table.active)
+        if len(live) == 0:
+            return
+        self.update_widths(live)
+
+        # the bars sit right on top of their enemy's rotated hit box
+        x = self.table.x[live]
+        angle = np.radians(self.table.angle[live])
+        rotated_y = (self.table.hit_box_x[live]*np.sin(angle)[:, None]
+                     + self.table.hit_box_y[live]*np.cos(angle)[:, None])
+        top = self.table.y[live] + rotated_y.max(axis=1)
+        full_width = self.full_width[live]
+        left = x - full_width/2
+        split = left + self.green_width[live]
+        right = x + full_width/2
+
+        # two rectangles per enemy, two triangles per rectangle
+        n = len(live)
+        if len(self.vertices) < 12*n:
+            self.vertices = np.zeros(24*n, dtype=VERTEX)
+            self.buffer.orphan(size=self.vertices.nbytes)
+        vertices = self.vertices[:12*n].reshape(n, 2, 6)
+        for m, (rect_left, rect_right, color) in enumerate([(left, split, GREEN), (split, right, RED)]):
+            for v, (corner_x, corner_y) in enumerate([(rect_left, top), (rect_right, top), (rect_left, top + HBAR_HEIGHT),
+                                                      (rect_right, top), (rect_right, top + HBAR_HEIGHT), (rect_left, top + HBAR_HEIGHT)]):
+                vertices[:, m, v]['x'] = corner_x
+                vertices[:, m, v]['y'] = corner_y
+            vertices[:, m]['color'] = (*color[:3], 255)
+        self.buffer.write(self.vertices[:12*n].tobytes())
+        self.geometry.render(self.program, mode=TRIANGLES, vertices=12*n)
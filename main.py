@@ -4,29 +4,20 @@ import sys
 if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
     os.chdir(sys._MEIPASS)
 import arcade
-from copy import deepcopy
-from math import floor, atan2, pi
-from random import randint, random
-from abilities import MjolnirAbility, SellTowerAbility, PlatformAbility, CommandAbility, HarvestAbility
+from math import floor
 from constants import (
     is_debug, SCREEN_HEIGHT, SCREEN_WIDTH, TRANSPARENT_BLACK, SCORE_FILE,
     MAP_HEIGHT, MAP_WIDTH, CHIN_HEIGHT, LEVEL_WIDTH, LEVEL_SPACING,
     SHOP_BOTTOMS, SHOP_TOPS, SHOP_ITEM_THUMB_SIZE, WAVE_VIEWER_WIDTH,
     SHOP_HEIGHT, SHOP_WIDTH, SHOP_ITEM_HEIGHT, ATK_BUTT_HEIGHT, INFO_BAR_HEIGHT,
     CELL_SIZE, RUNE_NAMES, RUNE_DESCRIPTIONS, ABILITY_NAMES, ABILITY_DESCRIPTIONS,
-    SCORE_FOLDER,
+    SCORE_FOLDER, SIM_TIME_STEP, SIM_TIME_BUDGET, GAME_SPEEDS,
 )
-from enemies import Enemy
-from explosions import AirExplosion, WaterExplosion, RuneApplyMarker
-from grid import GridCell, cell_lrtb, cell_centerxy, cell_color, nearest_cell_centerxy, nearest_cell_ij
-from projectiles import Projectile
-from runes import Raidho, Hagalaz, Tiwaz, Kenaz, Isa, Sowil, Laguz
+from grid import cell_lrtb, cell_color, nearest_cell_centerxy, nearest_cell_ij
+from health_bars import HealthBars
 from shop import ShopItem
-from towers import (WatchTower, Catapult, FalconCliff, Bastion, GreekFire,
-                    OakTreeTower, StoneHead, SparklingPillar, QuarryOfRage, SanctumOfTempest,
-                    TempleOfThor, Forge, TempleOfOdin, ChamberOfTheChief, TempleOfFreyr)
+from simulation import Simulation
 from utils import timestr, AnimatedSprite, MutableSound
-from waves import Wave, WaveMaker
 import glb
 
 
@@ -54,15 +45,7 @@ class GameWindow(arcade.Window):
     def __init__(self):
         super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
         arcade.set_background_color((255, 255, 255))
-        self.enemies_list = arcade.SpriteList()
-        self.towers_list = arcade.SpriteList()
-        self.projectiles_list = arcade.SpriteList()
-        self.effects_list = arcade.SpriteList()
-        self.all_sprites = arcade.SpriteList()
         self.map_shape_list = arcade.ShapeElementList()
-        self.platforms = arcade.SpriteList()
-        self.all_health_bars = arcade.SpriteList()
-        self.enemy_effects = arcade.SpriteList()
         self.gui_elements = arcade.SpriteList()
         self.paused = False
         self.assets = {
@@ -81,8 +64,6 @@ class GameWindow(arcade.Window):
             'freeplay_lit' : arcade.load_texture('./images/freeplay_button_lit_big.png'),
         }
         self.read_score_file()
-        self.abilities_list = [SellTowerAbility(), MjolnirAbility(), PlatformAbility(), CommandAbility(), HarvestAbility()]
-        self.runes_list = [Raidho(), Hagalaz(), Tiwaz(), Kenaz(), Isa(), Sowil(), Laguz()]
         if is_debug:
             self.perf_graph = arcade.PerfGraph(width=80, height=80, background_color=TRANSPARENT_BLACK)
             self.perf_graph.center_x = 40
@@ -138,18 +119,11 @@ class GameWindow(arcade.Window):
         self.map_water_static = None
         self.map_water_animation = None
         self.map_land = None
-        self.is_freeplay = is_freeplay
         self.read_score_file()
-        self.wave_is_happening = False
-        if self.is_freeplay:
-            self.wave_maker = WaveMaker()
-        else:
-            self.wave_maker = None
         self.hover_target = '' # used to store what UI element is being moused over, if any
         if map_number == 0: # level select screen
             self.game_state = 'level select'
             self.paused = True
-            self.load_shop_items()
             self.init_gui_elements()
             self.init_text()
             if not glb.MUTED:
@@ -158,158 +132,37 @@ class GameWindow(arcade.Window):
                 self.sound_player = self.menu_music.play(volume=0.5, loop=True)
             return
         self.game_state = 'playing'
-        self.wave_number = 0
-        self.money = 500 + 1500*is_debug
-        self.population = 10
-        self.enemies_left_to_spawn = 0
-        self.next_enemy_index = 0
-        self.is_air_wave = False
-        self.time_to_next_spawn = 1.0
         self.paused = False
-        self.load_shop_items() # first index is page, second is position in page
+        self.sim = Simulation(map_number=map_number, is_freeplay=is_freeplay)
         self.current_shop_tab = 0
         self.shop_item_selected = 0 # 0 if none selected, otherwise index+1 of selection
         self.rune_selected = 0 # 0 if none selected, otherwise index+1 of selection
         self.ability_selected = 0 # 0 if none selected, otherwise index+1 of selection
-        self.runes_unlocked = [False, False, False, False, False, False, False]
-        self.abilities_unlocked = [True, False, False, False, False]
         self.map_shape_list = arcade.ShapeElementList()
-        self.load_map("./files/map"+str(map_number)+".txt")
-        self.load_waves("./files/map"+str(map_number)+"CampaignWaves.csv")
-        self.platforms = arcade.SpriteList()
-        self.all_health_bars = arcade.SpriteList()
-        self.enemy_effects = arcade.SpriteList()
-        self.enemies_list = arcade.SpriteList()
-        self.swimmers_list = arcade.SpriteList()
-        self.flyers_list = arcade.SpriteList()
-        self.towers_list = arcade.SpriteList()
-        self.minirunes_list = arcade.SpriteList()
-        self.projectiles_list = arcade.SpriteList()
-        self.effects_list = arcade.SpriteList()
-        self.water_explosions_list = arcade.SpriteList()
+        self.load_map_graphics()
+        self.health_bars = HealthBars(self.sim.enemy_table)
         self.init_gui_elements()
-        self.all_sprites = arcade.SpriteList()    
-        if self.map_number < 3:
-            self.time_to_next_wave = 90
-        elif self.map_number == 3:
-            self.time_to_next_wave = 75
-        else:
-            self.time_to_next_wave = 60
         self.init_text()
         self.sound_player.pause()
         if not(glb.MUTED):
             self.sound_player = self.game_music.play(volume=0.5, loop=True)
-        self.income_score = 0
         self.people_score = 0
         self.unlocks_score = 0
         self.score = 0
         self.message_timer = 0
+        self.game_speed = 1
+        self.effective_speed = 1.0 # smoothed, lower than game_speed if steps don't fit in the frame budget
 
-    def load_shop_items(self):
-        self.shop_listlist = [[ # start Combat towers
-                ShopItem(is_unlocked=True, is_unlockable=False, 
-                        thumbnail="images/towers/WatchtowerThumbLarge.png",
-                        cost=100, tower=WatchTower()), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=True,
-                        thumbnail="images/towers/CatapultThumbLarge.png",
-                        cost=200, tower=Catapult(), quest="Destroy 10 enemies", 
-                        quest_thresh=10, quest_var_name="enemies killed"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
-                        thumbnail="images/towers/FalconCliffThumbLarge.png",
-                        cost=500, tower=FalconCliff(), quest="Destroy 25 flying enemies", 
-                        quest_thresh=25, quest_var_name="flying enemies killed"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False,
-                        thumbnail="images/towers/BastionThumbLarge.png",
-                        cost=650, tower=Bastion(), quest="Place 10 platforms", 
-                        quest_thresh=10, quest_var_name="platforms placed"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
-                        thumbnail="images/towers/GreekFireThumbLarge.png",
-                        cost=1000, tower=GreekFire(), quest="Inflame 20 enemies", 
-                        quest_thresh=20, quest_var_name="enemies inflamed")
-            ], [ # start Sacred towers
-                ShopItem(is_unlocked=True, is_unlockable=False, 
-                        thumbnail="images/towers/SacredOakThumbLarge.png",
-                        cost=120, tower=OakTreeTower()), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=True, 
-                        thumbnail="images/towers/StoneHeadThumbLarge.png",
-                        cost=180, tower=StoneHead(), quest="Plant 5 Sacred Oaks", 
-                        quest_thresh=5, quest_var_name="current oaks"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
-                        thumbnail="images/towers/SparklingPillarThumbLarge.png",
-                        cost=400, tower=SparklingPillar(), quest="Destroy 4 enemies with 1\nmjolnir", 
-                        quest_thresh=4, quest_var_name="max mjolnir kills"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False,
-                        thumbnail="images/towers/QuarryOfRageThumbLarge.png",
-                        cost=650, tower=QuarryOfRage(), quest="Destroy 3 submerged enemies", 
-                        quest_thresh=3, quest_var_name="submerged enemies killed"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False,
-                        thumbnail="images/towers/SanctumOfTempestThumbLarge.png",
-                        cost=1000, tower=SanctumOfTempest(), quest="Freeze 20 enemies", 
-                        quest_thresh=20, quest_var_name="enemies frozen")
-            ], [ # start Buildings
-                ShopItem(is_unlocked=is_debug, is_unlockable=True,
-                        thumbnail="images/towers/ThorTempleThumbLarge.png",
-                        cost=300, tower=TempleOfThor(), quest="Destroy 20 enemies", 
-                        quest_thresh=20, quest_var_name="enemies killed"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False,
-                        thumbnail="images/towers/ForgeThumbLarge.png",
-                        cost=500, tower=Forge(), quest="Build 15 structures", 
-                        quest_thresh=15, quest_var_name="current structures"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False,
-                        thumbnail="images/towers/OdinTempleThumbLarge.png",
-                        cost=700, tower=TempleOfOdin(), quest="Enchant 12 towers with runes", 
-                        quest_thresh=12, quest_var_name="current enchanted towers"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
-                        thumbnail="images/towers/ChamberChiefThumbLarge.png",
-                        cost=1200, tower=ChamberOfTheChief(), quest="Reach 3000 gold", 
-                        quest_thresh=3000, quest_var_name="current gold"), 
-                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
-                        thumbnail="images/towers/FreyrTempleThumbLarge.png",
-                        cost=1500, tower=TempleOfFreyr(), quest="Build 3 temples", 
-                        quest_thresh=3, quest_var_name="current_temples")
-            ]]
-        
-        self.quest_tracker = {
-            "enemies killed": 0, "flying enemies killed": 0, "submerged enemies killed": 0,
-            "enemies inflamed": 0, "enemies frozen": 0, "platforms placed": 0,
-            "max mjolnir kills": 0, "current oaks": 0, "current temples": 0, 
-            "current structures": 0, "current enchanted towers": 0, "current gold": 0, 
-            "_" : None # tracker used for pre-unlocked towers
-        }
-
-    def load_map(self, filename):
-        with open(filename, mode="r") as mapfile:
-            map_string_list = mapfile.readlines()
-        map_listlist = []
-        k = 0
-        for map_rowstr in map_string_list:
-            map_rowlist = []
-            for map_char in map_rowstr.rstrip():
-                map_rowlist.append(GridCell(terrain_type=map_char, cellnum=k))
-                k = k + 1
-            map_listlist.append(map_rowlist)
-        # last row is all-water for enemy targeting reasons
-        last_rowlist = []
-        for m in range(k, k+len(map_rowlist)):
-            last_rowlist.append(GridCell(terrain_type="shallow", cellnum=m))
-        map_listlist.append(last_rowlist)
-        self.map_cells = map_listlist
-
-        # check which cells are safe for spawning floating enemies
-        self.spawnable_cell_js = []
-        for j in range(len(self.map_cells[0])):
-            if ((self.map_cells[0][j].terrain_type == "shallow") or 
-                (self.map_cells[0][j].terrain_type == "deep")):
-                self.spawnable_cell_js.append(j)
-
+    def load_map_graphics(self):
         # Create the objects needed to quickly draw the map from scratch
         # see https://api.arcade.academy/en/latest/examples/shape_list_demo.html#shape-list-demo
+        map_cells = self.sim.map_cells
         points_list = []
         colors_list = []
-        for i in range(len(self.map_cells)-1):
-            for j in range(len(self.map_cells[i])):
+        for i in range(len(map_cells)-1):
+            for j in range(len(map_cells[i])):
                 left, right, top, bottom = cell_lrtb(i, j)
-                c = cell_color(self.map_cells[i][j].terrain_type)
+                c = cell_color(map_cells[i][j].terrain_type)
                 points_list.append((left,top))
                 points_list.append((right+1,top))
                 points_list.append((right+1,bottom-1))
@@ -350,33 +203,10 @@ class GameWindow(arcade.Window):
                 transition_times=[0.00, 0.12, 0.24, 0.36],
                 transition_indxs=[0,    1,    2,    0],
                 center_x=408,
-                center_y=254
+                center_y=254,
+                clock=self.sim.context.building_clock
             )
 
-        self.abilities_list[2] = PlatformAbility(map_reference=self.map_cells)
-
-    def load_waves(self, filename):
-        self.wave_list = []
-        if self.is_freeplay:
-            for k in range(4):
-                self.wave_list.append(self.wave_maker.make_wave())
-        else:
-            with open(filename, mode='r', newline='') as csvfile:
-                wave_reader = csv.reader(csvfile, delimiter=',', quotechar='|')
-                next(wave_reader) # skip header
-                for row in wave_reader:
-                    self.wave_list.append(Wave(
-                        number=row[0], 
-                        modifier=row[1],
-                        rank=row[2],
-                        type1=row[3],
-                        quant1=row[4],
-                        type2=row[5], 
-                        quant2=row[6], 
-                        type3=row[7],
-                        quant3=row[8]
-                    ))
-
     def init_text(self):
         """Initializes all text objects in order to avoid ever using draw_text, which has 
         terrible performance"""
@@ -621,6 +451,7 @@ class GameWindow(arcade.Window):
             self.wave_previews_text.append([wave_title, wave_content])
 
         # 4. Misc chin menu items
+        self.speed_text = init_outlined_text("x1", start_x=99, start_y=5, font_size=11)
         self.population_counter_text = arcade.Text(
             text="10" ,
             start_x = MAP_WIDTH*0.5,
@@ -772,11 +603,11 @@ class GameWindow(arcade.Window):
         self.gui_elements.append(self.attack_button)
         
         # 3. Shop items
-        for tab in range(len(self.shop_listlist)):
-            for k in range(len(self.shop_listlist[tab])):
-                self.shop_listlist[tab][k].center_x = MAP_WIDTH + SHOP_ITEM_THUMB_SIZE/2 + 4.5
-                self.shop_listlist[tab][k].center_y = SHOP_TOPS[k] - SHOP_ITEM_HEIGHT/2 + 2
-                self.gui_elements.append(self.shop_listlist[tab][k])
+        for tab in range(len(self.sim.shop_listlist)):
+            for k in range(len(self.sim.shop_listlist[tab])):
+                self.sim.shop_listlist[tab][k].center_x = MAP_WIDTH + SHOP_ITEM_THUMB_SIZE/2 + 4.5
+                self.sim.shop_listlist[tab][k].center_y = SHOP_TOPS[k] - SHOP_ITEM_HEIGHT/2 + 2
+                self.gui_elements.append(self.sim.shop_listlist[tab][k])
 
         # 4. Abilities bar
         self.ability_icons = []
@@ -784,9 +615,9 @@ class GameWindow(arcade.Window):
             ability_icon = arcade.Sprite(
                 center_x = MAP_WIDTH + k*42 + 28.5,
                 center_y = 25.5,
-                texture=self.abilities_list[k].icon
+                texture=self.sim.abilities_list[k].icon
             )
-            ability_icon.visible = self.abilities_unlocked[k]
+            ability_icon.visible = self.sim.abilities_unlocked[k]
             self.ability_icons.append(ability_icon)
             self.gui_elements.append(ability_icon)
 
@@ -796,9 +627,9 @@ class GameWindow(arcade.Window):
             rune_icon = arcade.Sprite(
                 center_x = MAP_WIDTH + k*30 + 20.5,
                 center_y = 193.5,
-                texture=self.runes_list[k].extended_icon
+                texture=self.sim.runes_list[k].extended_icon
             )
-            rune_icon.visible = self.runes_unlocked[k]
+            rune_icon.visible = self.sim.runes_unlocked[k]
             self.rune_icons.append(rune_icon)
             self.gui_elements.append(rune_icon)
 
@@ -853,50 +684,52 @@ class GameWindow(arcade.Window):
             return  
          
         self.draw_map_background()
-        self.water_explosions_list.draw()
-        self.swimmers_list.draw()
+        self.sim.water_explosions_list.draw()
+        self.sim.swimmers_list.draw()
         self.draw_map_land()
 
-        self.towers_list.draw()
-        self.minirunes_list.draw()
+        self.sim.towers_list.draw()
+        self.sim.minirunes_list.draw()
 
-        self.flyers_list.draw()
-        self.enemy_effects.draw()
-        self.all_health_bars.draw()
+        self.sim.flyers_list.draw()
+        self.sim.enemy_effects.draw()
+        self.sim.timed_effects.draw()
+        self.health_bars.draw()
 
         # clears the buffer to make sure projectiles are properly rendered
         self.ctx.flush() 
-        self.projectiles_list.draw()
+        self.sim.projectiles_list.draw()
+        self.sim.flame_system.draw()
 
         if not self.paused:
-            for k, tower in enumerate(self.towers_list.sprite_list):
+            for k, tower in enumerate(self.sim.towers_list.sprite_list):
                 if self.hover_target == "tower:"+str(k):
                     self.draw_range(tower)
                 if tower.attack_animation_remaining > 0:
                     tower.draw_shoot_animation()
             self.ctx.flush()
 
-        self.effects_list.draw()
+        self.sim.effects_list.draw()
 
         if ((not self.paused) and (self._mouse_x <= MAP_WIDTH and self._mouse_y >= CHIN_HEIGHT)):
             if self.shop_item_selected:
                 self.preview_tower_placement(
                     x=self._mouse_x, 
                     y=self._mouse_y, 
-                    tower_shopitem=self.shop_listlist[self.current_shop_tab][self.shop_item_selected-1]
+                    tower_shopitem=self.sim.shop_listlist[self.current_shop_tab][self.shop_item_selected-1]
                 )
             elif self.rune_selected:
                 k = self.rune_selected - 1
-                self.runes_list[k].preview(x=self._mouse_x, y=self._mouse_y)
+                self.sim.runes_list[k].preview(x=self._mouse_x, y=self._mouse_y)
             elif self.ability_selected:
                 k = self.ability_selected - 1
-                if self.abilities_list[k].has_range:
+                if self.sim.abilities_list[k].has_range:
                     self.preview_ability_range(
                         x=self._mouse_x, 
                         y=self._mouse_y, 
-                        ability_range=self.abilities_list[k].range
+                        ability_range=self.sim.abilities_list[k].range
                     )
-                self.abilities_list[k].preview(x=self._mouse_x, y=self._mouse_y)
+                self.sim.abilities_list[k].preview(x=self._mouse_x, y=self._mouse_y)
 
         self.gui_elements.draw()
         self.draw_chin_menu()
@@ -923,7 +756,7 @@ class GameWindow(arcade.Window):
             self.map_land.draw()
             if self.map_number == 1:
                 self.waterfall.draw()
-        self.platforms.draw()
+        self.sim.platforms.draw()
 
     def draw_range(self, tower):
         if tower.is_2x2:
@@ -942,22 +775,13 @@ class GameWindow(arcade.Window):
         fake_tower.center_y = center_y
         i, j = nearest_cell_ij(x, y)
         left, right, top, bottom = cell_lrtb(i, j)
-        is_spot_available = ((self.map_cells[i][j].terrain_type == "ground") and 
-                                    (not self.map_cells[i][j].is_occupied))
+        is_spot_available = self.sim.can_build_at(i, j, fake_tower.is_2x2)
 
         if fake_tower.is_2x2:
             fake_tower.center_x += CELL_SIZE/2
             fake_tower.center_y -= CELL_SIZE/2
             right += CELL_SIZE
             bottom -= CELL_SIZE
-            for ii in range(i, i+2):
-                for jj in range(j, j+2):
-                    if ((0 <= ii <= 14) and (0 <= jj <= 14)):
-                        if ((self.map_cells[ii][jj].terrain_type != "ground") or 
-                                (self.map_cells[ii][jj].is_occupied)):
-                            is_spot_available = False
-                    else:
-                        is_spot_available = False  
             
         if is_spot_available:
             outline_color = arcade.color.GREEN
@@ -986,15 +810,15 @@ class GameWindow(arcade.Window):
         # Wave previews
         for k in range(2):
             # add preview of waves, if there are still waves left
-            if self.wave_number+1-k < len(self.wave_list):
-                if self.is_freeplay:
-                    self.wave_previews_text[k][0].text = 'Attack #'+str(self.wave_number+2-k)
+            if self.sim.wave_number+1-k < len(self.sim.wave_list):
+                if self.sim.is_freeplay:
+                    self.wave_previews_text[k][0].text = 'Attack #'+str(self.sim.wave_number+2-k)
                 else:
-                    self.wave_previews_text[k][0].text = 'Attack #'+str(self.wave_number+2-k)+'/'+str(len(self.wave_list))
-                self.wave_previews_text[k][1].text = self.wave_list[self.wave_number+1-k].describe()
-                if k==1 and not self.wave_is_happening:
-                   mins_left = str(int(self.time_to_next_wave//60))
-                   secs_left = str(int(self.time_to_next_wave) % 60)
+                    self.wave_previews_text[k][0].text = 'Attack #'+str(self.sim.wave_number+2-k)+'/'+str(len(self.sim.wave_list))
+                self.wave_previews_text[k][1].text = self.sim.wave_list[self.sim.wave_number+1-k].describe()
+                if k==1 and not self.sim.wave_is_happening:
+                   mins_left = str(int(self.sim.time_to_next_wave//60))
+                   secs_left = str(int(self.sim.time_to_next_wave) % 60)
                    time_left = mins_left+':'+secs_left if len(secs_left)==2 else mins_left+':0'+secs_left
                    self.wave_previews_text[k][0].text += ' : in ' + time_left
             else:
@@ -1004,30 +828,42 @@ class GameWindow(arcade.Window):
                 txt.draw()
                 
         # attack button (update only, it already got drawn)
-        if self.wave_is_happening:
+        if self.sim.wave_is_happening:
             self.attack_button.set_texture(texture_no=2) # grey
         elif self.hover_target == 'attack_button' and not self.paused:
             self.attack_button.set_texture(texture_no=1) # lit
         else:
             self.attack_button.set_texture(texture_no=0) # normal
 
+        # game speed
+        speed_str = 'x' + str(self.game_speed)
+        if self.effective_speed < 0.9*self.game_speed:
+            speed_str += ' (x' + str(round(self.effective_speed, 1)) + ')'
+        if is_debug:
+            speed_str += ' ' + str(round(self.sim.advance_duration*1000)) + 'ms'
+        if self.speed_text[-1].text != speed_str:
+            for txt in self.speed_text:
+                txt.text = speed_str
+        for txt in self.speed_text:
+            txt.draw()
+
         # info bar
-        self.population_counter_text.text = str(self.population)
+        self.population_counter_text.text = str(self.sim.population)
         self.population_counter_text.draw()
-        self.money_counter_text.text = str(floor(self.money))
+        self.money_counter_text.text = str(floor(self.sim.money))
         self.money_counter_text.draw()
 
     def draw_shop(self): 
         # background
         self.shop_background.set_texture(self.current_shop_tab)
 
-        for tab in range(len(self.shop_listlist)):
-            for k in range(len(self.shop_listlist[tab])):
-                self.shop_listlist[tab][k].visible = (self.current_shop_tab == tab) and self.shop_listlist[tab][k].is_unlocked
+        for tab in range(len(self.sim.shop_listlist)):
+            for k in range(len(self.sim.shop_listlist[tab])):
+                self.sim.shop_listlist[tab][k].visible = (self.current_shop_tab == tab) and self.sim.shop_listlist[tab][k].is_unlocked
 
         for k in range(0, 5):
             # shop item, if it should be there
-            shop_item = (self.shop_listlist[self.current_shop_tab][k])
+            shop_item = (self.sim.shop_listlist[self.current_shop_tab][k])
             if shop_item.is_unlocked:
                 self.shop_text[k]['name'].text = shop_item.tower.name
                 self.shop_text[k]['description'].text = shop_item.tower.description
@@ -1053,7 +889,7 @@ class GameWindow(arcade.Window):
     def draw_corner_menu(self):
         # 1. Runes bar
         for k in range(7):
-            self.rune_icons[k].visible = self.runes_unlocked[k]
+            self.rune_icons[k].visible = self.sim.runes_unlocked[k]
         if self.rune_selected > 0:
             k = self.rune_selected - 1
             arcade.draw_lrtb_rectangle_outline(
@@ -1069,13 +905,13 @@ class GameWindow(arcade.Window):
         if 'shop' in self.hover_target:
             k = int(self.hover_target.split(':')[-1])
             if k < 9:
-                tower = self.shop_listlist[self.current_shop_tab][k].tower
+                tower = self.sim.shop_listlist[self.current_shop_tab][k].tower
                 self.info_box_text[0].text = tower.name
                 self.info_box_text[1].text = tower.describe_damage()
                 self.info_box_text[2].text = tower.description
         elif 'tower' in self.hover_target:
             k = int(self.hover_target.split(':')[-1])
-            tower = self.towers_list.sprite_list[k]
+            tower = self.sim.towers_list.sprite_list[k]
             self.info_box_text[0].text = tower.name
             self.info_box_text[1].text = tower.describe_damage()
             self.info_box_text[2].text = tower.description
@@ -1089,7 +925,7 @@ class GameWindow(arcade.Window):
         elif 'ability' in self.hover_target:
             k = int(self.hover_target.split(':')[-1])
             self.info_box_text[0].text = ABILITY_NAMES[k]
-            self.info_box_text[1].text = ABILITY_DESCRIPTIONS[k] + timestr(self.abilities_list[k].cooldown)
+            self.info_box_text[1].text = ABILITY_DESCRIPTIONS[k] + timestr(self.sim.abilities_list[k].cooldown)
             self.info_box_text[2].text = ''
         elif is_debug:
             self.info_box_text[0].text = self.hover_target
@@ -1108,9 +944,9 @@ class GameWindow(arcade.Window):
     
         # 3. Abilities bar
         for k in range(5):
-            self.ability_icons[k].visible = self.abilities_unlocked[k]
-            if self.abilities_list[k].cooldown_remaining > 0.01:
-                self.abilities_list[k].draw_cooldown(
+            self.ability_icons[k].visible = self.sim.abilities_unlocked[k]
+            if self.sim.abilities_list[k].cooldown_remaining > 0.01:
+                self.sim.abilities_list[k].draw_cooldown(
                     x = MAP_WIDTH + 27 + k*42,
                     y=24
                 )
@@ -1179,9 +1015,6 @@ class GameWindow(arcade.Window):
             self.map_water_animation.set_texture(self.water_shimmer_ind)
             while self.water_shimmer_timer <= 0:
                 self.water_shimmer_timer += 0.04
-        if self.map_number == 1:
-            self.waterfall.on_update(delta_time=delta_time)
-        self.minirunes_list.on_update(delta_time=delta_time)
         if self.message_timer > 0:
             for (time, size) in self.message_animation_map.items():
                 if self.message_timer >= time:
@@ -1191,338 +1024,58 @@ class GameWindow(arcade.Window):
 
         # check if any shop item is selected
         self.shop_item_selected = 0
-        for n, item in enumerate(self.shop_listlist[self.current_shop_tab]):
+        for n, item in enumerate(self.sim.shop_listlist[self.current_shop_tab]):
             if item.actively_selected:
                 self.shop_item_selected = n+1
 
-        # check for projectile impacts
-        for proj in self.projectiles_list.sprite_list:
-            if proj.name != 'falcon':
-                # see if we are on the target
-                dx = proj.target_x - proj.center_x
-                dy = proj.target_y - proj.center_y
-                dist2_from_target = dx*dx + dy*dy
-                if dist2_from_target <= (proj.speed/2)**2:
-                    self.perform_impact(proj)
-                    continue
-                # see if we already passed the target and are now headed away
-                vx = proj.velocity[0]
-                vy = proj.velocity[1]
-                vel_angle = atan2(vy, vx)
-                tgt_angle = atan2(-dy, -dx)
-                angle_diff = abs(vel_angle-tgt_angle) # this should be in [0, 2*pi]
-                if angle_diff < 0.2 or angle_diff > 2*pi - 0.2: 
-                    # we are headed directly away from target (+/- 0.2rad)
-                    # detonate self before we get too embarrasingly far
-                    self.perform_impact(proj)
-
-        self.perform_enemy_actions(delta_time=delta_time)
-        self.perform_tower_attacks(delta_time=delta_time)
-        self.update_wave_progress(delta_time=delta_time)
-        self.update_quests()
-        self.update_abilities_and_runes(delta_time=delta_time)
-        
-        # move and delete sprites if needed
-        self.enemies_list.update()
-        self.enemies_list.on_update(delta_time) 
-        self.towers_list.update()
-        self.towers_list.on_update(delta_time)
-        self.projectiles_list.update()
-        self.projectiles_list.on_update(delta_time)
-        self.effects_list.update()
-        self.effects_list.on_update(delta_time)
-        self.water_explosions_list.update()
-        self.water_explosions_list.on_update(delta_time)
+        n_steps = self.sim.advance(delta_time, speed=self.game_speed, time_budget=SIM_TIME_BUDGET)
+        self.effective_speed = 0.9*self.effective_speed + 0.1*n_steps*SIM_TIME_STEP/max(delta_time, 0.001)
+        if self.map_number == 1:
+            self.waterfall.on_update(delta_time=delta_time)
+
+        # play what happened during the step
+        # in fast forward, the same sound can come up several times in one frame
+        for (sound_name, volume) in dict.fromkeys(self.sim.pending_sounds):
+            self.sounds[sound_name].play(volume=volume)
+        self.sim.pending_sounds.clear()
+        for (message, sound_name) in self.sim.pending_messages:
+            self.set_temp_msg(message, sound_name=sound_name)
+        self.sim.pending_messages.clear()
 
         # check for loss condition
-        if self.population <= 0:
+        if self.sim.outcome == 'lost':
             self.paused = True
             self.game_state = 'lost'
             self.calc_score()
-            self.update_score_file(self.map_number, self.wave_number-1, did_win=False)
+            self.update_score_file(self.map_number, self.sim.wave_number-1, did_win=False)
         # check for win condition
-        elif self.wave_number >= len(self.wave_list) and not self.wave_is_happening:
+        elif self.sim.outcome == 'won':
             self.paused = True
             self.game_state = 'won'
             self.calc_score()
-            self.update_score_file(self.map_number, self.wave_number, did_win=True)
+            self.update_score_file(self.map_number, self.sim.wave_number, did_win=True)
 
         return ret
-    
+
     def calc_score(self):
-        self.people_score = self.population * 1000
+        self.people_score = self.sim.population * 1000
         self.unlocks_score = -1000
-        for shop_list in self.shop_listlist:
+        for shop_list in self.sim.shop_listlist:
             for tower in shop_list:
                 if tower.is_unlocked:
                     self.unlocks_score += 500
         map_bonus = 0.25*(self.map_number-1)
-        self.score = (self.people_score + self.income_score + self.unlocks_score)*(1+map_bonus)
-        self.scores_text[1].text = str(round(self.population))
+        self.score = (self.people_score + self.sim.income_score + self.unlocks_score)*(1+map_bonus)
+        self.scores_text[1].text = str(round(self.sim.population))
         self.scores_text[2].text = str(round(self.people_score))
-        self.scores_text[4].text = str(round(self.income_score))
-        self.scores_text[5].text = str(round(self.income_score))
+        self.scores_text[4].text = str(round(self.sim.income_score))
+        self.scores_text[5].text = str(round(self.sim.income_score))
         self.scores_text[7].text = str(round(self.unlocks_score/500))
         self.scores_text[8].text = str(round(self.unlocks_score))
         self.scores_text[10].text = str(round(map_bonus*100))+'%'
         for k in range(16, 21):
             self.scores_text[k].text = str(round(self.score))
 
-    def update_abilities_and_runes(self, delta_time: float):
-        # update cooldowns
-        for ability in self.abilities_list:
-            if ability is not None:
-                ability.on_update(delta_time)
-        
-        # update unlocks
-        if is_debug:
-            self.abilities_unlocked = [True]*len(self.abilities_unlocked)
-            self.runes_unlocked = [True]*len(self.runes_unlocked)
-            return
-        self.abilities_unlocked = [True, False, False, False, False]
-        self.runes_unlocked = [False]*len(self.runes_unlocked)
-        for tower in self.towers_list.sprite_list:
-            if not tower.is_2x2:
-                continue
-            if tower.name == "Temple of Thor":
-                self.abilities_unlocked[1] = True
-                self.runes_unlocked[0] = True
-            elif tower.name == "Forge":
-                 self.abilities_unlocked[2] = True
-                 self.runes_unlocked[1] = True
-            elif tower.name == "Temple of Odin":
-                self.runes_unlocked[2] = True
-                self.runes_unlocked[3] = True
-                self.runes_unlocked[4] = True
-            elif tower.name == "Chamber of the Chief":
-                self.abilities_unlocked[3] = True
-                self.runes_unlocked[5] = True
-            elif tower.name == "Temple of Freyr":
-                self.abilities_unlocked[4] = True
-                self.runes_unlocked[6] = True
-
-    def perform_enemy_actions(self, delta_time: float):
-        # take damage from dps effects:
-        for enemy in self.enemies_list.sprite_list:
-            for eff in enemy.temporary_effects:
-                if eff.damage_per_second > 0:
-                    dmg = eff.damage_per_second*delta_time
-                    self.process_enemy_damage(enemy, dmg)
-
-        # check if any enemies get kills
-        for enemy in self.enemies_list.sprite_list:
-            if enemy.center_y <= CHIN_HEIGHT - 0.4*CELL_SIZE:
-                self.population -= 1
-                self.sounds['VillageChaos'].play()
-                enemy.remove_from_sprite_lists()
-
-        # underwater enemy hiding
-        for enemy in self.swimmers_list: 
-            if enemy.can_hide:
-                i, j = nearest_cell_ij(enemy.center_x, enemy.center_y)
-                if self.map_cells[i][j].terrain_type == "deep":
-                    enemy.hide()
-                else:
-                    enemy.unhide()
-    
-    def update_wave_progress(self, delta_time: float):
-        if self.wave_is_happening:
-            # spawn next enemy, if needed, and decrement enemies_left_to_spawn
-            if self.enemies_left_to_spawn > 0:
-                if self.time_to_next_spawn <= 0.0: # time to spawn new enemy
-                    new_enemy = self.wave_list[self.wave_number-1].spawn(self.next_enemy_index)
-                    new_enemy.bottom = SCREEN_HEIGHT
-                    if new_enemy.is_flying:
-                        new_enemy.left = randint(0, floor(MAP_WIDTH-new_enemy.width))
-                        if (new_enemy.left < 2*CELL_SIZE) or (new_enemy.right > MAP_WIDTH-2*CELL_SIZE):
-                            new_enemy.left = randint(0, floor(MAP_WIDTH-new_enemy.width)) # re-roll the dice
-                    else:
-                        test_j = 99
-                        while test_j not in self.spawnable_cell_js:
-                            test_j = randint(0, len(self.map_cells[0]))
-                        new_enemy.center_x, _ = cell_centerxy(i=0, j=test_j)
-                        new_enemy.calc_path(map=self.map_cells)
-                    self.enemies_list.append(new_enemy)
-                    if new_enemy.is_flying:
-                        self.flyers_list.append(new_enemy)
-                    else:
-                        self.swimmers_list.append(new_enemy)
-                    self.all_sprites.append(new_enemy)
-                    self.all_health_bars.append(new_enemy.greenbar)
-                    self.all_health_bars.append(new_enemy.redbar)
-                    self.all_sprites.append(new_enemy.greenbar)
-                    self.all_sprites.append(new_enemy.redbar)
-                    if new_enemy.buff_sprite:
-                        self.enemy_effects.append(new_enemy.buff_sprite)
-                        self.all_sprites.append(new_enemy.buff_sprite)
-                    self.enemies_left_to_spawn -= 1
-                    self.next_enemy_index += 1
-                    self.time_to_next_spawn = 0.25 + random()*1.5 # seconds
-                else:
-                    self.time_to_next_spawn -= delta_time
-            # check if wave is over 
-            elif self.enemies_left_to_spawn == 0 and len(self.enemies_list.sprite_list) == 0:
-                self.wave_is_happening = False
-                if self.map_number < 3:
-                    self.time_to_next_wave = 90
-                elif self.map_number == 3:
-                    self.time_to_next_wave = 75
-                else:
-                    self.time_to_next_wave = 60
-                if self.is_freeplay:
-                    self.wave_list.append(self.wave_maker.make_wave())
-                for tower in self.towers_list.sprite_list:
-                    if tower.name == 'Sanctum of Tempest':
-                        tower.hit_counter = 0
-                        tower.set_texture(0)
-        else: # wave is not happening
-            self.time_to_next_wave -= delta_time
-            if self.time_to_next_wave <= 0:
-                self.start_wave()
-
-    def perform_tower_attacks(self, delta_time: float):
-        # sort enemies by increasing priority (low priority will be attacked first)
-        self.enemies_list.sort(key= lambda enmy : enmy.priority)
-        for tower in self.towers_list.sprite_list:  
-            for enemy in self.enemies_list.sprite_list:
-                if tower.can_see(enemy): 
-                    # we found something to target, stop looping through enemies
-                    tower.aim_to(enemy)
-                    if tower.cooldown_remaining <= 0: # ready to fire
-                        # an attack happens
-                        dmg, projlist, soundlist = tower.attack(enemy)
-                        for sound_name in soundlist:
-                            self.sounds[sound_name].play()
-                        if dmg > 0 and (tower.has_rune('kenaz') or tower.has_rune('isa')):
-                            effect = deepcopy(tower.rune.effect)
-                            thresh = 0.05
-                            if tower.name == "Falcon Cliff":
-                                if dmg == 0:
-                                    thresh = 0 # zero probability of setting effect
-                                else:
-                                    thresh *= delta_time # probability per second is 1-(1-0.05*dt)^(1/dt) = ~0.049
-                            if random() < thresh:
-                                effect_added = enemy.set_effect(effect)
-                                if effect_added:
-                                    self.enemy_effects.append(effect)
-                                    self.all_sprites.append(effect)
-                                if effect.name == 'freeze':
-                                    self.quest_tracker['enemies frozen'] += 1
-                                elif effect.name == 'inflame':
-                                    self.quest_tracker['enemies inflamed'] += 1
-                        
-                        self.process_enemy_damage(enemy, dmg)
-                        # deal with projectiles created by tower.attack()
-                        for proj in projlist: 
-                            self.projectiles_list.append(proj)
-                            self.all_sprites.append(proj)
-                    else : # not ready to fire
-                        tower.cooldown_remaining -= delta_time
-                        if tower.cooldown_remaining < 0.0:
-                            tower.cooldown_remaining = 0.0
-                    break # only do this for the first enemy each tower can see
-            else: # tower did not see any enemy (break was not reached)
-                tower.cooldown_remaining -= delta_time
-                if tower.cooldown_remaining < 0.0:
-                    tower.cooldown_remaining = 0.0
-
-    def perform_impact(self, projectile: Projectile):
-        if projectile.do_splash_damage:
-            projectile_kills = 0
-
-            # fancy loop through enemies, to cope with removal(s) during the loop
-            current_enemies = len(self.enemies_list.sprite_list)
-            for k in range(current_enemies):
-                enemy = self.enemies_list.sprite_list[current_enemies-1-k]
-                dx = (enemy.center_x-projectile.target_x)
-                dy = (enemy.center_y-projectile.target_y)
-                dist2 = dx**2 + dy**2
-                if dist2 <= projectile.splash_radius**2:
-                    # Found an enemy that will take some damage and/or effects
-                    for eff in projectile.effects:
-                        effect = deepcopy(eff)
-                        effect_added = enemy.set_effect(effect)
-                        if effect_added:
-                            self.enemy_effects.append(effect)
-                            self.all_sprites.append(effect)
-                        if effect.name == 'freeze':
-                            self.quest_tracker['enemies frozen'] += 1
-                        elif effect.name == 'inflame':
-                            self.quest_tracker['enemies inflamed'] += 1
-                    got_kill = self.process_enemy_damage(enemy, damage=projectile.damage)
-                    if got_kill:
-                        projectile_kills += 1
-            if projectile.damage == 100: # this is a mjolnir
-                if projectile_kills > self.quest_tracker["max mjolnir kills"]:
-                    self.quest_tracker["max mjolnir kills"] = projectile_kills
-        else: # projectiles that do not have AoE damage
-            if projectile.target is None: # sad, useless projectile
-                # create secondary projectiles if needed
-                sub_projectiles = projectile.make_secondaries(
-                    all_enemies=self.enemies_list.sprite_list, 
-                    not_allowed_targets=[]
-                )
-                for sub in sub_projectiles:
-                    self.projectiles_list.append(sub)
-                    self.all_sprites.append(sub)
-                projectile.remove_from_sprite_lists()
-                return
-            # if we reach this point, the projectile is not useless and will effect its target
-            for eff in projectile.effects:
-                effect = deepcopy(eff)
-                effect_added = projectile.target.set_effect(effect)
-                if effect_added:
-                    self.enemy_effects.append(effect)
-                    self.all_sprites.append(effect)
-                if effect.name == 'freeze':
-                    self.quest_tracker['enemies frozen'] += 1
-                elif effect.name == 'inflame':
-                    self.quest_tracker['enemies inflamed'] += 1
-            self.process_enemy_damage(enemy=projectile.target, damage=projectile.damage)
-        # ""pretty"" explosions
-        if projectile.impact_effect:
-            explosion = deepcopy(projectile.impact_effect)
-            explosion.center_x = projectile.target_x
-            explosion.center_y = projectile.target_y
-            self.effects_list.append(explosion)
-            self.all_sprites.append(explosion)
-            if explosion.sound_name:
-                self.sounds[explosion.sound_name].play()
-        elif projectile.impact_sound:
-            self.sounds[projectile.impact_sound].play()
-        # create secondary projectiles if needed
-        sub_projectiles = projectile.make_secondaries(
-            all_enemies = self.enemies_list.sprite_list, 
-            not_allowed_targets = [projectile.target] if projectile.target else []
-            )
-        for sub in sub_projectiles:
-            self.projectiles_list.append(sub)
-            self.all_sprites.append(sub)
-        projectile.remove_from_sprite_lists()
-
-    def process_enemy_damage(self, enemy: Enemy, damage: float) -> bool:
-        """Inflicts damage, updates money and quests, initializes death animations. Returns True if the enemy died"""
-        earnings = enemy.take_damage_give_money(damage=damage)
-        self.money += earnings
-        self.income_score += earnings
-        # did the enemy die ?
-        if earnings > 0:
-            self.quest_tracker["enemies killed"] += 1
-            if enemy.is_flying:
-                self.quest_tracker["flying enemies killed"] += 1
-                explosion = AirExplosion(center_x=enemy.center_x, center_y=enemy.center_y, scale=enemy.width/35)
-                self.sounds['AirDeath'].play(volume=0.5)
-                self.effects_list.append(explosion)
-            else:
-                explosion = WaterExplosion(center_x=enemy.center_x, center_y=enemy.center_y, scale=enemy.width/35)
-                self.sounds['WaterDeath'].play(volume=0.5)
-                self.water_explosions_list.append(explosion)
-                if enemy.is_hidden:
-                    self.quest_tracker["submerged enemies killed"] += 1
-            self.all_sprites.append(explosion)
-            return True
-        return False
-
     def update_score_file(self, map_number: int, waves_survived: int, did_win: bool):
         # read the entire file
         scores_listlist = []
@@ -1564,6 +1117,14 @@ class GameWindow(arcade.Window):
                 self.user_wants_to_close = False
             else:
                 self.paused = True
+        elif symbol == arcade.key.F and self.game_state == 'playing':
+            self.cycle_game_speed()
+
+    def cycle_game_speed(self):
+        """Switches to the next fast forward setting, after the fastest one comes normal speed"""
+        k = GAME_SPEEDS.index(self.game_speed)
+        self.game_speed = GAME_SPEEDS[(k+1) % len(GAME_SPEEDS)]
+        self.effective_speed = self.game_speed
 
     def on_mouse_press(self, x: int, y: int, button: int, modifiers: int):
         # 0. Deal with level selection and paused state
@@ -1601,7 +1162,7 @@ class GameWindow(arcade.Window):
                     return
                 else:
                     # return to level select
-                    self.update_score_file(self.map_number, self.wave_number-1, did_win=False)
+                    self.update_score_file(self.map_number, self.sim.wave_number-1, did_win=False)
                     self.setup(map_number=0)
             return
         elif self.paused and (self.game_state == 'won' or self.game_state == 'lost'):
@@ -1623,55 +1184,16 @@ class GameWindow(arcade.Window):
                 self.attempt_tower_enchant(x, y)
             elif self.ability_selected > 0:
                 if self.ability_selected == 1:
-                    self.attempt_tower_sell(x, y)
-                elif self.ability_selected == 2: # Mjolnir projectile
-                    if self.abilities_list[1].cooldown_remaining <= 0.01:
-                        mjolnir = self.abilities_list[1].trigger(x, y)
-                        self.projectiles_list.append(mjolnir)
-                        self.all_sprites.append(mjolnir)
-                        self.sounds["MjolnirThrow"].play()
-                        self.ability_selected = 0
-                elif self.ability_selected == 3: # Platform placement
-                    if self.abilities_list[2].cooldown_remaining <= 0.01:
-                        new_platform = self.abilities_list[2].trigger(x, y)
-                        if new_platform:
-                            self.platforms.append(new_platform)
-                            self.all_sprites.append(new_platform)
-                            self.sounds["Construction"].play()
-                            self.ability_selected = 0
-                            self.quest_tracker['platforms placed'] += 1
-                            for enemy in self.swimmers_list:
-                                enemy.calc_path(map=self.map_cells)
-                elif self.ability_selected == 4: # Command
-                    if self.abilities_list[3].cooldown_remaining <= 0.01:
-                        priority_delta, effect_radius2 = self.abilities_list[3].trigger(x, y)
-                        for enemy in self.enemies_list.sprite_list:
-                            dx = x - enemy.center_x
-                            dy = y - enemy.center_y
-                            dist2 = dx**2 + dy**2
-                            if dist2 < effect_radius2:
-                                enemy.priority += priority_delta
-                        self.sounds["Command"].play()
-                        self.ability_selected = 0
-                elif self.ability_selected == 5: # Harvest
-                    if self.abilities_list[4].cooldown_remaining <= 0.01:
-                        reward_fraction, effect_radius2 = self.abilities_list[4].trigger(x, y)
-                        for enemy in self.enemies_list.sprite_list:
-                            dx = x - enemy.center_x
-                            dy = y - enemy.center_y
-                            dist2 = dx**2 + dy**2
-                            if dist2 < effect_radius2:
-                                enemy.set_modifier('') # Remove any buff
-                                self.money += reward_fraction*enemy.reward
-                        self.sounds["Harvest"].play()
-                        self.ability_selected = 0
+                    self.sim.sell_tower(x, y)
+                elif self.sim.use_ability(self.ability_selected-1, x, y):
+                    self.ability_selected = 0
             
         # 2. Deal with button clicks 
         # 2.1 Next Wave Start Button
         if (MAP_WIDTH-ATK_BUTT_HEIGHT-5 < x < MAP_WIDTH-5) and (INFO_BAR_HEIGHT+2 < y < CHIN_HEIGHT-10):
-            if not self.wave_is_happening:
+            if not self.sim.wave_is_happening:
                 self.sounds["Click2"].play()
-                self.start_wave()
+                self.sim.start_wave()
         # 2.2 Shop tab change
         elif (x > MAP_WIDTH) and (y >= SHOP_TOPS[0]): 
             if x <= MAP_WIDTH + (SCREEN_WIDTH-MAP_WIDTH)/3:
@@ -1689,7 +1211,7 @@ class GameWindow(arcade.Window):
         # 2.3 Shop item selection
         elif (x > MAP_WIDTH) and (y >= SHOP_BOTTOMS[-1]): 
             for k in range(0, 5):
-                shop_item = self.shop_listlist[self.current_shop_tab][k]
+                shop_item = self.sim.shop_listlist[self.current_shop_tab][k]
                 if SHOP_BOTTOMS[k] <= y <= SHOP_TOPS[k]:
                     if shop_item.is_unlocked:
                         if not(shop_item.actively_selected):
@@ -1701,7 +1223,7 @@ class GameWindow(arcade.Window):
                 left = MAP_WIDTH + 5 + k*30
                 right = MAP_WIDTH + 5 + k*30 + 29
                 if left <= x <= right:
-                    if self.runes_unlocked[k]:
+                    if self.sim.runes_unlocked[k]:
                         if self.rune_selected != k+1:
                             self.sounds["Click2"].play()
                             self.rune_selected = k+1
@@ -1711,7 +1233,7 @@ class GameWindow(arcade.Window):
                 left = MAP_WIDTH + 7 + k*42
                 right = MAP_WIDTH + 7 + k*42 + 40
                 if left <= x <= right:
-                    if self.abilities_unlocked[k] and self.abilities_list[k].cooldown_remaining < 0.01:
+                    if self.sim.abilities_unlocked[k] and self.sim.abilities_list[k].cooldown_remaining < 0.01:
                         if self.ability_selected != k+1:
                             self.sounds["Click2"].play()
                             self.ability_selected = k+1
@@ -1732,6 +1254,10 @@ class GameWindow(arcade.Window):
                 glb.MUTED = True
                 self.mute_button.set_texture(1)
                 self.sound_player.pause()
+        # 2.9 Game speed
+        elif (95 <= x <= 160) and (2 <= y <= 22):
+            self.sounds["Click2"].play()
+            self.cycle_game_speed()
 
         return super().on_mouse_press(x, y, button, modifiers)
 
@@ -1739,169 +1265,25 @@ class GameWindow(arcade.Window):
         # check if a tower is selected and is affordable
         is_item_buyable = False
         for k in range(0, 5):
-            shop_item = self.shop_listlist[self.current_shop_tab][k]
-            is_item_buyable = (shop_item.actively_selected and self.money >= shop_item.cost)
+            shop_item = self.sim.shop_listlist[self.current_shop_tab][k]
+            is_item_buyable = (shop_item.actively_selected and self.sim.money >= shop_item.cost)
             if is_item_buyable:
                 break
         if not is_item_buyable:
             self.set_temp_msg('Not Enough\nMoney!', duration=2.5, sound_name='Error')
             return
         # if we reach this line, then there exists a selected, affordable ShopItem named shop_item
-                
-        # check if area is OK to place towers 
-        i, j = nearest_cell_ij(x, y)
-        center_x, center_y = nearest_cell_centerxy(x, y)
-        is_spot_available = ((self.map_cells[i][j].terrain_type == "ground") and 
-                                (not self.map_cells[i][j].is_occupied))
-        if shop_item.tower.is_2x2: # additional checks for large towers
-            center_x += CELL_SIZE/2
-            center_y -= CELL_SIZE/2
-            for ii in range(i, i+2):
-                for jj in range(j, j+2):
-                    if ((0 <= ii <= 14) and (0 <= jj <= 14)):
-                        if ((self.map_cells[ii][jj].terrain_type != "ground") or 
-                                (self.map_cells[ii][jj].is_occupied)):
-                            is_spot_available = False
-                    else:
-                        is_spot_available = False 
-        if not is_spot_available:
+        if self.sim.place_tower(shop_item, x, y) is None:
             self.set_temp_msg("You Can't\nBuild Here!", duration=2.5, sound_name='Error')
-            return
-        # if we reach this line, it means shop_item is a selected and affordable tower that is
-        # hovering over an available location
-        
-        # buy and place the shop_item
-        self.money -= shop_item.cost
-        new_tower = shop_item.tower.make_another()
-        new_tower.center_x = center_x
-        new_tower.center_y = center_y
-        if new_tower.does_rotate:
-            self.towers_list.append(new_tower.make_base_tower())
-        self.towers_list.append(new_tower)
-        self.all_sprites.append(new_tower)
-        self.map_cells[i][j].is_occupied = True
-        if new_tower.is_2x2:
-            self.map_cells[i+1][j].is_occupied = True
-            self.map_cells[i][j+1].is_occupied = True
-            self.map_cells[i+1][j+1].is_occupied = True
-            self.update_ability_cooldowns()
-        elif new_tower.name == "Falcon Cliff":
-            self.projectiles_list.append(new_tower.falcon)
-            self.all_sprites.append(new_tower.falcon)
-            new_tower.falcon.center_x = new_tower.center_x
-            new_tower.falcon.center_y = new_tower.center_y
-            self.sounds['Falcon'].play()
-        self.sounds['Construction'].play()
-
-    def attempt_tower_sell(self, x: float, y: float):
-        i, j = nearest_cell_ij(x, y)
-        if not self.map_cells[i][j].is_occupied:
-            return
-        
-        # if we reach this line, then the cell is occupied by a 1x1 or 2x2 tower
-        for tower in self.towers_list.sprite_list:
-            if tower.is_2x2: # we'll deal with 2x2 towers later
-                continue
-            ti, tj = nearest_cell_ij(tower.center_x, tower.center_y)
-            if (i == ti) and (j == tj) and ('base' not in tower.name.lower()):
-                # found the tower
-                price = self.find_tower_price(tower.name)
-                self.money += int(floor(price/2))
-                self.map_cells[i][j].is_occupied = False
-                if tower.has_rune('any'):
-                    tower.minirune.remove_from_sprite_lists()
-                tower.remove_from_sprite_lists()
-                if tower.name == "Falcon Cliff":
-                    tower.falcon.remove_from_sprite_lists()
-                elif tower.does_rotate:
-                    tower.base_sprite.remove_from_sprite_lists()
-                self.sounds['Sell'].play()
-                return
-            
-        # if we reach this line, then the cell is occupied by a 2x2 tower
-        for tower in self.towers_list.sprite_list:
-            if not tower.is_2x2:
-                continue
-            ti, tj = nearest_cell_ij(tower.center_x-CELL_SIZE/2, tower.center_y+CELL_SIZE/2)
-            if (ti <= i <= ti+1) and (tj <= j <= tj+1):
-                # found the tower
-                price = self.find_tower_price(tower.name)
-                self.money += int(floor(price/2))
-                self.map_cells[ti][tj].is_occupied = False
-                self.map_cells[ti+1][tj].is_occupied = False
-                self.map_cells[ti][tj+1].is_occupied = False
-                self.map_cells[ti+1][tj+1].is_occupied = False
-                tower.remove_from_sprite_lists()
-                self.update_ability_cooldowns()
-                self.sounds['Sell'].play()
-                return
 
     def attempt_tower_enchant(self, x: float, y: float):
         if not self.rune_selected:
             return
-        if self.money < self.runes_list[self.rune_selected-1].cost:
+        rune = self.sim.runes_list[self.rune_selected-1]
+        if self.sim.money < rune.cost:
             self.set_temp_msg('Not Enough\nMoney !', duration=2.5, sound_name='Error')
             return
-        rune = self.runes_list[self.rune_selected-1].make_another()
-        i, j = nearest_cell_ij(x, y)
-        if not self.map_cells[i][j].is_occupied:
-            return
-        
-        # if we reach this line, then the cell is occupied by a 1x1 or 2x2 tower
-        for tower in self.towers_list.sprite_list:
-            if tower.is_2x2: # 2x2 towers are un-enchantable so skip this
-                continue
-            if 'base' in tower.name.lower():
-                continue # tower bases don't get runes, tower tops do
-            ti, tj = nearest_cell_ij(tower.center_x, tower.center_y)
-            if (i == ti) and (j == tj):
-                # found the tower
-                if not tower.has_rune(rune.name):
-                    self.money -= rune.cost
-                    new_minirune = tower.set_rune(rune)
-                    if new_minirune:
-                        self.minirunes_list.append(new_minirune)
-                    x, y = cell_centerxy(i,j)
-                    self.effects_list.append(RuneApplyMarker(x, y))
-                    self.sounds['Rune'].play()
-            
-    def find_tower_price(self, tower_name):
-        for shop_list in self.shop_listlist:
-            for shop_item in shop_list:
-                if shop_item.tower.name == tower_name:
-                    return shop_item.cost
-        return 0
-
-    def update_quests(self):
-        # 1. update the state-based quests in the self.quest_tracker
-        # (event-based quests are updated wherever the relevant events happen)
-        temples = 0
-        oaks = 0
-        runed_towers = 0
-        for tower in self.towers_list.sprite_list:
-            if "temple" in tower.name.lower():
-                temples += 1
-            elif tower.name == "Sacred Oak":
-                oaks += 1
-            if tower.has_rune('any'):
-                runed_towers += 1
-        self.quest_tracker["current oaks"] = oaks
-        self.quest_tracker["current_temples"] = temples
-        self.quest_tracker["current structures"] = len([tower for tower in self.towers_list.sprite_list if 'base' not in tower.name.lower()])
-        self.quest_tracker["current gold"] = self.money
-        self.quest_tracker["current enchanted towers"] = runed_towers
-
-        # 2. use self.quest_tracker to update each shopitem and perform unlocks
-        for shop_list in self.shop_listlist:
-            for k, shop_item in enumerate(shop_list):
-                if shop_item.is_unlockable and not shop_item.is_unlocked:
-                    shop_item.quest_progress = self.quest_tracker[shop_item.quest_var_name]
-                    if (shop_item.quest_progress >= shop_item.quest_thresh):
-                        shop_item.is_unlocked = True
-                        shop_item.is_unlockable = False
-                        if k < len(shop_list) - 1: # there exists a next item
-                            shop_list[k+1].is_unlockable = True
-                        self.set_temp_msg('Unlocked :\n'+shop_item.tower.name, sound_name='QuestComplete')
+        self.sim.enchant_tower(rune, x, y)
 
     def set_temp_msg(self, message: str, duration: float = 2.5, sound_name: str = None):
         """Sends a temporary message to the info box, overwriting whatever is currently there"""
@@ -1941,7 +1323,7 @@ class GameWindow(arcade.Window):
         # 1. Are we hovering over a shop item ?
         if (x > MAP_WIDTH) and (y >= SHOP_BOTTOMS[-1]): 
             for k in range(0, 5):
-                shop_item = self.shop_listlist[self.current_shop_tab][k]
+                shop_item = self.sim.shop_listlist[self.current_shop_tab][k]
                 if SHOP_BOTTOMS[k] <= y <= SHOP_TOPS[k]:
                     if shop_item.is_unlockable or shop_item.is_unlocked:
                         self.hover_target = 'shop:' + str(self.current_shop_tab) + ':' + str(k)
@@ -1957,7 +1339,7 @@ class GameWindow(arcade.Window):
                 left = MAP_WIDTH + 5 + k*30
                 right = MAP_WIDTH + 5 + k*30 + 29
                 if left <= x <= right:
-                    if self.runes_unlocked[k]:
+                    if self.sim.runes_unlocked[k]:
                         self.hover_target = 'rune:' + str(k)
                         self.highlight_box.width = 28
                         self.highlight_box.height = 28
@@ -1971,9 +1353,9 @@ class GameWindow(arcade.Window):
                 left = MAP_WIDTH + 7 + k*42
                 right = MAP_WIDTH + 7 + k*42 + 40
                 if left <= x <= right:
-                    if self.abilities_unlocked[k]:
+                    if self.sim.abilities_unlocked[k]:
                         self.hover_target = 'ability:' + str(k)
-                        if self.abilities_list[k].cooldown_remaining < 0.01:
+                        if self.sim.abilities_list[k].cooldown_remaining < 0.01:
                             self.highlight_box.width = 40
                             self.highlight_box.height = 40
                             self.highlight_box.center_x = MAP_WIDTH + k*42 + 29
@@ -1998,7 +1380,7 @@ class GameWindow(arcade.Window):
         
         # 6. Are we mousing over a tower sprite on the map ?
         if (x < MAP_WIDTH) and (CHIN_HEIGHT < y):
-            for k, tower in enumerate(self.towers_list.sprite_list):
+            for k, tower in enumerate(self.sim.towers_list.sprite_list):
                 if ((tower.left < x < tower.right) and (tower.bottom < y < tower.top)):
                     if 'base' not in tower.name.lower():
                         self.hover_target = 'tower:'+str(k)
@@ -2008,40 +1390,12 @@ class GameWindow(arcade.Window):
 
     def unselect_all_items(self):
         for m in range(0, 3):
-            for shop_item in self.shop_listlist[m]:
+            for shop_item in self.sim.shop_listlist[m]:
                 shop_item.actively_selected = False
         self.rune_selected = 0
         self.ability_selected = 0
         self.shop_item_selected = 0
 
-    def update_ability_cooldowns(self):
-        """Adjusts the cooldown duration (in s) of each ability using the base 
-        cooldown and the number of corresponding buildings."""
-        for k in range(1, 5): # k is the ability index
-            building_name = ''
-            for building in self.shop_listlist[2]:
-                if k in building.tower.unlocked_power_indxs:
-                    building_name = building.tower.name
-                    base_cooldown = building.tower.cooldown
-
-            n_buildings = 0
-            for tower in self.towers_list:
-                if tower.name == building_name:
-                    n_buildings += 1
-
-            self.abilities_list[k].cooldown = base_cooldown * 0.8**(n_buildings-1)
-            self.abilities_list[k].cooldown_remaining = min(self.abilities_list[k].cooldown, 
-                                                            self.abilities_list[k].cooldown_remaining)
-
-    def start_wave(self):
-        self.wave_is_happening = True
-        self.wave_number += 1
-        self.enemies_left_to_spawn = len(self.wave_list[self.wave_number-1].enemies_list)
-        self.next_enemy_index = 0
-        for ability in self.abilities_list:
-            if ability is not None:
-                ability.cooldown_remaining -= max(self.time_to_next_wave, 0)
-
     def on_close(self):
         if self.user_wants_to_close or self.game_state == 'level select':
             arcade.close_window()
@@ -0,0 +1,246 @@
+import numpy as np
+from arcade import Sprite, SpriteList
+from math import cos, sin, pi
+from random import Random
+from constants import FLAMES, MAP_WIDTH, SCREEN_HEIGHT, CHIN_HEIGHT
+from targeting import swept_arrivals
+
+class FlameHit():
+    """Everything the Simulation needs to resolve one flame particle reaching its target"""
+    __slots__ = ['target', 'damage', 'effect', 'num_secondaries', 'x', 'y', 'speed', 'texture_indx', 'source']
+
+    def __init__(self, target, damage: float, effect, num_secondaries: int,
+                 x: float, y: float, speed: float, texture_indx: int, source = None):
+        self.target = target
+        self.damage = damage
+        self.effect = effect
+        self.num_secondaries = num_secondaries
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.texture_indx = texture_indx
+        self.source = source
+
+
+class FlameParticleSystem():
+    """Simulates every Greek Fire flame particle at once. Particle state lives in NumPy arrays
+    (one entry per particle slot) and is advanced with vectorized homing and arrival tests,
+    instead of one Projectile sprite per particle. Only the position, angle and look of live
+    particles are copied into a fixed set of sprites, drawn with a single SpriteList, and only
+    when drawing."""
+    def __init__(self, rng: Random, capacity: int = 256):
+        self.rng = rng # where the flames start, their look and their jitter
+        self.capacity = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.vx = np.zeros(0)
+        self.vy = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.damage = np.zeros(0)
+        self.target_x = np.zeros(0) # last known position of the target
+        self.target_y = np.zeros(0)
+        self.target_slot = np.zeros(0, dtype=np.int32) # index in self.targets, 0 means no target
+        self.has_jitter = np.zeros(0, dtype=bool)
+        self.num_secondaries = np.zeros(0, dtype=np.int32)
+        self.texture_indx = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.effects = [] # per particle : EffectTemplate to apply on impact, or None
+        self.parent_towers = [] # per particle : tower to retarget from (Raidho rune), or None
+        self.sources = [] # per particle : who gets credited for its damage
+        self.targets = [None] # enemies targeted by particles, first slot stands for "no target"
+        self.free_slots = []
+        self.sprites = []
+        self.sprite_list = SpriteList()
+        self.grow(capacity)
+
+    def grow(self, new_capacity: int):
+        """Makes room for more particles, keeping the existing ones"""
+        added = new_capacity - self.capacity
+        for name in ['x', 'y', 'vx', 'vy', 'speed', 'damage', 'target_x', 'target_y',
+                     'target_slot', 'has_jitter', 'num_secondaries', 'texture_indx', 'alive']:
+            old_array = getattr(self, name)
+            setattr(self, name, np.concatenate([old_array, np.zeros(added, dtype=old_array.dtype)]))
+        self.effects += [None] * added
+        self.parent_towers += [None] * added
+        self.sources += [None] * added
+        # new slots are handed out lowest first
+        self.free_slots = list(range(new_capacity-1, self.capacity-1, -1)) + self.free_slots
+        for k in range(added):
+            sprite = Sprite(texture=FLAMES[0])
+            sprite.visible = False
+            self.sprites.append(sprite)
+            self.sprite_list.append(sprite)
+        self.capacity = new_capacity
+
+    def __len__(self):
+        return self.capacity - len(self.free_slots)
+
+    def emit(self, tower_x: float, tower_y: float, tower_angle: float, enemy, damage: float,
+             speed: float = 240, effect = None, num_secondaries: int = 0, parent_tower = None,
+             source = None):
+        """Creates one flame particle at a random spot near the "mouth" of a tower's nozzle"""
+        r0 = 32
+        theta = (tower_angle+90)*pi/180
+        sigma_t = 6
+        randsigned = self.rng.random()*2 - 1
+        dt = sigma_t*randsigned
+        dr = -16*(1-abs(dt)/sigma_t) # spawning "surface" is v-shaped along radial direction
+        center_x = tower_x + r0*cos(theta) + dr*cos(theta) + dt*sin(theta)
+        center_y = tower_y + r0*sin(theta) + dr*sin(theta) - dt*cos(theta)
+        self.spawn(center_x, center_y, target=enemy, target_x=enemy.center_x,
+                   target_y=enemy.center_y, damage=damage, speed=speed, effect=effect,
+                   num_secondaries=num_secondaries, parent_tower=parent_tower,
+                   texture_indx=self.rng.randint(0, 7), source=source)
+
+    def spawn(self, x: float, y: float, target, target_x: float, target_y: float, damage: float,
+              speed: float = 240, effect = None, num_secondaries: int = 0, parent_tower = None,
+              texture_indx: int = 0, has_jitter: bool = True, scale: float = 1.0, source = None):
+        """Creates one particle at (x,y) homing onto the target Enemy, or flying straight to
+        (target_x, target_y) if target is None"""
+        if not self.free_slots:
+            self.grow(2*self.capacity)
+        k = self.free_slots.pop()
+        dx = target_x - x
+        dy = target_y - y
+        norm = (dx*dx + dy*dy)**0.5
+        if norm == 0:
+            norm = 0.001
+        self.x[k] = x
+        self.y[k] = y
+        self.vx[k] = speed*dx/norm
+        self.vy[k] = speed*dy/norm
+        self.speed[k] = speed
+        self.damage[k] = damage
+        self.target_x[k] = target_x
+        self.target_y[k] = target_y
+        if target is None:
+            self.target_slot[k] = 0
+        else:
+            self.targets.append(target)
+            self.target_slot[k] = len(self.targets) - 1
+        self.has_jitter[k] = has_jitter
+        self.num_secondaries[k] = num_secondaries
+        self.texture_indx[k] = texture_indx
+        self.alive[k] = True
+        self.effects[k] = effect
+        self.parent_towers[k] = parent_tower
+        self.sources[k] = source
+        sprite = self.sprites[k]
+        sprite.texture = FLAMES[texture_indx]
+        sprite.scale = scale
+        sprite.visible = True
+
+    def kill(self, slots):
+        for k in slots:
+            self.alive[k] = False
+            self.effects[k] = None
+            self.parent_towers[k] = None
+            self.sources[k] = None
+            self.sprites[k].visible = False
+            self.free_slots.append(k)
+
+    def find_impacts(self, delta_time: float) -> list:
+        """Removes the particles that reach their target during the next delta_time seconds of
+        movement, and returns a FlameHit for each"""
+        live = np.flatnonzero(self.alive)
+        if len(live) == 0:
+            return []
+        on_target = swept_arrivals(
+            x=self.x[live], y=self.y[live], move_x=self.vx[live]*delta_time, move_y=self.vy[live]*delta_time, 
+            target_x=self.target_x[live], target_y=self.target_y[live], reach=self.speed[live]*delta_time/2, 
+            is_ballistic=(self.target_slot[live] == 0)
+        )
+        arrived = live[on_target]
+
+        hits = []
+        for k in arrived.tolist():
+            hits.append(FlameHit(
+                target=self.targets[self.target_slot[k]], damage=float(self.damage[k]),
+                effect=self.effects[k], num_secondaries=int(self.num_secondaries[k]),
+                x=float(self.x[k]), y=float(self.y[k]), speed=float(self.speed[k]),
+                texture_indx=int(self.texture_indx[k]), source=self.sources[k]
+            ))
+        self.kill(arrived.tolist())
+        return hits
+
+    def on_update(self, delta_time: float = 1/60):
+        """Moves every particle, then steers it towards its target"""
+        live = np.flatnonzero(self.alive)
+        if len(live) == 0:
+            self.targets = [None]
+            return
+        # move, same as utils.move_sprites() does
+        self.x[live] += self.vx[live]*delta_time
+        self.y[live] += self.vy[live]*delta_time
+
+        # gather the targets' state once per target rather than once per particle
+        slots = self.target_slot[live]
+        used_slots, new_slots = np.unique(np.concatenate([[0], slots]), return_inverse=True)
+        self.targets = [self.targets[s] for s in used_slots.tolist()]
+        slots = new_slots[1:].astype(np.int32)
+        self.target_slot[live] = slots
+        target_xs = [0.0]
+        target_ys = [0.0]
+        target_alive = [False]
+        for enemy in self.targets[1:]:
+            target_xs.append(enemy.center_x)
+            target_ys.append(enemy.center_y)
+            target_alive.append(enemy.current_health > 0)
+
+        # particles whose target is dead either retarget (Raidho) or fly to where it was
+        orphans = live[~np.array(target_alive)[slots]]
+        for k in orphans.tolist():
+            if self.target_slot[k] == 0:
+                continue # already flying to a static spot
+            tower = self.parent_towers[k]
+            if tower is None:
+                self.target_slot[k] = 0
+                continue
+            dx = self.x[k] - tower.center_x
+            dy = self.y[k] - tower.center_y
+            if (dx*dx + dy*dy < tower.range**2) and (tower.target is not None):
+                self.targets.append(tower.target)
+                self.target_slot[k] = len(self.targets) - 1
+                target_xs.append(tower.target.center_x)
+                target_ys.append(tower.target.center_y)
+                target_alive.append(tower.target.current_health > 0)
+        target_xs = np.array(target_xs)
+        target_ys = np.array(target_ys)
+        slots = self.target_slot[live]
+
+        # accelerate towards living targets and lose some speed
+        homing = live[np.array(target_alive)[slots]]
+        homing_slots = self.target_slot[homing]
+        tx = target_xs[homing_slots]
+        ty = target_ys[homing_slots]
+        self.target_x[homing] = tx
+        self.target_y[homing] = ty
+        dx = tx - self.x[homing]
+        dy = ty - self.y[homing]
+        jitter = self.has_jitter[homing] & (np.maximum(dx, dy) > 20)
+        n_jitter = np.count_nonzero(jitter)
+        if n_jitter:
+            dx[jitter] += np.array([self.rng.random()*32-8 for m in range(n_jitter)])
+            dy[jitter] += np.array([self.rng.random()*32-8 for m in range(n_jitter)])
+        norm = np.sqrt(dx*dx + dy*dy)
+        norm[norm == 0] = 0.001
+        speed = self.speed[homing]
+        self.vx[homing] = 0.67*self.vx[homing] + 0.33*speed*dx/norm
+        self.vy[homing] = 0.67*self.vy[homing] + 0.33*speed*dy/norm
+
+        # particles that left the screen are gone
+        x = self.x[live]
+        y = self.y[live]
+        outside = (x > MAP_WIDTH + 20) | (x < -20) | (y > SCREEN_HEIGHT + 20) | (y < CHIN_HEIGHT - 20)
+        self.kill(live[outside].tolist())
+
+    def draw(self):
+        """Copies the position and angle of live particles into their sprites, then draws them.
+        This only happens once per rendered frame, however many times on_update() ran."""
+        live = np.flatnonzero(self.alive)
+        angles = np.degrees(np.arctan2(self.vy[live], self.vx[live]))
+        for k, x, y, angle in zip(live.tolist(), self.x[live].tolist(), self.y[live].tolist(), angles.tolist()):
+            sprite = self.sprites[k]
+            sprite.position = (x, y)
+            sprite.angle = angle
+        self.sprite_list.draw()
@@ -1,4 +1,6 @@
 # here I call (i,j) tuples cells, and lists of consecutive (i,j) tuples routes
+from heapq import heappush, heappop
+from grid import GROUND, TerrainMap
 
 def are_adjacent(cell1: tuple, cell2: tuple):
     if cell1[0] == cell2[0] and abs(cell1[1]-cell2[1]) == 1:
@@ -10,64 +12,166 @@ def are_adjacent(cell1: tuple, cell2: tuple):
 def get_adjacent_cells(i: int, j: int):
     return [(i-1,j), (i+1,j), (i,j-1), (i,j+1)]
 
-def new_routing_options(known_cells: list, known_routes: list, map: list):
-    # print("I know how to go to these:", known_cells)
-    new_cells = []
-    new_routes = []
-    for kcell, kroute in zip(known_cells, known_routes):
-        for tup in get_adjacent_cells(kcell[0], kcell[1]):
-            i = tup[0]
-            j = tup[1]
-            if i<0 or j<0 or i>15 or j>14:
+def hscore(cell: tuple, target: tuple):
+    return abs(cell[0]-target[0]) + abs(cell[1]-target[1])
+
+def find_path(start_cell: tuple, target_cell: tuple, map: TerrainMap):
+    """Returns the shortest route (list of cells, start and target included) from start_cell
+    to target_cell that avoids "ground" cells, using a-star search. Raises ArithmeticError
+    if there is no such route."""
+    n_rows, n_cols = map.terrain.shape
+    is_ground = (map.terrain == GROUND).tolist()
+    # each cell gets a flat index k = i*n_cols + j, so that bookkeeping can use flat lists
+    start_k = start_cell[0]*n_cols + start_cell[1]
+    target_k = target_cell[0]*n_cols + target_cell[1]
+    visited = bytearray(n_rows*n_cols) # closed set : 1 once a cell's best route is known
+    parent = [-1] * (n_rows*n_cols)
+    best_g = {start_k: 0}
+
+    # heap entries are (f-score, -g-score, cell index). Negating the g-score breaks f-score
+    # ties in favor of cells that are closer to the target.
+    open_heap = [(hscore(start_cell, target_cell), 0, start_k)]
+    while open_heap:
+        _, neg_g, k = heappop(open_heap)
+        if visited[k]:
+            continue # stale heap entry, we already found a better way here
+        visited[k] = 1
+        if k == target_k:
+            # found the best path, walk the parent pointers back to the start
+            route = []
+            while k != -1:
+                route.append(divmod(k, n_cols))
+                k = parent[k]
+            route.reverse()
+            return route
+        i, j = divmod(k, n_cols)
+        for (ni, nj) in get_adjacent_cells(i, j):
+            if ni<0 or nj<0 or ni>=n_rows or nj>=n_cols:
                 continue # this cell is outside the map, skip it
-            if (tup not in known_cells) and (tup not in new_cells):
-                if (map[i][j] == "ground"):
-                    continue
-                # this is a new cell we can reach
-                new_cells.append(tup)
-                # loop on all known routes to find one with lower g-score that leads to the same place
-                best_route = kroute
-                best_g = gscore(kroute)
-                for cell, route in zip(known_cells, known_routes):
-                    if gscore(route) < best_g and are_adjacent(cell, tup):
-                        best_route = route
-                        best_g = gscore(route)
-                new_routes.append(best_route + [tup])
-                # print("found route", best_route, "to", tup)
-    return new_cells, new_routes
+            nk = ni*n_cols + nj
+            if visited[nk] or is_ground[ni][nj]:
+                continue
+            ng = 1 - neg_g
+            if ng < best_g.get(nk, ng+1):
+                best_g[nk] = ng
+                parent[nk] = k
+                heappush(open_heap, (ng + hscore((ni, nj), target_cell), -ng, nk))
+    raise ArithmeticError("No new discoverable cells, but no path found to target")
 
-def gscore(route: list):
-    return len(route)
 
-def hscore(cell: tuple, target: tuple):
-    return abs(cell[0]-target[0]) + abs(cell[1]-target[1])
+class FlowField():
+    """Stores, for every cell of a map, how many steps separate it from a common target cell 
+    and which adjacent cell is the next step towards that target. Built once with a reverse 
+    breadth-first search from the target, then shared by every enemy heading there."""
+    def __init__(self, target_cell: tuple, map: TerrainMap = None) -> None:
+        self.target_cell = target_cell
+        self.distances = []
+        self.next_cells = []
+        self.version = 0 # incremented on every rebuild, lets followers notice terrain changes
+        if map is not None:
+            self.rebuild(map)
+
+    def rebuild(self, map: TerrainMap):
+        """Recomputes the whole field. Must be called whenever the map's terrain changes."""
+        n_rows, n_cols = map.terrain.shape
+        is_ground = (map.terrain == GROUND).tolist()
+        self.distances = [[-1]*n_cols for i in range(n_rows)]
+        self.next_cells = [[None]*n_cols for i in range(n_rows)]
+        target_i, target_j = self.target_cell
+        self.distances[target_i][target_j] = 0
+        frontier = [self.target_cell]
+        while frontier:
+            new_frontier = []
+            for (i, j) in frontier:
+                for (ni, nj) in get_adjacent_cells(i, j):
+                    if ni<0 or nj<0 or ni>=n_rows or nj>=n_cols:
+                        continue # this cell is outside the map, skip it
+                    if self.distances[ni][nj] >= 0 or is_ground[ni][nj]:
+                        continue
+                    self.distances[ni][nj] = self.distances[i][j] + 1
+                    self.next_cells[ni][nj] = (i, j)
+                    new_frontier.append((ni, nj))
+            frontier = new_frontier
+
+        # ground cells are never part of a route, but an enemy can still end up on one (for 
+        # example when a platform is placed under it) : point those towards the best water
+        # cell next to them. This is done last so that it does not propagate any further.
+        escapes = []
+        for i in range(n_rows):
+            for j in range(n_cols):
+                if not is_ground[i][j]:
+                    continue
+                best_cell = None
+                for (ni, nj) in get_adjacent_cells(i, j):
+                    if ni<0 or nj<0 or ni>=n_rows or nj>=n_cols:
+                        continue
+                    if self.distances[ni][nj] < 0:
+                        continue # ground, or water with no route to the target
+                    if best_cell is None or self.distances[ni][nj] < self.distances[best_cell[0]][best_cell[1]]:
+                        best_cell = (ni, nj)
+                if best_cell:
+                    escapes.append((i, j, best_cell))
+        for (i, j, best_cell) in escapes:
+            self.distances[i][j] = self.distances[best_cell[0]][best_cell[1]] + 1
+            self.next_cells[i][j] = best_cell
+        self.version += 1
+
+    def distance(self, i: int, j: int) -> int:
+        """Number of steps from cell (i,j) to the target, or -1 if the target is unreachable"""
+        return self.distances[i][j]
 
-def fscore(cell: tuple, route: list, target: tuple):
-    return gscore(route) + hscore(cell, target)
+    def next_cell(self, i: int, j: int):
+        """Next cell to go to from cell (i,j), or None if (i,j) is the target or has no route"""
+        return self.next_cells[i][j]
 
-def find_path(start_cell: tuple, target_cell: tuple, map: list):
-    known_cells = [start_cell]
-    known_paths = [[start_cell]]
-    known_fscores = [fscore(cell=start_cell, route=[start_cell], target=target_cell)]
 
-    for k in range(226):
-        # get all new reachable cells
-        new_cells, new_routes = new_routing_options(known_cells, known_paths, map)
-        if len(new_cells) == 0:
-            raise ArithmeticError("No new discoverable cells, but no path found to target")
-        new_fscores = []
-        for nc, nr in zip(new_cells, new_routes):
-            new_fscores.append(fscore(cell=nc, route=nr, target=target_cell))
-        min_new_fscore = min(new_fscores)
+def find_blocking_cells(map: TerrainMap, target_cell: tuple, source_cells: list) -> set:
+    """Returns the set of cells that would cut at least one of the source_cells off from 
+    target_cell if they were turned into ground. Those are the articulation points of the water 
+    cells' graph that separate a source from the target, found with a single depth-first search 
+    rooted at the target (Tarjan's lowpoint method)."""
+    n_rows, n_cols = map.terrain.shape
+    is_ground = (map.terrain == GROUND).tolist()
+    discovery = [-1] * (n_rows*n_cols) # order in which the search reached each cell
+    lowpoint = [0] * (n_rows*n_cols) # earliest discovery reachable from a cell's subtree
+    sources_below = [0] * (n_rows*n_cols) # number of source cells in a cell's subtree
+    is_source = bytearray(n_rows*n_cols)
+    for (i, j) in source_cells:
+        is_source[i*n_cols + j] = 1
+    blocking_cells = set()
 
-        # keep paths to the new cells that achieve minimum f-score
-        for nc, nr, nf in zip(new_cells, new_routes, new_fscores):
-            if nf == min_new_fscore:
-                if nc[0] == target_cell[0] and nc[1] == target_cell[1]:
-                    # found the best path, exit function
-                    # print("found path after", k, "iterations")
-                    return nr
-                known_cells.append(nc)
-                known_paths.append(nr)
-                known_fscores.append(nf)
-    raise ArithmeticError("Could not find a path to target")
+    root_k = target_cell[0]*n_cols + target_cell[1]
+    discovery[root_k] = 0
+    counter = 1
+    # explicit stack of (cell index, parent cell index, neighbours left to explore)
+    stack = [(root_k, -1, iter(get_adjacent_cells(target_cell[0], target_cell[1])))]
+    while stack:
+        k, parent_k, neighbours = stack[-1]
+        went_deeper = False
+        for (ni, nj) in neighbours:
+            if ni<0 or nj<0 or ni>=n_rows or nj>=n_cols:
+                continue # this cell is outside the map, skip it
+            if is_ground[ni][nj]:
+                continue
+            nk = ni*n_cols + nj
+            if discovery[nk] == -1:
+                discovery[nk] = counter
+                lowpoint[nk] = counter
+                counter += 1
+                stack.append((nk, k, iter(get_adjacent_cells(ni, nj))))
+                went_deeper = True
+                break
+            elif nk != parent_k:
+                lowpoint[k] = min(lowpoint[k], discovery[nk])
+        if went_deeper:
+            continue
+        # all of cell k's neighbours have been explored, report back to its parent
+        stack.pop()
+        sources_below[k] += is_source[k]
+        if parent_k != -1:
+            lowpoint[parent_k] = min(lowpoint[parent_k], lowpoint[k])
+            sources_below[parent_k] += sources_below[k]
+            if lowpoint[k] >= discovery[parent_k] and sources_below[k] > 0:
+                # k's subtree can only reach the target through parent_k
+                blocking_cells.add(divmod(parent_k, n_cols))
+    return blocking_cells
@@ -1,23 +1,45 @@
 from arcade import Sprite, Texture
-from copy import deepcopy
 from math import atan2, pi, sqrt, cos, sin
-from random import random, randint
-from constants import FLAMES, MAP_WIDTH, SCREEN_HEIGHT, CHIN_HEIGHT, PROJECTILES, RAGE_PROJECTILES
+from constants import MAP_WIDTH, SCREEN_HEIGHT, CHIN_HEIGHT, PROJECTILES, RAGE_PROJECTILES
 from enemies import Enemy
-from explosions import FramedExplosion
+from explosions import ExplosionTemplate
 from runes import Rune
+from targeting import EnemyGrid
+from utils import Animated, Animation, GameContext, Pooled
 
-class Projectile(Sprite):
-    def __init__(self, scale: float = 1, speed: float = 2.0,
+class Projectile(Pooled, Sprite):
+    def __init__(self, context: GameContext, scale: float = 1, speed: float = 120,
                     center_x: float = 0, center_y: float = 0, angle: float = 0, angle_rate: float = 0,
                     target: Enemy = None, target_x: float = None, target_y: float = None, 
                     damage: float = 1, do_splash_damage: bool = False, splash_radius: float = 10, 
-                    impact_effect: FramedExplosion = None, is_retargeting: bool = False, 
+                    impact_effect: ExplosionTemplate = None, is_retargeting: bool = False, 
                     parent_tower: Sprite = None, effects: list = None, name: str = '', 
                     num_secondary_projectiles: int = 0, texture: Texture = None,
                     impact_sound: str = None):
-        super().__init__(scale=scale, center_x=center_x, 
-                         center_y=center_y, angle=angle, texture=texture)
+        super().__init__(texture=texture)
+        Projectile.reset(
+            self, context, scale=scale, speed=speed, center_x=center_x, center_y=center_y, angle=angle, 
+            angle_rate=angle_rate, target=target, target_x=target_x, target_y=target_y, 
+            damage=damage, do_splash_damage=do_splash_damage, splash_radius=splash_radius, 
+            impact_effect=impact_effect, is_retargeting=is_retargeting, parent_tower=parent_tower, 
+            effects=effects, name=name, num_secondary_projectiles=num_secondary_projectiles, 
+            texture=texture, impact_sound=impact_sound
+        )
+
+    def reset(self, context: GameContext, scale: float = 1, speed: float = 120,
+                    center_x: float = 0, center_y: float = 0, angle: float = 0, angle_rate: float = 0,
+                    target: Enemy = None, target_x: float = None, target_y: float = None, 
+                    damage: float = 1, do_splash_damage: bool = False, splash_radius: float = 10, 
+                    impact_effect: ExplosionTemplate = None, is_retargeting: bool = False, 
+                    parent_tower: Sprite = None, effects: list = None, name: str = '', 
+                    num_secondary_projectiles: int = 0, texture: Texture = None,
+                    impact_sound: str = None):
+        if texture is not None:
+            self.texture = texture
+        self.context = context
+        self.scale = scale
+        self.position = (center_x, center_y)
+        self.angle = angle
         self.speed = speed
         self.angle_rate = angle_rate
         self.target = target
@@ -30,6 +52,7 @@ class Projectile(Sprite):
         self.impact_effect = impact_effect
         self.is_retargeting = (is_retargeting and (parent_tower is not None))
         self.parent_tower = parent_tower
+        self.source = None # who gets credited for the damage, set by the Simulation
         if effects:
             self.effects = effects
         else:
@@ -50,6 +73,19 @@ class Projectile(Sprite):
         self.velocity = (self.speed*dx/norm, self.speed*dy/norm)
 
     def on_update(self, delta_time: float):
+        if self.is_retargeting and ((self.target is None) or (self.target.current_health <= 0)):
+            # our target is gone, take the tower's current one if we are still within its range
+            dx = self.center_x - self.parent_tower.center_x
+            dy = self.center_y - self.parent_tower.center_y
+            if dx*dx + dy*dy < self.parent_tower.range**2:
+                self.target = self.parent_tower.target
+            if (self.target is None) or (self.target.current_health <= 0):
+                # nothing to home onto for now : fly straight, and blow up once past the last
+                # target point like any static-target projectile
+                self.target = None
+                self.has_static_target = True
+            else:
+                self.has_static_target = False
         if not self.has_static_target:
             if (self.target is not None) and (self.target.current_health > 0):
                 self.target_x = self.target.center_x
@@ -57,9 +93,6 @@ class Projectile(Sprite):
                 # accelerate towards target and lose some speed
                 dx = self.target_x - self.center_x
                 dy = self.target_y - self.center_y
-                if self.name == 'flame_particle' and max(dx, dy) > 20:
-                    dx += random()*32-8
-                    dy += random()*32-8
                 norm = sqrt(dx*dx + dy*dy)
                 if norm == 0:
                     norm = 0.001
@@ -69,67 +102,51 @@ class Projectile(Sprite):
                 vy = self.velocity[1]
                 self.velocity = (0.67*vx+0.33*force_x, 0.67*vy + 0.33*force_y)
             else: # target is dead or nonexistent
-                if self.is_retargeting:
-                    # are we still within range of our tower ?
-                    dx = self.center_x - self.parent_tower.center_x
-                    dy = self.center_y - self.parent_tower.center_y
-                    dist2 = dx*dx + dy*dy
-                    if dist2 < self.parent_tower.range**2:
-                        self.target = self.parent_tower.target
-                else:
-                    self.target=None
-                    self.has_static_target = True
+                self.target=None
+                self.has_static_target = True
         if self.angle_rate:
             self.angle += self.angle_rate*delta_time
         else:
             self.angle = atan2(self.velocity[1], self.velocity[0])*180/pi
         if ((self.center_x > MAP_WIDTH + 20) or (self.center_x < -20) or 
                 (self.center_y > SCREEN_HEIGHT + 20) or (self.center_y < CHIN_HEIGHT - 20)):
-            self.remove_from_sprite_lists()
+            self.recycle()
         return super().on_update(delta_time)
 
-    def make_secondaries(self, all_enemies: list, not_allowed_targets: list):
+    def make_secondaries(self, enemy_grid: EnemyGrid, not_allowed_targets: set):
         '''After impacting the target, some projectiles launch fragments onto other enemies. 
         This function creates and returns those sub_projectiles.'''
 
         secondaries_list = []
-        for k in range(self.num_secondary_projectiles):
-            # pick a target
-            chosen_enemy = None
-            for enemy in all_enemies:
-                dx = enemy.center_x - self.center_x
-                dy = enemy.center_y - self.center_y
-                dist2 = dx**2 + dy**2
-                if dist2 < 10000 and (enemy not in not_allowed_targets):
-                    # we found an enemy to shoot, stop looping through enemies and lets go shoot it
-                    not_allowed_targets.append(enemy)
-                    chosen_enemy = enemy
-                    break
-            if not chosen_enemy:
-                # we did not find an enemy and the next sub-projectile won't either => exit sub creation loop
-                break
-
+        if self.num_secondary_projectiles <= 0:
+            return secondaries_list
+        # each fragment goes to a different enemy, picking the nearest ones within 100px first
+        chosen_enemies = enemy_grid.nearest(
+            x=self.center_x, y=self.center_y, k=self.num_secondary_projectiles, 
+            radius=100, exclude=not_allowed_targets
+        )
+        for chosen_enemy in chosen_enemies:
+            not_allowed_targets.add(chosen_enemy)
             # make a copy of self but weaker and with no subs
-            sub_proj = Projectile(
+            sub_proj = Projectile.make(
+                self.context,
                 scale=self.scale/2, speed=self.speed,
                 center_x=self.center_x, center_y=self.center_y, angle_rate=self.angle_rate,
                 target=chosen_enemy if self.target else None, 
                 target_x=chosen_enemy.center_x, target_y=chosen_enemy.center_y, 
                 damage=self.damage/2, do_splash_damage=self.do_splash_damage, 
-                splash_radius=self.splash_radius/1.4, impact_effect=deepcopy(self.impact_effect), 
-                is_retargeting=False, parent_tower=None, effects=deepcopy(self.effects), 
+                splash_radius=self.splash_radius/1.4, impact_effect=self.impact_effect, 
+                is_retargeting=False, parent_tower=None, effects=[eff.scaled(0.5) for eff in self.effects], 
                 name='sub-'+self.name, num_secondary_projectiles=0, 
                 texture=self._texture 
             )
-            for k in range(len(sub_proj.effects)):
-                sub_proj.effects[k].duration_remaining /= 2
             secondaries_list.append(sub_proj)
         return secondaries_list
 
 
 class Falcon(Projectile):
     def __init__(self, parent_tower):
-        super().__init__(texture=PROJECTILES['falcon'], speed=2.5, 
+        super().__init__(parent_tower.context, texture=PROJECTILES['falcon'], speed=150, 
                          center_x=parent_tower.center_x, center_y=parent_tower.center_y, angle=90, 
                          target_x=parent_tower.center_x, target_y=parent_tower.center_y+100, 
                          damage=parent_tower.damage, is_retargeting=True, parent_tower=parent_tower, name='falcon')
@@ -211,61 +228,32 @@ class Falcon(Projectile):
         return damage
 
 
-class FlameParticle(Projectile):
-    def __init__(self, tower_x: float, tower_y: float, tower_angle: float, enemy: Enemy, damage: float):
-        # choose random coords near the "mouth" of the tower's nozzle
-        r0 = 32
-        theta = (tower_angle+90)*pi/180
-        sigma_t = 6
-        randsigned = random()*2 - 1
-        dt = sigma_t*randsigned 
-        dr = -16*(1-abs(dt)/sigma_t) # spawning "surface" is v-shaped along radial direction
-        center_x = tower_x + r0*cos(theta) + dr*cos(theta) + dt*sin(theta)
-        center_y = tower_y + r0*sin(theta) + dr*sin(theta) - dt*cos(theta)
-
-        super().__init__(
-            speed=4.0, scale=1.0, center_x=center_x, center_y=center_y, angle=0, angle_rate=0, 
-            target=enemy, target_x=enemy.center_x, target_y=enemy.center_y, damage=damage, 
-            do_splash_damage=False, is_retargeting=False, name='flame_particle', 
-            texture=FLAMES[randint(0, 7)]
-        )
-
+RAGE_BLAST_ANIMATION = Animation.compile([0.04*k for k in range(13)], list(range(12)) + [0])
 
-class RageBlast(Projectile):
-    def __init__(self, center_x: float = 0, center_y: float = 0, angle: float = 0, 
+class RageBlast(Animated, Projectile):
+    def __init__(self, context: GameContext, center_x: float = 0, center_y: float = 0, angle: float = 0, 
                  target: Enemy = None, damage: float = 30):
-        super().__init__(scale=0.35, speed=5, center_x=center_x, center_y=center_y, angle=angle,
-                         angle_rate=0, target=target, target_x=target.center_x, 
-                         target_y=target.center_y, damage=damage, do_splash_damage=False, 
-                         name='rage-bomb', num_secondary_projectiles=4, texture=PROJECTILES['stone_shard']
-        )
+        super().__init__(context, target=target, texture=PROJECTILES['stone_shard'])
         for tx in RAGE_PROJECTILES:
             self.append_texture(tx)
+        self.reset(context, center_x=center_x, center_y=center_y, angle=angle, target=target, damage=damage)
+
+    def reset(self, context: GameContext, center_x: float = 0, center_y: float = 0, angle: float = 0, 
+                 target: Enemy = None, damage: float = 30):
+        super().reset(context, scale=0.35, speed=300, center_x=center_x, center_y=center_y, angle=angle,
+                      angle_rate=0, target=target, target_x=target.center_x, 
+                      target_y=target.center_y, damage=damage, do_splash_damage=False, 
+                      name='rage-bomb', num_secondary_projectiles=4
+        )
         self.set_texture(0)
-        self.frame_indx = 0
-        self.transition_times = [0.04*k for k in range(13)]
-        self.transition_indxs = list(range(12)) + [0]
-        self.animation_time = 0
+        self.start_animation(RAGE_BLAST_ANIMATION, context.effect_clock)
 
     def on_update(self, delta_time: float):
-        self.animation_time += delta_time
-        # animation time cannot exceed return-to-zero time
-        while self.animation_time  >= self.transition_times[-1]: 
-            self.animation_time  -= self.transition_times[-1]
-        # find the index of the texture we should be using from now on : 
-        for (k, transition_k_time) in enumerate(self.transition_times):
-            if self.animation_time < transition_k_time:
-                # we haven't passed transition k yet, but it's the next one 
-                new_frame_indx = self.transition_indxs[k-1]
-                break
-        # update the texture if needed
-        if new_frame_indx != self.frame_indx:
-            self.set_texture(new_frame_indx)
-            self.frame_indx = new_frame_indx
+        self.update_frame()
         return super().on_update(delta_time)
     
-    def make_secondaries(self, all_enemies: list, not_allowed_targets: list):
+    def make_secondaries(self, enemy_grid: EnemyGrid, not_allowed_targets: set):
         # switch my texture so that the secondaries will also use this texture
         self._texture = PROJECTILES['stone_shard']
         self.scale = 0.5
-        return super().make_secondaries(all_enemies, not_allowed_targets)
+        return super().make_secondaries(enemy_grid, not_allowed_targets)
@@ -1,7 +1,7 @@
 from arcade import draw_scaled_texture_rectangle
 from constants import MINI_RUNES, RUNE_ICONS, RUNE_ICONS_EXTENDED, RUNE_PREVIEW
-from effects import Inflame, Freeze
-from utils import AnimatedSprite
+from effects import INFLAME, FREEZE
+from utils import AnimatedSprite, AnimationClock
 
 
 class Rune():
@@ -64,7 +64,7 @@ class Tiwaz(Rune):
 class Kenaz(Rune):
     def __init__(self) -> None:
         super().__init__(name='kenaz', cost=100)
-        self.effect = Inflame()
+        self.effect = INFLAME
     
     def make_another(self):
         return Kenaz()
@@ -73,7 +73,7 @@ class Kenaz(Rune):
 class Isa(Rune):
     def __init__(self) -> None:
         super().__init__(name='isa', cost=100)
-        self.effect = Freeze()
+        self.effect = FREEZE
     
     def make_another(self):
         return Isa()
@@ -96,8 +96,8 @@ class Laguz(Rune):
 
 
 class MiniRune(AnimatedSprite):
-    def __init__(self, rune: Rune, center_x: float = 0, center_y: float = 0):
+    def __init__(self, rune: Rune, clock: AnimationClock, center_x: float = 0, center_y: float = 0):
         super().__init__(texture_list=MINI_RUNES[rune.name] ,
                          transition_times=[0.04*k for k in range(len(MINI_RUNES[rune.name])+1)], 
                          transition_indxs=list(range(len(MINI_RUNES[rune.name])))+[0], 
-                         center_x=center_x, center_y=center_y)
+                         center_x=center_x, center_y=center_y, clock=clock)
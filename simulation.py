@@ -0,0 +1,784 @@
+import csv
+import arcade
+import numpy as np
+from math import floor
+from random import randrange
+from time import perf_counter
+from abilities import MjolnirAbility, SellTowerAbility, PlatformAbility, CommandAbility, HarvestAbility
+from constants import (is_debug, SCREEN_HEIGHT, MAP_WIDTH, CHIN_HEIGHT, CELL_SIZE, MAP_TARGET_J,
+                       SIM_TIME_STEP, MAX_STEPS_PER_FRAME)
+from effects import EffectTemplate, TimedEffects
+from enemies import Enemy
+from enemy_table import EnemyTable
+from explosions import AirExplosion, WaterExplosion, RuneApplyMarker
+from grid import TerrainMap, GROUND, DEEP, cell_centerxy, nearest_cell_centerxy, nearest_cell_ij
+from particles import FlameParticleSystem
+from pathfind import FlowField
+from projectiles import Projectile
+from runes import Rune, Raidho, Hagalaz, Tiwaz, Kenaz, Isa, Sowil, Laguz
+from shop import ShopItem
+from targeting import EnemyGrid, TargetingOrder, swept_arrivals
+from towers import (Tower, WatchTower, Catapult, FalconCliff, Bastion, GreekFire,
+                    OakTreeTower, StoneHead, SparklingPillar, QuarryOfRage, SanctumOfTempest,
+                    TempleOfThor, Forge, TempleOfOdin, ChamberOfTheChief, TempleOfFreyr)
+from utils import GameContext, move_sprites
+from waves import Wave, WaveMaker
+
+
+class Simulation():
+    """Everything that happens in a game of a given map : map, waves, money, towers, enemies,
+    projectiles and quests. Advances with step(), and never draws nor plays anything, so that
+    it can run without a window. Sounds and messages meant for the player are queued in
+    pending_sounds and pending_messages, for whoever displays the game to pick up.
+    The game time only moves in fixed steps of SIM_TIME_STEP, and all the randomness comes from
+    streams seeded with seed, so the same seed and the same player actions (at the same steps)
+    always give the same game."""
+    def __init__(self, map_number: int, is_freeplay: bool = False, seed: int = None):
+        if seed is None:
+            seed = randrange(2**32)
+        self.seed = seed
+        self.context = GameContext(seed) # random streams and animation clocks of this game only
+        self.steps_done = 0
+        self.unsimulated_time = 0.0 # frame time that didn't add up to a whole step yet
+        self.advance_duration = 0.0 # real time taken by the latest advance(), in seconds
+        self.map_number = map_number
+        self.is_freeplay = is_freeplay
+        if self.is_freeplay:
+            self.wave_maker = WaveMaker(self.context)
+        else:
+            self.wave_maker = None
+        self.wave_is_happening = False
+        self.wave_number = 0
+        self.money = 500 + 1500*is_debug
+        self.population = 10
+        self.income_score = 0
+        self.enemies_left_to_spawn = 0
+        self.next_enemy_index = 0
+        self.time_to_next_spawn = 1.0
+        self.pending_sounds = [] # (sound name, volume) pairs
+        self.pending_messages = [] # (message, sound name) pairs
+        self.damage_dealt = {} # damage done to enemies, by tower (or ability), None is for burning
+        self.abilities_list = [SellTowerAbility(), MjolnirAbility(self.context), PlatformAbility(), CommandAbility(), HarvestAbility()]
+        self.runes_list = [Raidho(), Hagalaz(), Tiwaz(), Kenaz(), Isa(), Sowil(), Laguz()]
+        self.runes_unlocked = [False, False, False, False, False, False, False]
+        self.abilities_unlocked = [True, False, False, False, False]
+        self.load_shop_items() # first index is page, second is position in page
+        self.load_map("./files/map"+str(map_number)+".txt")
+        self.load_waves("./files/map"+str(map_number)+"CampaignWaves.csv")
+        self.platforms = arcade.SpriteList()
+        self.enemy_effects = arcade.SpriteList()
+        self.enemies_list = arcade.SpriteList()
+        self.enemy_table = EnemyTable(deep_water=self.deep_water)
+        self.timed_effects = TimedEffects(self.enemy_table, self.context.effect_rng)
+        self.swimmers_list = arcade.SpriteList()
+        self.flyers_list = arcade.SpriteList()
+        self.towers_list = arcade.SpriteList()
+        self.minirunes_list = arcade.SpriteList()
+        self.projectiles_list = arcade.SpriteList()
+        self.effects_list = arcade.SpriteList()
+        self.water_explosions_list = arcade.SpriteList()
+        self.all_sprites = arcade.SpriteList()
+        self.enemy_grid = EnemyGrid()
+        self.targeting_order = TargetingOrder()
+        self.flame_system = FlameParticleSystem(self.context.particle_rng)
+        self.time_to_next_wave = self.intermission_duration()
+
+    def load_shop_items(self):
+        self.shop_listlist = [[ # start Combat towers
+                ShopItem(is_unlocked=True, is_unlockable=False, 
+                        thumbnail="images/towers/WatchtowerThumbLarge.png",
+                        cost=100, tower=WatchTower(self.context)), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=True,
+                        thumbnail="images/towers/CatapultThumbLarge.png",
+                        cost=200, tower=Catapult(self.context), quest="Destroy 10 enemies", 
+                        quest_thresh=10, quest_var_name="enemies killed"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
+                        thumbnail="images/towers/FalconCliffThumbLarge.png",
+                        cost=500, tower=FalconCliff(self.context), quest="Destroy 25 flying enemies", 
+                        quest_thresh=25, quest_var_name="flying enemies killed"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False,
+                        thumbnail="images/towers/BastionThumbLarge.png",
+                        cost=650, tower=Bastion(self.context), quest="Place 10 platforms", 
+                        quest_thresh=10, quest_var_name="platforms placed"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
+                        thumbnail="images/towers/GreekFireThumbLarge.png",
+                        cost=1000, tower=GreekFire(self.context), quest="Inflame 20 enemies", 
+                        quest_thresh=20, quest_var_name="enemies inflamed")
+            ], [ # start Sacred towers
+                ShopItem(is_unlocked=True, is_unlockable=False, 
+                        thumbnail="images/towers/SacredOakThumbLarge.png",
+                        cost=120, tower=OakTreeTower(self.context)), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=True, 
+                        thumbnail="images/towers/StoneHeadThumbLarge.png",
+                        cost=180, tower=StoneHead(self.context), quest="Plant 5 Sacred Oaks", 
+                        quest_thresh=5, quest_var_name="current oaks"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
+                        thumbnail="images/towers/SparklingPillarThumbLarge.png",
+                        cost=400, tower=SparklingPillar(self.context), quest="Destroy 4 enemies with 1\nmjolnir", 
+                        quest_thresh=4, quest_var_name="max mjolnir kills"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False,
+                        thumbnail="images/towers/QuarryOfRageThumbLarge.png",
+                        cost=650, tower=QuarryOfRage(self.context), quest="Destroy 3 submerged enemies", 
+                        quest_thresh=3, quest_var_name="submerged enemies killed"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False,
+                        thumbnail="images/towers/SanctumOfTempestThumbLarge.png",
+                        cost=1000, tower=SanctumOfTempest(self.context), quest="Freeze 20 enemies", 
+                        quest_thresh=20, quest_var_name="enemies frozen")
+            ], [ # start Buildings
+                ShopItem(is_unlocked=is_debug, is_unlockable=True,
+                        thumbnail="images/towers/ThorTempleThumbLarge.png",
+                        cost=300, tower=TempleOfThor(self.context), quest="Destroy 20 enemies", 
+                        quest_thresh=20, quest_var_name="enemies killed"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False,
+                        thumbnail="images/towers/ForgeThumbLarge.png",
+                        cost=500, tower=Forge(self.context), quest="Build 15 structures", 
+                        quest_thresh=15, quest_var_name="current structures"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False,
+                        thumbnail="images/towers/OdinTempleThumbLarge.png",
+                        cost=700, tower=TempleOfOdin(self.context), quest="Enchant 12 towers with runes", 
+                        quest_thresh=12, quest_var_name="current enchanted towers"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
+                        thumbnail="images/towers/ChamberChiefThumbLarge.png",
+                        cost=1200, tower=ChamberOfTheChief(self.context), quest="Reach 3000 gold", 
+                        quest_thresh=3000, quest_var_name="current gold"), 
+                ShopItem(is_unlocked=is_debug, is_unlockable=False, 
+                        thumbnail="images/towers/FreyrTempleThumbLarge.png",
+                        cost=1500, tower=TempleOfFreyr(self.context), quest="Build 3 temples", 
+                        quest_thresh=3, quest_var_name="current_temples")
+            ]]
+        
+        self.quest_tracker = {
+            "enemies killed": 0, "flying enemies killed": 0, "submerged enemies killed": 0,
+            "enemies inflamed": 0, "enemies frozen": 0, "platforms placed": 0,
+            "max mjolnir kills": 0, "current oaks": 0, "current temples": 0, 
+            "current structures": 0, "current enchanted towers": 0, "current gold": 0, 
+            "_" : None # tracker used for pre-unlocked towers
+        }
+
+    def load_map(self, filename):
+        with open(filename, mode="r") as mapfile:
+            map_string_list = mapfile.readlines()
+        map_rows = [map_rowstr.rstrip() for map_rowstr in map_string_list]
+        # last row is all-water for enemy targeting reasons
+        map_rows.append("s"*len(map_rows[-1]))
+        self.map_cells = TerrainMap.from_rows(map_rows)
+        # deep water never turns into anything else, underwater enemies can hide there
+        self.deep_water = (self.map_cells.terrain == DEEP)
+        # all floating enemies head to the same exit cell, so they can share a single route map
+        self.flow_field = FlowField(target_cell=(15, MAP_TARGET_J), map=self.map_cells)
+
+        # check which cells are safe for spawning floating enemies
+        self.spawnable_cell_js = np.flatnonzero(self.map_cells.terrain[0] != GROUND).tolist()
+
+        self.abilities_list[2] = PlatformAbility(map_reference=self.map_cells)
+
+
+    def load_waves(self, filename):
+        self.wave_list = []
+        if self.is_freeplay:
+            for k in range(4):
+                self.wave_list.append(self.wave_maker.make_wave())
+        else:
+            with open(filename, mode='r', newline='') as csvfile:
+                wave_reader = csv.reader(csvfile, delimiter=',', quotechar='|')
+                next(wave_reader) # skip header
+                for row in wave_reader:
+                    self.wave_list.append(Wave(
+                        self.context,
+                        number=row[0], 
+                        modifier=row[1],
+                        rank=row[2],
+                        type1=row[3],
+                        quant1=row[4],
+                        type2=row[5], 
+                        quant2=row[6], 
+                        type3=row[7],
+                        quant3=row[8]
+                    ))
+
+    def intermission_duration(self) -> float:
+        """Time (in s) between the end of a wave and the start of the next one"""
+        if self.map_number < 3:
+            return 90
+        elif self.map_number == 3:
+            return 75
+        else:
+            return 60
+
+    @property
+    def outcome(self) -> str:
+        """'lost' or 'won' once the game is over, None while it is still going"""
+        if self.population <= 0:
+            return 'lost'
+        elif self.wave_number >= len(self.wave_list) and not self.wave_is_happening:
+            return 'won'
+        return None
+
+    def play_sound(self, sound_name: str, volume: float = 1.0):
+        self.pending_sounds.append((sound_name, volume))
+
+    def show_message(self, message: str, sound_name: str = None):
+        self.pending_messages.append((message, sound_name))
+
+    def advance(self, frame_time: float, speed: int = 1, time_budget: float = None) -> int:
+        """Runs as many steps as fit in frame_time seconds (times speed, for fast forward), plus
+        whatever time was left over by previous calls. Returns the number of steps taken.
+        Once the steps have used up time_budget seconds of real time, the remaining game time
+        is dropped, so that a game too heavy for its speed runs slower instead of lagging."""
+        self.unsimulated_time += frame_time*speed
+        started_at = perf_counter()
+        step_duration = 0.0
+        n_steps = 0
+        while self.unsimulated_time >= SIM_TIME_STEP:
+            is_over_budget = (time_budget is not None and n_steps > 0 
+                              and perf_counter() - started_at + step_duration > time_budget)
+            if n_steps == MAX_STEPS_PER_FRAME*speed or is_over_budget: # too far behind, give up on that time
+                self.unsimulated_time = 0.0
+                break
+            step_started_at = perf_counter()
+            self.step()
+            step_duration = perf_counter() - step_started_at
+            self.unsimulated_time -= SIM_TIME_STEP
+            n_steps += 1
+        self.advance_duration = perf_counter() - started_at
+        return n_steps
+
+    def step(self, delta_time: float = SIM_TIME_STEP):
+        """Advances the whole game by delta_time seconds, which should stay SIM_TIME_STEP
+        for the game to be reproducible"""
+        self.steps_done += 1
+        # update some animations
+        self.context.building_clock.tick(delta_time)
+        self.minirunes_list.on_update(delta_time=delta_time)
+
+        # check for projectile impacts
+        self.enemy_grid.rebuild(self.targeting_order.refresh())
+        self.perform_impacts(delta_time=delta_time)
+        self.perform_flame_impacts(delta_time=delta_time)
+
+        self.perform_enemy_actions(delta_time=delta_time)
+        self.perform_tower_attacks(delta_time=delta_time)
+        self.update_wave_progress(delta_time=delta_time)
+        self.update_quests()
+        self.update_abilities_and_runes(delta_time=delta_time)
+
+        # move and delete sprites if needed
+        self.enemy_table.on_update(delta_time)
+        self.timed_effects.on_update(delta_time)
+        self.context.enemy_clock.tick(delta_time)
+        self.enemies_list.on_update(delta_time)
+        self.towers_list.on_update(delta_time)
+        self.context.effect_clock.tick(delta_time)
+        move_sprites(self.projectiles_list.sprite_list, delta_time)
+        self.projectiles_list.on_update(delta_time)
+        self.flame_system.on_update(delta_time)
+        self.effects_list.on_update(delta_time)
+        self.water_explosions_list.on_update(delta_time)
+
+    def update_abilities_and_runes(self, delta_time: float):
+        # update cooldowns
+        for ability in self.abilities_list:
+            if ability is not None:
+                ability.on_update(delta_time)
+        
+        # update unlocks
+        if is_debug:
+            self.abilities_unlocked = [True]*len(self.abilities_unlocked)
+            self.runes_unlocked = [True]*len(self.runes_unlocked)
+            return
+        self.abilities_unlocked = [True, False, False, False, False]
+        self.runes_unlocked = [False]*len(self.runes_unlocked)
+        for tower in self.towers_list.sprite_list:
+            if not tower.is_2x2:
+                continue
+            if tower.name == "Temple of Thor":
+                self.abilities_unlocked[1] = True
+                self.runes_unlocked[0] = True
+            elif tower.name == "Forge":
+                 self.abilities_unlocked[2] = True
+                 self.runes_unlocked[1] = True
+            elif tower.name == "Temple of Odin":
+                self.runes_unlocked[2] = True
+                self.runes_unlocked[3] = True
+                self.runes_unlocked[4] = True
+            elif tower.name == "Chamber of the Chief":
+                self.abilities_unlocked[3] = True
+                self.runes_unlocked[5] = True
+            elif tower.name == "Temple of Freyr":
+                self.abilities_unlocked[4] = True
+                self.runes_unlocked[6] = True
+
+    def perform_enemy_actions(self, delta_time: float):
+        # take damage from dps effects:
+        table = self.enemy_table
+        burning = np.flatnonzero(table.active & (table.damage_per_second > 0))
+        for enemy, dps in [(table.enemies[k], table.damage_per_second[k]) for k in burning.tolist()]:
+            self.process_enemy_damage(enemy, dps*delta_time)
+
+        # check if any enemies get kills
+        for enemy in self.enemies_list.sprite_list:
+            if enemy.center_y <= CHIN_HEIGHT - 0.4*CELL_SIZE:
+                self.population -= 1
+                self.play_sound('VillageChaos')
+                enemy.remove_from_sprite_lists()
+
+        # underwater enemies hide and unhide by themselves, see EnemyTable.update_hiding()
+    
+    def update_wave_progress(self, delta_time: float):
+        if self.wave_is_happening:
+            # spawn next enemy, if needed, and decrement enemies_left_to_spawn
+            if self.enemies_left_to_spawn > 0:
+                if self.time_to_next_spawn <= 0.0: # time to spawn new enemy
+                    new_enemy = self.wave_list[self.wave_number-1].spawn(self.next_enemy_index)
+                    new_enemy.bottom = SCREEN_HEIGHT
+                    if new_enemy.is_flying:
+                        new_enemy.left = self.context.spawn_rng.randint(0, floor(MAP_WIDTH-new_enemy.width))
+                        if (new_enemy.left < 2*CELL_SIZE) or (new_enemy.right > MAP_WIDTH-2*CELL_SIZE):
+                            new_enemy.left = self.context.spawn_rng.randint(0, floor(MAP_WIDTH-new_enemy.width)) # re-roll the dice
+                    else:
+                        test_j = 99
+                        while test_j not in self.spawnable_cell_js:
+                            test_j = self.context.spawn_rng.randint(0, len(self.map_cells[0]))
+                        new_enemy.center_x, _ = cell_centerxy(i=0, j=test_j)
+                        new_enemy.follow_flow_field(self.flow_field)
+                    self.enemies_list.append(new_enemy)
+                    self.enemy_table.add(new_enemy)
+                    self.targeting_order.add(new_enemy)
+                    if new_enemy.is_flying:
+                        self.flyers_list.append(new_enemy)
+                    else:
+                        self.swimmers_list.append(new_enemy)
+                    self.all_sprites.append(new_enemy)
+                    if new_enemy.buff_sprite:
+                        self.enemy_effects.append(new_enemy.buff_sprite)
+                        self.all_sprites.append(new_enemy.buff_sprite)
+                    self.enemies_left_to_spawn -= 1
+                    self.next_enemy_index += 1
+                    self.time_to_next_spawn = 0.25 + self.context.spawn_rng.random()*1.5 # seconds
+                else:
+                    self.time_to_next_spawn -= delta_time
+            # check if wave is over 
+            elif self.enemies_left_to_spawn == 0 and len(self.enemies_list.sprite_list) == 0:
+                self.wave_is_happening = False
+                self.time_to_next_wave = self.intermission_duration()
+                if self.is_freeplay:
+                    self.wave_list.append(self.wave_maker.make_wave())
+                for tower in self.towers_list.sprite_list:
+                    if tower.name == 'Sanctum of Tempest':
+                        tower.hit_counter = 0
+                        tower.set_texture(0)
+        else: # wave is not happening
+            # use the idle time to build the next wave's enemies, a few per frame
+            if self.wave_number < len(self.wave_list):
+                self.wave_list[self.wave_number].prepare(max_enemies=2)
+            self.time_to_next_wave -= delta_time
+            if self.time_to_next_wave <= 0:
+                self.start_wave()
+
+    def perform_tower_attacks(self, delta_time: float):
+        # sort enemies by increasing priority (low priority will be attacked first)
+        self.enemy_grid.rebuild(self.targeting_order.refresh())
+        for tower in self.towers_list.sprite_list:  
+            # only the first enemy each tower can see gets targeted
+            enemy = tower.find_target(self.enemy_grid)
+            if enemy is not None: 
+                tower.aim_to(enemy)
+                if tower.cooldown_remaining <= 0: # ready to fire
+                    # an attack happens
+                    dmg, projlist, soundlist = tower.attack(enemy)
+                    for sound_name in soundlist:
+                        self.play_sound(sound_name)
+                    if dmg > 0 and (tower.has_rune('kenaz') or tower.has_rune('isa')):
+                        thresh = 0.05
+                        if tower.name == "Falcon Cliff":
+                            if dmg == 0:
+                                thresh = 0 # zero probability of setting effect
+                            else:
+                                thresh *= delta_time # probability per second is 1-(1-0.05*dt)^(1/dt) = ~0.049
+                        if self.context.tower_rng.random() < thresh:
+                            self.inflict_effect(enemy, tower.rune.effect)
+                    
+                    self.process_enemy_damage(enemy, dmg, source=tower)
+                    # deal with projectiles created by tower.attack()
+                    for proj in projlist: 
+                        proj.source = tower
+                        self.projectiles_list.append(proj)
+                        self.all_sprites.append(proj)
+                else : # not ready to fire
+                    tower.cooldown_remaining -= delta_time
+                    if tower.cooldown_remaining < 0.0:
+                        tower.cooldown_remaining = 0.0
+            else: # tower did not see any enemy
+                tower.cooldown_remaining -= delta_time
+                if tower.cooldown_remaining < 0.0:
+                    tower.cooldown_remaining = 0.0
+
+    def perform_impact(self, projectile: Projectile):
+        if projectile.do_splash_damage:
+            projectile_kills = 0
+
+            # only look at the enemies near the impact. enemies_within() returns a copy, 
+            # which copes with removal(s) during the loop
+            splashed_enemies = self.enemy_grid.enemies_within(
+                x=projectile.target_x, y=projectile.target_y, radius=projectile.splash_radius
+            )
+            for enemy in splashed_enemies:
+                # Found an enemy that will take some damage and/or effects
+                for eff in projectile.effects:
+                    self.inflict_effect(enemy, eff)
+                got_kill = self.process_enemy_damage(enemy, damage=projectile.damage, source=projectile.source)
+                if got_kill:
+                    projectile_kills += 1
+            if projectile.damage == 100: # this is a mjolnir
+                if projectile_kills > self.quest_tracker["max mjolnir kills"]:
+                    self.quest_tracker["max mjolnir kills"] = projectile_kills
+        else: # projectiles that do not have AoE damage
+            if projectile.target is None: # sad, useless projectile
+                # create secondary projectiles if needed
+                sub_projectiles = projectile.make_secondaries(
+                    enemy_grid=self.enemy_grid, 
+                    not_allowed_targets=set()
+                )
+                for sub in sub_projectiles:
+                    sub.source = projectile.source
+                    self.projectiles_list.append(sub)
+                    self.all_sprites.append(sub)
+                projectile.recycle()
+                return
+            # if we reach this point, the projectile is not useless and will effect its target
+            for eff in projectile.effects:
+                self.inflict_effect(projectile.target, eff)
+            self.process_enemy_damage(enemy=projectile.target, damage=projectile.damage, source=projectile.source)
+        # ""pretty"" explosions
+        if projectile.impact_effect:
+            explosion = projectile.impact_effect.make(
+                self.context,
+                center_x=projectile.target_x, center_y=projectile.target_y
+            )
+            self.effects_list.append(explosion)
+            self.all_sprites.append(explosion)
+            if explosion.sound_name:
+                self.play_sound(explosion.sound_name)
+        elif projectile.impact_sound:
+            self.play_sound(projectile.impact_sound)
+        # create secondary projectiles if needed
+        sub_projectiles = projectile.make_secondaries(
+            enemy_grid = self.enemy_grid, 
+            not_allowed_targets = {projectile.target} if projectile.target else set()
+            )
+        for sub in sub_projectiles:
+            sub.source = projectile.source
+            self.projectiles_list.append(sub)
+            self.all_sprites.append(sub)
+        projectile.recycle()
+
+    def perform_impacts(self, delta_time: float):
+        """Finds every projectile that reaches its target during the next delta_time seconds of
+        movement, in a single vectorized pass, then resolves those impacts"""
+        flying = [proj for proj in self.projectiles_list.sprite_list if proj.name != 'falcon']
+        if not flying:
+            return
+        arrived = swept_arrivals(
+            x=np.array([proj.center_x for proj in flying]), 
+            y=np.array([proj.center_y for proj in flying]), 
+            move_x=np.array([proj.velocity[0] for proj in flying])*delta_time, 
+            move_y=np.array([proj.velocity[1] for proj in flying])*delta_time, 
+            target_x=np.array([proj.target_x for proj in flying]), 
+            target_y=np.array([proj.target_y for proj in flying]), 
+            reach=np.array([proj.speed for proj in flying])*delta_time/2, 
+            is_ballistic=np.array([proj.has_static_target for proj in flying])
+        )
+        for k in np.flatnonzero(arrived).tolist():
+            self.perform_impact(flying[k])
+
+    def perform_flame_impacts(self, delta_time: float):
+        """Same as perform_impact, for the Greek Fire particles that reached their target"""
+        for hit in self.flame_system.find_impacts(delta_time):
+            if hit.target is not None:
+                if hit.effect:
+                    self.inflict_effect(hit.target, hit.effect)
+                self.process_enemy_damage(enemy=hit.target, damage=hit.damage, source=hit.source)
+            if hit.num_secondaries <= 0:
+                continue
+            # weaker particles, with no jitter and no subs, go to the nearest other enemies
+            chosen_enemies = self.enemy_grid.nearest(
+                x=hit.x, y=hit.y, k=hit.num_secondaries, radius=100, 
+                exclude={hit.target} if hit.target else None
+            )
+            for chosen_enemy in chosen_enemies:
+                self.flame_system.spawn(
+                    x=hit.x, y=hit.y, target=chosen_enemy if hit.target else None, 
+                    target_x=chosen_enemy.center_x, target_y=chosen_enemy.center_y, 
+                    damage=hit.damage/2, speed=hit.speed, 
+                    effect=hit.effect.scaled(0.5) if hit.effect else None, 
+                    texture_indx=hit.texture_indx, has_jitter=False, scale=0.5, source=hit.source
+                )
+
+    def inflict_effect(self, enemy: Enemy, template: EffectTemplate):
+        """Sets the effect described by template on the enemy, and updates quests"""
+        effect = self.timed_effects.inflict(enemy, template)
+        if effect:
+            self.all_sprites.append(effect)
+        if template.name == 'freeze':
+            self.quest_tracker['enemies frozen'] += 1
+        elif template.name == 'inflame':
+            self.quest_tracker['enemies inflamed'] += 1
+
+    def process_enemy_damage(self, enemy: Enemy, damage: float, source = None) -> bool:
+        """Inflicts damage, updates money and quests, initializes death animations. Returns True if the enemy died.
+        The damage actually taken (after shields, without overkill) is credited to source in self.damage_dealt"""
+        health_before = max(enemy.current_health, 0)
+        earnings = enemy.take_damage_give_money(damage=damage)
+        taken = health_before - max(enemy.current_health, 0)
+        if taken > 0:
+            self.damage_dealt[source] = self.damage_dealt.get(source, 0) + taken
+        self.money += earnings
+        self.income_score += earnings
+        # did the enemy die ?
+        if earnings > 0:
+            self.quest_tracker["enemies killed"] += 1
+            if enemy.is_flying:
+                self.quest_tracker["flying enemies killed"] += 1
+                explosion = AirExplosion.make(self.context, center_x=enemy.center_x, center_y=enemy.center_y, scale=enemy.width/35)
+                self.play_sound('AirDeath', volume=0.5)
+                self.effects_list.append(explosion)
+            else:
+                explosion = WaterExplosion.make(self.context, center_x=enemy.center_x, center_y=enemy.center_y, scale=enemy.width/35)
+                self.play_sound('WaterDeath', volume=0.5)
+                self.water_explosions_list.append(explosion)
+                if enemy.is_hidden:
+                    self.quest_tracker["submerged enemies killed"] += 1
+            self.all_sprites.append(explosion)
+            return True
+        return False
+
+
+    def find_tower_price(self, tower_name):
+        for shop_list in self.shop_listlist:
+            for shop_item in shop_list:
+                if shop_item.tower.name == tower_name:
+                    return shop_item.cost
+        return 0
+
+    def update_quests(self):
+        # 1. update the state-based quests in the self.quest_tracker
+        # (event-based quests are updated wherever the relevant events happen)
+        temples = 0
+        oaks = 0
+        runed_towers = 0
+        for tower in self.towers_list.sprite_list:
+            if "temple" in tower.name.lower():
+                temples += 1
+            elif tower.name == "Sacred Oak":
+                oaks += 1
+            if tower.has_rune('any'):
+                runed_towers += 1
+        self.quest_tracker["current oaks"] = oaks
+        self.quest_tracker["current_temples"] = temples
+        self.quest_tracker["current structures"] = len([tower for tower in self.towers_list.sprite_list if 'base' not in tower.name.lower()])
+        self.quest_tracker["current gold"] = self.money
+        self.quest_tracker["current enchanted towers"] = runed_towers
+
+        # 2. use self.quest_tracker to update each shopitem and perform unlocks
+        for shop_list in self.shop_listlist:
+            for k, shop_item in enumerate(shop_list):
+                if shop_item.is_unlockable and not shop_item.is_unlocked:
+                    shop_item.quest_progress = self.quest_tracker[shop_item.quest_var_name]
+                    if (shop_item.quest_progress >= shop_item.quest_thresh):
+                        shop_item.is_unlocked = True
+                        shop_item.is_unlockable = False
+                        if k < len(shop_list) - 1: # there exists a next item
+                            shop_list[k+1].is_unlockable = True
+                        self.show_message('Unlocked :\n'+shop_item.tower.name, sound_name='QuestComplete')
+
+
+    def update_ability_cooldowns(self):
+        """Adjusts the cooldown duration (in s) of each ability using the base 
+        cooldown and the number of corresponding buildings."""
+        for k in range(1, 5): # k is the ability index
+            building_name = ''
+            for building in self.shop_listlist[2]:
+                if k in building.tower.unlocked_power_indxs:
+                    building_name = building.tower.name
+                    base_cooldown = building.tower.cooldown
+
+            n_buildings = 0
+            for tower in self.towers_list:
+                if tower.name == building_name:
+                    n_buildings += 1
+
+            self.abilities_list[k].cooldown = base_cooldown * 0.8**(n_buildings-1)
+            self.abilities_list[k].cooldown_remaining = min(self.abilities_list[k].cooldown, 
+                                                            self.abilities_list[k].cooldown_remaining)
+
+    def start_wave(self):
+        self.wave_is_happening = True
+        self.wave_number += 1
+        self.enemies_left_to_spawn = len(self.wave_list[self.wave_number-1].enemies_list)
+        self.next_enemy_index = 0
+        for ability in self.abilities_list:
+            if ability is not None:
+                ability.cooldown_remaining -= max(self.time_to_next_wave, 0)
+
+    # player actions
+    def can_build_at(self, i: int, j: int, is_2x2: bool = False) -> bool:
+        """Checks whether a tower can be built on cell (i, j), which is the top left cell of 2x2 towers"""
+        cells = [(i, j)]
+        if is_2x2:
+            cells = [(ii, jj) for ii in range(i, i+2) for jj in range(j, j+2)]
+        for (ii, jj) in cells:
+            if not ((0 <= ii <= 14) and (0 <= jj <= 14)):
+                return False
+            if (self.map_cells.terrain[ii, jj] != GROUND) or self.map_cells.occupied[ii, jj]:
+                return False
+        return True
+
+    def place_tower(self, shop_item: ShopItem, x: float, y: float) -> Tower:
+        """Buys the tower of shop_item and builds it on the cell nearest to (x, y). Returns the new
+        tower, or None if nothing can be built there. Checking that it is affordable is up to the caller."""
+        i, j = nearest_cell_ij(x, y)
+        center_x, center_y = nearest_cell_centerxy(x, y)
+        if not self.can_build_at(i, j, shop_item.tower.is_2x2):
+            return None
+        if shop_item.tower.is_2x2:
+            center_x += CELL_SIZE/2
+            center_y -= CELL_SIZE/2
+
+        # buy and place the tower
+        self.money -= shop_item.cost
+        new_tower = shop_item.tower.make_another()
+        new_tower.center_x = center_x
+        new_tower.center_y = center_y
+        new_tower.update_coverage()
+        if new_tower.does_rotate:
+            self.towers_list.append(new_tower.make_base_tower())
+        self.towers_list.append(new_tower)
+        self.all_sprites.append(new_tower)
+        self.map_cells.occupied[i, j] = True
+        if new_tower.is_2x2:
+            self.map_cells.occupied[i+1, j] = True
+            self.map_cells.occupied[i, j+1] = True
+            self.map_cells.occupied[i+1, j+1] = True
+            self.update_ability_cooldowns()
+        elif new_tower.name == "Falcon Cliff":
+            self.projectiles_list.append(new_tower.falcon)
+            self.all_sprites.append(new_tower.falcon)
+            new_tower.falcon.center_x = new_tower.center_x
+            new_tower.falcon.center_y = new_tower.center_y
+            self.play_sound('Falcon')
+        elif new_tower.name == "Greek Fire":
+            new_tower.flame_system = self.flame_system
+        self.play_sound('Construction')
+        return new_tower
+
+    def sell_tower(self, x: float, y: float):
+        i, j = nearest_cell_ij(x, y)
+        if not self.map_cells.occupied[i, j]:
+            return
+
+        # if we reach this line, then the cell is occupied by a 1x1 or 2x2 tower
+        for tower in self.towers_list.sprite_list:
+            if tower.is_2x2: # we'll deal with 2x2 towers later
+                continue
+            ti, tj = nearest_cell_ij(tower.center_x, tower.center_y)
+            if (i == ti) and (j == tj) and ('base' not in tower.name.lower()):
+                # found the tower
+                price = self.find_tower_price(tower.name)
+                self.money += int(floor(price/2))
+                self.map_cells.occupied[i, j] = False
+                if tower.has_rune('any'):
+                    tower.minirune.remove_from_sprite_lists()
+                tower.remove_from_sprite_lists()
+                if tower.name == "Falcon Cliff":
+                    tower.falcon.remove_from_sprite_lists()
+                elif tower.does_rotate:
+                    tower.base_sprite.remove_from_sprite_lists()
+                self.play_sound('Sell')
+                return
+
+        # if we reach this line, then the cell is occupied by a 2x2 tower
+        for tower in self.towers_list.sprite_list:
+            if not tower.is_2x2:
+                continue
+            ti, tj = nearest_cell_ij(tower.center_x-CELL_SIZE/2, tower.center_y+CELL_SIZE/2)
+            if (ti <= i <= ti+1) and (tj <= j <= tj+1):
+                # found the tower
+                price = self.find_tower_price(tower.name)
+                self.money += int(floor(price/2))
+                self.map_cells.occupied[ti, tj] = False
+                self.map_cells.occupied[ti+1, tj] = False
+                self.map_cells.occupied[ti, tj+1] = False
+                self.map_cells.occupied[ti+1, tj+1] = False
+                tower.remove_from_sprite_lists()
+                self.update_ability_cooldowns()
+                self.play_sound('Sell')
+                return
+
+    def enchant_tower(self, rune_template: Rune, x: float, y: float):
+        """Puts a copy of rune_template on the tower nearest to (x, y), if it doesn't already have it.
+        Checking that it is affordable is up to the caller."""
+        i, j = nearest_cell_ij(x, y)
+        if not self.map_cells.occupied[i, j]:
+            return
+        rune = rune_template.make_another()
+
+        # if we reach this line, then the cell is occupied by a 1x1 or 2x2 tower
+        for tower in self.towers_list.sprite_list:
+            if tower.is_2x2: # 2x2 towers are un-enchantable so skip this
+                continue
+            if 'base' in tower.name.lower():
+                continue # tower bases don't get runes, tower tops do
+            ti, tj = nearest_cell_ij(tower.center_x, tower.center_y)
+            if (i == ti) and (j == tj):
+                # found the tower
+                if not tower.has_rune(rune.name):
+                    self.money -= rune.cost
+                    new_minirune = tower.set_rune(rune)
+                    if new_minirune:
+                        self.minirunes_list.append(new_minirune)
+                    x, y = cell_centerxy(i,j)
+                    self.effects_list.append(RuneApplyMarker.make(self.context, center_x=x, center_y=y))
+                    self.play_sound('Rune')
+
+    def use_ability(self, k: int, x: float, y: float) -> bool:
+        """Triggers ability number k at (x, y) if it is off cooldown, returns True if it was used.
+        Selling towers (k=0) goes through sell_tower() instead."""
+        if self.abilities_list[k].cooldown_remaining > 0.01:
+            return False
+        if k == 1: # Mjolnir projectile
+            mjolnir = self.abilities_list[1].trigger(x, y)
+            mjolnir.source = self.abilities_list[1]
+            self.projectiles_list.append(mjolnir)
+            self.all_sprites.append(mjolnir)
+            self.play_sound("MjolnirThrow")
+        elif k == 2: # Platform placement
+            new_platform = self.abilities_list[2].trigger(x, y)
+            if not new_platform:
+                return False
+            self.platforms.append(new_platform)
+            self.all_sprites.append(new_platform)
+            self.play_sound("Construction")
+            self.quest_tracker['platforms placed'] += 1
+            self.flow_field.rebuild(self.map_cells)
+        elif k == 3: # Command
+            priority_delta, effect_radius2 = self.abilities_list[3].trigger(x, y)
+            for enemy in self.enemies_list.sprite_list:
+                dx = x - enemy.center_x
+                dy = y - enemy.center_y
+                dist2 = dx**2 + dy**2
+                if dist2 < effect_radius2:
+                    enemy.priority += priority_delta
+            self.play_sound("Command")
+        elif k == 4: # Harvest
+            reward_fraction, effect_radius2 = self.abilities_list[4].trigger(x, y)
+            for enemy in self.enemies_list.sprite_list:
+                dx = x - enemy.center_x
+                dy = y - enemy.center_y
+                dist2 = dx**2 + dy**2
+                if dist2 < effect_radius2:
+                    enemy.set_modifier('') # Remove any buff
+                    self.money += reward_fraction*enemy.reward
+            self.play_sound("Harvest")
+        else:
+            return False
+        return True
@@ -0,0 +1,151 @@
+import numpy as np
+from heapq import nsmallest
+from math import ceil
+from constants import CELL_SIZE, MAP_WIDTH, SCREEN_HEIGHT
+
+# the grid covers the map and the chin below it, which enemies cross on their way to the village
+GRID_ROWS = ceil(SCREEN_HEIGHT / CELL_SIZE)
+GRID_COLS = MAP_WIDTH // CELL_SIZE
+LAYERS = ['flying', 'floating', 'hidden']
+
+def bucket_ij(x: float, y: float):
+    """Same (i,j) convention as grid.nearest_cell_ij, but clamped to the whole spatial grid
+    instead of the map, so that every enemy falls in some bucket."""
+    i = int((SCREEN_HEIGHT - y) // CELL_SIZE)
+    j = int(x // CELL_SIZE)
+    i = min(max(i, 0), GRID_ROWS-1)
+    j = min(max(j, 0), GRID_COLS-1)
+    return i, j
+
+def cells_in_range(x: float, y: float, radius: float) -> list:
+    """Returns the (i,j) indices of every cell of the spatial grid that overlaps the circle of
+    given center and radius."""
+    top_i, left_j = bucket_ij(x-radius, y+radius)
+    bottom_i, right_j = bucket_ij(x+radius, y-radius)
+    radius2 = radius*radius
+    cells = []
+    for i in range(top_i, bottom_i+1):
+        top = SCREEN_HEIGHT - i*CELL_SIZE
+        bottom = top - CELL_SIZE
+        dy = max(bottom - y, 0, y - top)
+        for j in range(left_j, right_j+1):
+            left = j*CELL_SIZE
+            right = left + CELL_SIZE
+            dx = max(left - x, 0, x - right)
+            if dx*dx + dy*dy <= radius2:
+                cells.append((i, j))
+    return cells
+
+def enemy_layer(enemy) -> str:
+    if enemy.is_flying:
+        return 'flying'
+    if enemy.is_hidden:
+        return 'hidden'
+    return 'floating'
+
+
+def swept_arrivals(x, y, move_x, move_y, target_x, target_y, reach, is_ballistic=False):
+    """Vectorized arrival test for things flying towards a target point. Each of them is about 
+    to move from (x,y) to (x+move_x, y+move_y) : it arrives if that segment passes within reach
+    of (target_x, target_y). Ballistic ones, that no longer steer, also arrive as soon as their 
+    target is not ahead of them anymore, since they will never get any closer.
+    All arguments are NumPy arrays (or scalars), and the result is a boolean array. Unlike a 
+    test on positions alone, fast movers cannot skip over their target, however long the step."""
+    to_target_x = target_x - x
+    to_target_y = target_y - y
+    move2 = move_x*move_x + move_y*move_y
+    # fraction of the move that brings us closest to the target, clamped to the segment
+    along = to_target_x*move_x + to_target_y*move_y
+    fraction = np.clip(np.divide(along, move2, out=np.zeros_like(along), where=move2>0), 0, 1)
+    miss_x = to_target_x - fraction*move_x
+    miss_y = to_target_y - fraction*move_y
+    return (miss_x*miss_x + miss_y*miss_y <= reach*reach) | (is_ballistic & (along <= 0))
+
+
+class EnemyGrid():
+    """Uniform grid of CELL_SIZE buckets holding every enemy, rebuilt once per frame.
+    Enemies are split into flying, floating and hidden layers so that a tower only looks at the
+    enemies it is able to see. Each bucket lists (rank, enemy) tuples in increasing rank, where
+    rank is the enemy's position in the list the grid was built from."""
+    def __init__(self) -> None:
+        self.buckets = {layer: [[[] for j in range(GRID_COLS)] for i in range(GRID_ROWS)]
+                        for layer in LAYERS}
+        self.filled_buckets = [] # only these need to be emptied on the next rebuild
+
+    def rebuild(self, enemies: list):
+        for bucket in self.filled_buckets:
+            bucket.clear()
+        self.filled_buckets = []
+        for rank, enemy in enumerate(enemies):
+            i, j = bucket_ij(enemy.center_x, enemy.center_y)
+            bucket = self.buckets[enemy_layer(enemy)][i][j]
+            if not bucket:
+                self.filled_buckets.append(bucket)
+            bucket.append((rank, enemy))
+
+    def buckets_in(self, cells: list, layers: list):
+        """Yields every non-empty bucket of the given layers at the given (i,j) cells"""
+        for layer in layers:
+            layer_buckets = self.buckets[layer]
+            for (i, j) in cells:
+                if layer_buckets[i][j]:
+                    yield layer_buckets[i][j]
+
+    def buckets_near(self, x: float, y: float, radius: float, layers: list):
+        """Yields every non-empty bucket of the given layers that overlaps the circle of given
+        center and radius"""
+        return self.buckets_in(cells_in_range(x, y, radius), layers)
+
+    def enemies_within(self, x: float, y: float, radius: float, layers: list = LAYERS) -> list:
+        """Returns a new list of the enemies that are still alive and at most radius away from 
+        (x,y). Since it is a copy, callers can kill and remove those enemies while looping."""
+        radius2 = radius*radius
+        found = []
+        for bucket in self.buckets_near(x, y, radius, layers):
+            for rank, enemy in bucket:
+                if enemy.current_health <= 0:
+                    continue # killed since the last rebuild
+                dx = enemy.center_x - x
+                dy = enemy.center_y - y
+                if dx*dx + dy*dy <= radius2:
+                    found.append(enemy)
+        return found
+
+
+    def nearest(self, x: float, y: float, k: int, radius: float, exclude: set = None, 
+                layers: list = LAYERS) -> list:
+        """Returns up to k live enemies that are strictly less than radius away from (x,y) and
+        not in exclude, nearest first. Enemies at the same distance keep the grid's ordering."""
+        radius2 = radius*radius
+        candidates = []
+        for bucket in self.buckets_near(x, y, radius, layers):
+            for rank, enemy in bucket:
+                if enemy.current_health <= 0:
+                    continue # killed since the last rebuild
+                if exclude and (enemy in exclude):
+                    continue
+                dx = enemy.center_x - x
+                dy = enemy.center_y - y
+                dist2 = dx*dx + dy*dy
+                if dist2 < radius2:
+                    candidates.append((dist2, rank, enemy))
+        return [enemy for (dist2, rank, enemy) in nsmallest(k, candidates, key=lambda c: c[:2])]
+
+
+class TargetingOrder():
+    """Enemies sorted by increasing targeting priority (low priority gets attacked first), kept
+    apart from the SpriteLists so that sorting never touches their GPU-side buffers."""
+    def __init__(self) -> None:
+        self.enemies = []
+
+    def add(self, enemy):
+        self.enemies.append(enemy)
+
+    def refresh(self) -> list:
+        """Forgets enemies that left the game, re-sorts the others, and returns them.
+        Priorities drift slowly from one frame to the next, so the list is already nearly
+        sorted. list.sort is a stable Timsort: it finds the long sorted runs and only repairs
+        the rest with insertion passes, which keeps each refresh close to linear time."""
+        self.enemies = [enemy for enemy in self.enemies if enemy.sprite_lists]
+        self.enemies.sort(key= lambda enmy : enmy.priority)
+        return self.enemies
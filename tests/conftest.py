@@ -0,0 +1,7 @@
+import os
+import sys
+
+# the game modules are imported from the game folder, and load their files relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,41 @@
+from random import Random
+from utils import Animation
+
+BIG_DRAGON_TIMES = [0.00, 0.12, 0.24, 0.36, 0.48, 0.60, 0.72, 0.84, 0.96, 1.08, 1.20, 1.32, 1.44, 1.56, 1.68, 1.80, 1.92]
+BIG_DRAGON_INDXS = [0,    1,    0,    1,    0,    1,    0,    1,    0,    1,    0,    1,    2,    3,    2,    1,    0]
+
+
+def linear_scan_frame(transition_times: list, transition_indxs: list, animation_time: float) -> int:
+    """How AnimatedSprite used to find its frame, one transition at a time"""
+    while animation_time >= transition_times[-1]:
+        animation_time -= transition_times[-1]
+    for (k, transition_k_time) in enumerate(transition_times):
+        if animation_time < transition_k_time:
+            return transition_indxs[k-1]
+
+def random_transitions(rng: Random) -> tuple:
+    n = rng.randint(2, 15)
+    times = [0.0] + sorted(rng.sample(range(1, 1000), n-1))
+    return [t/100 for t in times], [rng.randint(0, 5) for t in times]
+
+
+def test_frame_at_matches_linear_scan_on_transitions():
+    rng = Random(4)
+    for (times, indxs) in [(BIG_DRAGON_TIMES, BIG_DRAGON_INDXS)] + [random_transitions(rng) for k in range(50)]:
+        animation = Animation(times, indxs)
+        # right on each transition, and just before it
+        for t in times[:-1]:
+            for animation_time in [t, max(t - 1e-6, 0)]:
+                assert animation.frame_at(animation_time) == linear_scan_frame(times, indxs, animation_time)
+
+def test_frame_at_matches_linear_scan_when_looping():
+    rng = Random(5)
+    for (times, indxs) in [(BIG_DRAGON_TIMES, BIG_DRAGON_INDXS)] + [random_transitions(rng) for k in range(50)]:
+        animation = Animation(times, indxs)
+        for k in range(200):
+            animation_time = rng.uniform(0, 5*times[-1])
+            assert animation.frame_at(animation_time) == linear_scan_frame(times, indxs, animation_time)
+
+def test_compile_shares_animations():
+    assert Animation.compile([0, 0.1, 0.2], [0, 1, 0]) is Animation.compile((0, 0.1, 0.2), (0, 1, 0))
+    assert Animation.compile([0, 0.1, 0.2], [0, 1, 0]) is not Animation.compile([0, 0.1, 0.3], [0, 1, 0])
@@ -0,0 +1,13 @@
+from types import SimpleNamespace
+from constants import CELL_SIZE, SCREEN_HEIGHT
+from grid import containing_cell_ij, is_in_cell, nearest_cell_ij
+
+
+def test_containing_cell_matches_nearest_cell_and_is_in_cell():
+    # every half pixel over the map and a bit around it, so that all cell borders get tested
+    for x2 in range(-2*CELL_SIZE, 2*17*CELL_SIZE):
+        for y2 in range(2*(SCREEN_HEIGHT - 17*CELL_SIZE), 2*(SCREEN_HEIGHT + 2*CELL_SIZE)):
+            x, y = x2/2, y2/2
+            i, j = nearest_cell_ij(x, y)
+            expected = (i, j) if is_in_cell(SimpleNamespace(center_x=x, center_y=y), i, j) else None
+            assert containing_cell_ij(x, y) == expected, (x, y)
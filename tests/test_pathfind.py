@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from random import Random
+from constants import MAP_TARGET_J
+from grid import TerrainMap, GROUND, SHALLOW, DEEP
+from pathfind import FlowField, are_adjacent, find_blocking_cells, find_path
+
+MAP_NUMBERS = [1, 2, 3, 4, 5]
+TARGET_CELL = (15, MAP_TARGET_J)
+
+
+def load_terrain(map_number: int) -> TerrainMap:
+    """Same map as Simulation.load_map builds, all-water exit row included"""
+    with open("./files/map"+str(map_number)+".txt") as mapfile:
+        rows = [row.rstrip() for row in mapfile.readlines()]
+    rows.append("s"*len(rows[-1]))
+    return TerrainMap.from_rows(rows)
+
+def random_terrain(seed: int) -> TerrainMap:
+    """15x15 map of random terrain, about a third of it ground, above an all-water exit row"""
+    rng = Random(seed)
+    terrain = np.array([[rng.choice([GROUND, SHALLOW, DEEP]) for j in range(15)] for i in range(15)]
+                       + [[SHALLOW]*15], dtype=np.uint8)
+    return TerrainMap(terrain)
+
+def water_cells(map: TerrainMap) -> list:
+    return [tuple(cell) for cell in np.argwhere(map.terrain != GROUND).tolist()]
+
+def check_against_flow_field(map: TerrainMap):
+    flow_field = FlowField(target_cell=TARGET_CELL, map=map)
+    for cell in water_cells(map):
+        distance = flow_field.distance(*cell)
+        if distance < 0:
+            with pytest.raises(ArithmeticError):
+                find_path(start_cell=cell, target_cell=TARGET_CELL, map=map)
+            continue
+        route = find_path(start_cell=cell, target_cell=TARGET_CELL, map=map)
+        assert route[0] == cell and route[-1] == TARGET_CELL
+        assert len(route) - 1 == distance
+        for (cell1, cell2) in zip(route, route[1:]):
+            assert are_adjacent(cell1, cell2)
+            assert map.terrain[cell2] != GROUND
+
+
+@pytest.mark.parametrize('map_number', MAP_NUMBERS)
+def test_find_path_matches_flow_field_on_campaign_maps(map_number):
+    check_against_flow_field(load_terrain(map_number))
+
+@pytest.mark.parametrize('seed', range(20))
+def test_find_path_matches_flow_field_on_random_maps(seed):
+    check_against_flow_field(random_terrain(seed))
+
+
+def brute_force_blocking_cells(map: TerrainMap, source_cells: list) -> set:
+    """Turns each water cell into ground in turn, and checks if a source loses its route"""
+    reachable = FlowField(target_cell=TARGET_CELL, map=map)
+    sources = [cell for cell in source_cells if reachable.distance(*cell) >= 0]
+    blocking_cells = set()
+    for cell in water_cells(map):
+        hypothetical_map = map.copy()
+        hypothetical_map.terrain[cell] = GROUND
+        flow_field = FlowField(target_cell=TARGET_CELL, map=hypothetical_map)
+        if any(flow_field.distance(*source) < 0 for source in sources if source != cell):
+            blocking_cells.add(cell)
+    return blocking_cells
+
+def check_blocking_cells(map: TerrainMap):
+    spawn_cells = [(0, j) for j in np.flatnonzero(map.terrain[0] != GROUND).tolist()]
+    found = find_blocking_cells(map=map, target_cell=TARGET_CELL, source_cells=spawn_cells)
+    # the exit itself is reported too, but it can never be turned into ground
+    assert found - {TARGET_CELL} == brute_force_blocking_cells(map, spawn_cells) - {TARGET_CELL}
+
+
+@pytest.mark.parametrize('map_number', MAP_NUMBERS)
+def test_find_blocking_cells_on_campaign_maps(map_number):
+    check_blocking_cells(load_terrain(map_number))
+
+@pytest.mark.parametrize('seed', range(20))
+def test_find_blocking_cells_on_random_maps(seed):
+    check_blocking_cells(random_terrain(seed))
@@ -0,0 +1,86 @@
+import pytest
+import arcade
+import glb
+from constants import SIM_TIME_STEP, MAX_STEPS_PER_FRAME
+from explosions import AirExplosion
+from grid import cell_centerxy
+from simulation import Simulation
+from utils import GameContext
+
+glb.MUTED = True # no sound in tests
+
+
+@pytest.fixture
+def counting_sim():
+    """Simulation whose steps only get counted, to test advance() on its own"""
+    sim = Simulation(map_number=1, seed=0)
+    sim.steps_taken = 0
+    def step(delta_time: float = SIM_TIME_STEP):
+        sim.steps_taken += 1
+    sim.step = step
+    return sim
+
+
+def test_advance_keeps_leftover_time(counting_sim):
+    assert counting_sim.advance(0.6*SIM_TIME_STEP) == 0
+    assert counting_sim.advance(0.6*SIM_TIME_STEP) == 1
+    assert counting_sim.unsimulated_time == pytest.approx(0.2*SIM_TIME_STEP)
+
+def test_advance_runs_one_step_per_step_of_game_time(counting_sim):
+    frame_times = [0.007, 0.016, 0.0167, 0.02, 0.033, 0.05]*50
+    for frame_time in frame_times:
+        counting_sim.advance(frame_time)
+    assert counting_sim.steps_taken == int(sum(frame_times)/SIM_TIME_STEP + 1e-6)
+
+@pytest.mark.parametrize('speed', [1, 2, 4, 8])
+def test_advance_fast_forwards(counting_sim, speed):
+    for k in range(10):
+        assert counting_sim.advance(SIM_TIME_STEP + 1e-9, speed=speed) == speed
+
+def test_advance_drops_time_it_cant_catch_up_on(counting_sim):
+    assert counting_sim.advance(1.0, speed=2) == 2*MAX_STEPS_PER_FRAME
+    assert counting_sim.unsimulated_time == 0
+    assert counting_sim.advance(SIM_TIME_STEP + 1e-9) == 1
+
+
+def start(sim: Simulation) -> Simulation:
+    """Builds a few towers and starts wave 5"""
+    for (i, j) in [(3, 6), (4, 5), (5, 8)]:
+        sim.place_tower(sim.shop_listlist[0][0], *cell_centerxy(i, j))
+    sim.wave_number = 4
+    sim.start_wave()
+    return sim
+
+def state(sim: Simulation) -> tuple:
+    return (sim.steps_done, sim.money, sim.population, sim.wave_number,
+            sorted((enemy.center_x, enemy.center_y, enemy.current_health) for enemy in sim.enemies_list))
+
+def play(sim: Simulation, frames: int, speed: int) -> tuple:
+    """Starts the game, and returns what it looks like after frames frames of 1/60s at the
+    given speed"""
+    start(sim)
+    for frame in range(frames):
+        sim.advance(SIM_TIME_STEP, speed=speed)
+    return state(sim)
+
+def test_same_seed_plays_the_same_game():
+    assert play(Simulation(map_number=2, seed=7), 960, speed=1) == play(Simulation(map_number=2, seed=7), 960, speed=1)
+    assert play(Simulation(map_number=2, seed=7), 960, speed=1) != play(Simulation(map_number=2, seed=8), 960, speed=1)
+
+def test_fast_forward_plays_the_same_game():
+    assert play(Simulation(map_number=2, seed=7), 960, speed=1) == play(Simulation(map_number=2, seed=7), 120, speed=8)
+
+def test_interleaved_games_play_like_games_played_alone():
+    games = [start(Simulation(map_number=2, seed=7)), start(Simulation(map_number=2, seed=8))]
+    for frame in range(960):
+        for sim in games:
+            sim.advance(SIM_TIME_STEP)
+    assert [state(sim) for sim in games] == [play(Simulation(map_number=2, seed=seed), 960, speed=1) for seed in [7, 8]]
+
+def test_recycled_sprites_stay_in_their_game():
+    first, second = GameContext(0), GameContext(0)
+    explosion = AirExplosion.make(first, center_x=10, center_y=10)
+    arcade.SpriteList().append(explosion)
+    explosion.recycle()
+    assert AirExplosion.make(second, center_x=10, center_y=10) is not explosion
+    assert AirExplosion.make(first, center_x=10, center_y=10) is explosion
@@ -0,0 +1,67 @@
+import numpy as np
+from types import SimpleNamespace
+from projectiles import Projectile
+from targeting import swept_arrivals
+from utils import GameContext
+
+
+def sampled_miss_distance(x, y, move_x, move_y, target_x, target_y, n_samples: int = 1001):
+    """Closest distance to the target over points sampled along each move"""
+    fractions = np.linspace(0, 1, n_samples)[:, None]
+    dx = target_x - (x + fractions*move_x)
+    dy = target_y - (y + fractions*move_y)
+    return np.sqrt(dx*dx + dy*dy).min(axis=0)
+
+
+def test_swept_arrivals_matches_sampled_moves():
+    rng = np.random.default_rng(3)
+    n = 5000
+    x, y, target_x, target_y = rng.uniform(0, 500, (4, n))
+    move_x, move_y = rng.uniform(-100, 100, (2, n))
+    move_x[:100] = 0 # some don't move at all
+    move_y[:100] = 0
+    reach = rng.uniform(0, 50, n)
+    arrived = swept_arrivals(x, y, move_x, move_y, target_x, target_y, reach)
+    miss = sampled_miss_distance(x, y, move_x, move_y, target_x, target_y)
+    sampling_error = np.hypot(move_x, move_y)/1000
+    assert 0 < arrived.sum() < n
+    assert arrived[miss < reach - 1e-9].all()
+    assert not arrived[miss > reach + sampling_error + 1e-9].any()
+
+def test_fast_movers_do_not_skip_their_target():
+    # the target is halfway along a move 100 times longer than the reach
+    arrived = swept_arrivals(np.array([0.0]), np.array([0.0]), np.array([1000.0]), np.array([0.0]), 
+                             np.array([500.0]), np.array([3.0]), np.array([5.0]))
+    assert arrived.tolist() == [True]
+
+def test_ballistic_movers_arrive_once_past_their_target():
+    # moving right, target behind, ahead, and exactly abreast
+    x = np.zeros(3)
+    target_x = np.array([-50.0, 50.0, 0.0])
+    target_y = np.array([0.0, 0.0, 80.0])
+    for is_ballistic, expected in [(True, [True, False, True]), (False, [False, False, False])]:
+        arrived = swept_arrivals(x, x, np.full(3, 10.0), np.zeros(3), target_x, target_y, np.full(3, 5.0),
+                                 is_ballistic=np.full(3, is_ballistic))
+        assert arrived.tolist() == expected
+
+def test_retargeting_projectile_without_target_arrives_once_past_it():
+    # raidho shot whose target dies while its tower has nothing else to shoot at
+    tower = SimpleNamespace(center_x=0.0, center_y=0.0, range=1000.0, target=None)
+    enemy = SimpleNamespace(center_x=100.0, center_y=0.0, current_health=5)
+    proj = Projectile(GameContext(0), speed=100, center_x=50.0, center_y=0.0, target=enemy, is_retargeting=True,
+                      parent_tower=tower)
+    proj.on_update(0)
+    assert not proj.has_static_target
+    enemy.current_health = 0
+    proj.on_update(0)
+    assert proj.has_static_target and proj.target is None
+    proj.center_x = 120.0 # flew past where the enemy died
+    arrived = swept_arrivals(np.array([proj.center_x]), np.array([proj.center_y]),
+                             np.array([proj.velocity[0]]), np.array([proj.velocity[1]]),
+                             np.array([proj.target_x]), np.array([proj.target_y]), np.array([1.0]),
+                             is_ballistic=np.array([proj.has_static_target]))
+    assert arrived.tolist() == [True]
+    # and it homes again once the tower picks a new target
+    tower.target = SimpleNamespace(center_x=200.0, center_y=50.0, current_health=5)
+    proj.on_update(0)
+    assert not proj.has_static_target and proj.target is tower.target
@@ -0,0 +1,59 @@
+from random import Random
+from constants import MAP_WIDTH, SCREEN_HEIGHT
+from targeting import EnemyGrid, LAYERS, enemy_layer
+
+
+class FakeEnemy():
+    """All the grid looks at : position, layer and health"""
+    def __init__(self, center_x: float, center_y: float, is_flying: bool, is_hidden: bool, current_health: float):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.is_flying = is_flying
+        self.is_hidden = is_hidden
+        self.current_health = current_health
+
+
+def random_enemies(rng: Random, n: int) -> list:
+    """Positions are whole pixels so that some enemies end up exactly as far from the query point"""
+    return [FakeEnemy(center_x=rng.randint(-20, MAP_WIDTH+20), center_y=rng.randint(-20, SCREEN_HEIGHT+20),
+                      is_flying=rng.random() < 0.4, is_hidden=rng.random() < 0.3,
+                      current_health=rng.choice([-1, 1, 5, 10]))
+            for k in range(n)]
+
+def random_queries(rng: Random, n: int) -> list:
+    return [(rng.randint(0, MAP_WIDTH), rng.randint(0, SCREEN_HEIGHT), rng.choice([0, 10, 32, 50, 100, 300]),
+             rng.choice([LAYERS, ['flying'], ['floating', 'hidden']]))
+            for k in range(n)]
+
+def distance2(enemy, x: float, y: float) -> float:
+    return (enemy.center_x - x)**2 + (enemy.center_y - y)**2
+
+
+def test_enemies_within_matches_brute_force():
+    rng = Random(1)
+    for attempt in range(20):
+        enemies = random_enemies(rng, 200)
+        grid = EnemyGrid()
+        grid.rebuild(enemies)
+        for (x, y, radius, layers) in random_queries(rng, 50):
+            expected = [enemy for enemy in enemies if enemy.current_health > 0 
+                        and enemy_layer(enemy) in layers and distance2(enemy, x, y) <= radius**2]
+            found = grid.enemies_within(x, y, radius, layers)
+            assert sorted(map(id, found)) == sorted(map(id, expected))
+
+
+def test_nearest_matches_brute_force():
+    rng = Random(2)
+    for attempt in range(20):
+        enemies = random_enemies(rng, 200)
+        grid = EnemyGrid()
+        grid.rebuild(enemies)
+        for (x, y, radius, layers) in random_queries(rng, 50):
+            exclude = set(rng.sample(enemies, 20))
+            k = rng.randint(0, 6)
+            # nearest first, ties in the order the grid was built from
+            candidates = [(distance2(enemy, x, y), rank, enemy) for rank, enemy in enumerate(enemies)
+                          if enemy.current_health > 0 and enemy_layer(enemy) in layers
+                          and enemy not in exclude and distance2(enemy, x, y) < radius**2]
+            expected = [enemy for (dist2, rank, enemy) in sorted(candidates, key=lambda c: c[:2])[:k]]
+            assert grid.nearest(x, y, k, radius, exclude=exclude, layers=layers) == expected
@@ -2,18 +2,22 @@ from arcade import Sprite, Texture, draw_line
 from arcade.color import LIGHT_GRAY
 from math import atan2, pi, sqrt, cos, sin, ceil
 from pyglet.media import Player
-from random import random
 from constants import MAP_WIDTH, SCREEN_HEIGHT, ASSETS, ZAPS, PROJECTILES
 from copy import deepcopy
-from effects import SlowDown, Inflame, Freeze
+from effects import SLOWDOWN, INFLAME, FREEZE
 from enemies import Enemy
-from explosions import CatapultExplosion, GrowingExplosion
-from projectiles import Projectile, Falcon, FlameParticle, RageBlast
+from explosions import CatapultExplosion, GrowingExplosion, ExplosionTemplate
+from projectiles import Projectile, Falcon, RageBlast
 from runes import Rune, MiniRune
-from utils import MutableSound, normalize_tuple
+from targeting import EnemyGrid, cells_in_range
+from utils import Animated, Animation, GameContext, MutableSound, normalize_tuple
+import glb
 
-class Tower(Sprite):
-    def __init__(self, scale: float = 1, cooldown: float = 2, 
+CANNONBALL_IMPACT = ExplosionTemplate(CatapultExplosion)
+BASTION_IMPACT = ExplosionTemplate(CatapultExplosion, scale=0.8, speed_factor=1.5)
+
+class Tower(Animated, Sprite):
+    def __init__(self, context: GameContext = None, scale: float = 1, cooldown: float = 2, 
                     range: float = 100, damage: float = 5, 
                     name: str = None, description: str = None, can_see_types: list = None, 
                     has_rotating_top: bool = False, is_2x2: bool = False, 
@@ -21,6 +25,7 @@ class Tower(Sprite):
                     animation_transition_times: list = None, texture: Texture = None, 
                     attack_sound_name: str = None):
         super().__init__(scale=scale, texture=texture)
+        self.context = context # the game the tower is built in, None for a shop's placeholder
         self.cooldown = cooldown
         self.cooldown_remaining = 0.0
         self.range = range
@@ -34,6 +39,17 @@ class Tower(Sprite):
         self.can_see_types = can_see_types
         if can_see_types is None:
             self.can_see_types = []
+        self.sees_flying = ('flying' in self.can_see_types)
+        self.sees_floating = ('floating' in self.can_see_types)
+        self.sees_underwater = ('underwater' in self.can_see_types)
+        self.visible_layers = [] # layers of the EnemyGrid this tower needs to look at
+        self.covered_cells = None # cells of the EnemyGrid within range, see update_coverage()
+        if self.sees_flying:
+            self.visible_layers.append('flying')
+        if self.sees_floating:
+            self.visible_layers.append('floating')
+            if self.sees_underwater:
+                self.visible_layers.append('hidden')
         self.target = None
         self.target_x = MAP_WIDTH/2
         self.target_y = SCREEN_HEIGHT * 100000
@@ -45,20 +61,21 @@ class Tower(Sprite):
         self.minirune = None
         self.projectiles_are_homing = projectiles_are_homing
         if animation_transition_times:
-            self.animation_transition_times = animation_transition_times
-            self.number_of_textures = len(self.animation_transition_times) - 1
+            self.number_of_textures = len(animation_transition_times) - 1
             self.is_animated = (self.number_of_textures >= 2)
+            # texture k is shown from transition k on, and the first one again after the last
+            transition_indxs = [k % self.number_of_textures for k, _ in enumerate(animation_transition_times)]
+            self.start_animation(Animation.compile(animation_transition_times, transition_indxs), 
+                                 context.building_clock)
         else:
-            self.animation_transition_times = []
             self.number_of_textures = 1
             self.is_animated = False
-        self.animation_time = 0.0
         self.attack_sound_name = attack_sound_name
 
     # this is a total hack, using it because creating a deepcopy of a shop's tower attribute to 
     # place it on the map doesn't work
     def make_another(self): 
-        return Tower()
+        return Tower(self.context)
 
     def on_update(self, delta_time: float = 1 / 60):
         if self.does_rotate:
@@ -68,17 +85,7 @@ class Tower(Sprite):
 
         # animation update, but only if needed
         if self.is_animated:
-            old_time = self.animation_time
-            new_time = old_time + delta_time
-            # did we cross a threshold ? 
-            for k, transition_time in enumerate(self.animation_transition_times):
-                if old_time < transition_time <= new_time:
-                    # we crossed a threshold, update my texture
-                    new_texture_num = k % self.number_of_textures
-                    self.set_texture(new_texture_num)
-            self.animation_time = new_time
-            if self.animation_time > self.animation_transition_times[-1]:
-                self.animation_time -= self.animation_transition_times[-1]
+            self.update_frame()
 
         return super().on_update(delta_time)
 
@@ -90,14 +97,36 @@ class Tower(Sprite):
         dist2 = dx*dx + dy*dy
         if dist2 > self.range**2:
             return False
-        if enemy.is_flying and ('flying' not in self.can_see_types):
+        if enemy.is_flying and not self.sees_flying:
             return False
-        if (not enemy.is_flying) and ('floating' not in self.can_see_types):
+        if (not enemy.is_flying) and not self.sees_floating:
             return False
-        if enemy.is_hidden and ('underwater' not in self.can_see_types):
+        if enemy.is_hidden and not self.sees_underwater:
             return False
         return True
 
+    def update_coverage(self):
+        """Re-computes the list of spatial grid cells that overlap this tower's range. Towers 
+        never move, so this is only needed after placing the tower or changing its range."""
+        self.covered_cells = cells_in_range(self.center_x, self.center_y, self.range)
+
+    def find_target(self, enemy_grid: EnemyGrid):
+        """Returns the first enemy of the grid's ordering that this tower can see, or None. 
+        Only the grid buckets overlapping the tower's range are looked at."""
+        if self.covered_cells is None:
+            self.update_coverage()
+        best_rank = None
+        best_enemy = None
+        for bucket in enemy_grid.buckets_in(self.covered_cells, self.visible_layers):
+            for rank, enemy in bucket:
+                if (best_rank is not None) and (rank >= best_rank):
+                    break # buckets are ordered by rank, nothing better in this one
+                if enemy.current_health > 0 and self.can_see(enemy):
+                    best_rank = rank
+                    best_enemy = enemy
+                    break
+        return best_enemy
+
     def aim_to(self, enemy: Enemy):
         self.target_x = enemy.center_x
         self.target_y = enemy.center_y
@@ -141,7 +170,8 @@ class Tower(Sprite):
             self.projectiles_are_homing = clean_tower.projectiles_are_homing
             self.minirune.remove_from_sprite_lists()
         self.rune = rune
-        self.minirune = MiniRune(rune, center_x=self.center_x+10, center_y=self.center_y-10)
+        self.minirune = MiniRune(rune, clock=self.context.building_clock, 
+                                 center_x=self.center_x+10, center_y=self.center_y-10)
         if rune.name == 'raidho':
             self.projectiles_are_homing = True
         elif rune.name == 'hagalaz':
@@ -155,6 +185,7 @@ class Tower(Sprite):
             self.cooldown_remaining /= 2.00
             if self.do_constant_attack:
                 self.damage *= 2.00
+        self.update_coverage()
         return self.minirune
 
     def make_runed_projectile(self, projectile: Projectile):
@@ -164,11 +195,11 @@ class Tower(Sprite):
             projectile.is_retargeting = True
             projectile.parent_tower = self
         elif self.has_rune('kenaz'):
-            if random() < 0.05:
-                projectile.effects.append(Inflame())
+            if self.context.tower_rng.random() < 0.05:
+                projectile.effects.append(INFLAME)
         elif self.has_rune('isa'):
-            if random() < 0.05:
-                projectile.effects.append(Freeze())
+            if self.context.tower_rng.random() < 0.05:
+                projectile.effects.append(FREEZE)
         elif self.has_rune('sowil'):
             vx = projectile.velocity[0]
             vy = projectile.velocity[1]
@@ -185,16 +216,16 @@ class Tower(Sprite):
 
 
 class TowerBase(Tower):
-    def __init__(self, scale: float = 1, name: str = None, texture: Texture = None):
-        super().__init__(scale=scale, damage=0, range=0, cooldown=0,  name=name, texture=texture)
+    def __init__(self, context: GameContext, scale: float = 1, name: str = None, texture: Texture = None):
+        super().__init__(context, scale=scale, damage=0, range=0, cooldown=0,  name=name, texture=texture)
 
     def can_see(self, enemy: Enemy):
         return False
 
 
 class WatchTower(Tower):
-    def __init__(self):
-        super().__init__(scale=1.0, cooldown=2.0, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, scale=1.0, cooldown=2.0, 
                             range=112, damage=5, name="Watchtower", 
                             description="Fires at floating\nNever misses", 
                             can_see_types=['floating'], 
@@ -206,7 +237,7 @@ class WatchTower(Tower):
         self.set_texture(0)
 
     def make_another(self):
-        return WatchTower()
+        return WatchTower(self.context)
 
     def attack(self, enemy: Enemy):
         self.attack_animation_remaining = 0.1
@@ -234,8 +265,9 @@ class WatchTower(Tower):
         
 
 class Catapult(Tower):
-    def __init__(self):
+    def __init__(self, context: GameContext):
         super().__init__(
+            context, 
             texture=ASSETS['catapult_top'], 
             scale=0.8, 
             cooldown=3.5, 
@@ -250,24 +282,25 @@ class Catapult(Tower):
         self.base_sprite = None
 
     def make_another(self):
-        return Catapult()
+        return Catapult(self.context)
 
     def make_base_tower(self):
-        self.base_sprite = TowerBase(name='CatapultBase', texture=ASSETS['catapult_base'])
+        self.base_sprite = TowerBase(self.context, name='CatapultBase', texture=ASSETS['catapult_base'])
         self.base_sprite.center_x = self.center_x
         self.base_sprite.center_y = self.center_y
         return self.base_sprite
 
     def attack(self, enemy: Enemy):
         super().attack(enemy)
-        cannonball = Projectile(
-            texture=PROJECTILES['cannonball'], scale=0.3, speed=2.5, angle_rate=0,
+        cannonball = Projectile.make(
+            self.context,
+            texture=PROJECTILES['cannonball'], scale=0.3, speed=150, angle_rate=0,
             center_x=self.center_x + 9*sin(self.angle*pi/180), 
             center_y=self.center_y - 9*cos(self.angle*pi/180), 
             target=None,
             target_x=enemy.center_x, target_y=enemy.center_y, 
             damage=self.damage, do_splash_damage=True, splash_radius=32, 
-            impact_effect=CatapultExplosion(), 
+            impact_effect=CANNONBALL_IMPACT, 
         )
         cannonball = self.make_runed_projectile(cannonball)
             
@@ -279,8 +312,9 @@ class Catapult(Tower):
     
 
 class FalconCliff(Tower):
-    def __init__(self):
+    def __init__(self, context: GameContext):
         super().__init__(
+            context, 
             texture=ASSETS['falcon_cliff'], 
             scale=1.0, 
             cooldown=0.1, 
@@ -305,7 +339,7 @@ class FalconCliff(Tower):
         return super().on_update(delta_time)
 
     def make_another(self):
-        return FalconCliff()
+        return FalconCliff(self.context)
 
     def set_rune(self, rune: Rune):
         if self.has_rune(rune.name):
@@ -319,7 +353,8 @@ class FalconCliff(Tower):
             self.projectiles_are_homing = clean_tower.projectiles_are_homing
             self.minirune.remove_from_sprite_lists()
         self.rune = rune
-        self.minirune = MiniRune(rune, center_x=self.center_x+10, center_y=self.center_y-10)
+        self.minirune = MiniRune(rune, clock=self.context.building_clock, 
+                                 center_x=self.center_x+10, center_y=self.center_y-10)
         if rune.name == 'raidho':
             self.projectiles_are_homing = True
         elif rune.name == 'hagalaz':
@@ -332,6 +367,7 @@ class FalconCliff(Tower):
             self.damage *= 2.00
 
         self.falcon.set_rune(rune)
+        self.update_coverage()
         return self.minirune
 
     def attack(self, enemy: Enemy):
@@ -357,8 +393,9 @@ class FalconCliff(Tower):
 
 
 class Bastion(Tower):
-    def __init__(self):
+    def __init__(self, context: GameContext):
         super().__init__(
+            context, 
             texture=ASSETS['bastion'], cooldown=5, range=48, damage=25, name='Bastion', 
             description='Fires at floating & underwater\nDamages all in range', 
             can_see_types=['floating', 'underwater'], attack_sound_name='Catapult')
@@ -366,7 +403,7 @@ class Bastion(Tower):
         self.explode_distance = 32
 
     def make_another(self):
-        return Bastion()
+        return Bastion(self.context)
 
     def attack(self, enemy: Enemy):
         super().attack(enemy)
@@ -376,13 +413,14 @@ class Bastion(Tower):
         theta_0 = atan2(dy, dx)
         for k in range(3):
             theta_k = theta_0 + 2*pi*k/3
-            proj = Projectile(
-                texture=PROJECTILES['cannonball'], scale=0.3, speed=2.5, angle_rate=0,
+            proj = Projectile.make(
+                self.context,
+                texture=PROJECTILES['cannonball'], scale=0.3, speed=150, angle_rate=0,
                 center_x=self.center_x, center_y=self.center_y, target=None,
                 target_x=self.center_x + self.explode_distance*cos(theta_k), 
                 target_y=self.center_y + self.explode_distance*sin(theta_k), 
                 damage=self.damage, do_splash_damage=True, splash_radius=self.splash_radius, 
-                impact_effect=CatapultExplosion(scale=0.8, speed_factor=1.5), 
+                impact_effect=BASTION_IMPACT, 
             )
             proj = self.make_runed_projectile(proj)
             explosives.append(proj)
@@ -391,8 +429,9 @@ class Bastion(Tower):
 
 
 class GreekFire(Tower):
-    def __init__(self):
+    def __init__(self, context: GameContext):
         super().__init__(
+            context, 
             texture=ASSETS['greek_fire_top'], 
             cooldown=0.001, 
             range=150, 
@@ -408,27 +447,41 @@ class GreekFire(Tower):
         self.effect_probability_per_second = 0.05
         self.effect_probability_per_particle = 1-(1-self.effect_probability_per_second)**(1.0/self.particles_per_second)
         self.base_sprite = None
-        self.sounds = [MutableSound('./sounds/FlameSound2.mp3'), MutableSound('./sounds/FlameSound2.mp3')]
+        self.flame_system = None # FlameParticleSystem shared by every Greek Fire, set by the Simulation
+        self.sounds = None # loaded when first heard, so muted or headless games never decode them
         self.players = [Player(), Player()]
         self.next_sound = 0
         self.time_to_next_sound = 0
 
     def make_another(self):
-        return GreekFire()
-
-    def make_runed_projectile(self, projectile: Projectile):
+        return GreekFire(self.context)
+
+    def emit_runed_particle(self, enemy: Enemy, damage: float):
+        """Same as make_runed_projectile, but for a particle of self.flame_system"""
+        effect = None
+        speed = 240
+        num_secondaries = 0
+        parent_tower = None
         if self.has_rune('kenaz'):
-            if random() < self.effect_probability_per_particle:
-                projectile.effects.append(Inflame())
+            if self.context.tower_rng.random() < self.effect_probability_per_particle:
+                effect = INFLAME
         elif self.has_rune('isa'):
-            if random() < self.effect_probability_per_particle:
-                projectile.effects.append(Freeze())
-        else:
-            return super().make_runed_projectile(projectile)
-        return projectile
+            if self.context.tower_rng.random() < self.effect_probability_per_particle:
+                effect = FREEZE
+        elif self.has_rune('raidho'):
+            parent_tower = self
+        elif self.has_rune('sowil'):
+            speed *= 2.00
+        elif self.has_rune('laguz'):
+            num_secondaries += 1
+        self.flame_system.emit(
+            tower_x=self.center_x, tower_y=self.center_y, tower_angle=self.angle, enemy=enemy, 
+            damage=damage, speed=speed, effect=effect, num_secondaries=num_secondaries, 
+            parent_tower=parent_tower, source=self
+        )
 
     def make_base_tower(self):
-        self.base_sprite = TowerBase(name='GreekFireBase', texture=ASSETS['greek_fire_base'])
+        self.base_sprite = TowerBase(self.context, name='GreekFireBase', texture=ASSETS['greek_fire_base'])
         self.base_sprite.center_x = self.center_x
         self.base_sprite.center_y = self.center_y
         return self.base_sprite
@@ -439,7 +492,7 @@ class GreekFire(Tower):
             self.time_to_next_sound = max(0, self.time_to_next_sound-delta_time)
         if self.target:
             dist2 = (self.center_x-self.target.center_x)**2 + (self.center_y-self.target.center_y)**2
-            if (dist2 > self.range**2) or (self.target.current_health <= 0.01):
+            if self.sounds and ((dist2 > self.range**2) or (self.target.current_health <= 0.01)):
                 self.sounds[0].stop(self.players[0])
                 self.sounds[1].stop(self.players[1])
                 self.time_to_next_sound = 0
@@ -447,34 +500,28 @@ class GreekFire(Tower):
     
     def attack(self, enemy: Enemy):
         super().attack(enemy)
-        flame_particles = []
         n_particles = ceil(self.particles_per_second*self.latest_dt)
         n_particles = max (1, n_particles) # guarantee we always create at least 1 particle
         total_dmg = self.damage * self.latest_dt
         dmg_per_particle = total_dmg / n_particles
         for k in range(n_particles):
-            particle = FlameParticle(
-                tower_x=self.center_x, 
-                tower_y=self.center_y,
-                tower_angle=self.angle,
-                enemy=enemy,
-                damage=dmg_per_particle
-            )
-            flame_particles.append(self.make_runed_projectile(particle))
-        if self.time_to_next_sound < 0.001:
+            self.emit_runed_particle(enemy, dmg_per_particle)
+        if self.time_to_next_sound < 0.001 and not glb.MUTED:
+            if self.sounds is None:
+                self.sounds = [MutableSound('./sounds/FlameSound2.mp3'), MutableSound('./sounds/FlameSound2.mp3')]
             k = self.next_sound
             self.players[k] = self.sounds[k].play()
             self.next_sound = 1 - self.next_sound
             self.time_to_next_sound = 2.45
-        return 0, flame_particles, []
+        return 0, [], []
 
     def remove_from_sprite_lists(self):
         self.base_sprite.remove_from_sprite_lists()
         return super().remove_from_sprite_lists()
 
 class OakTreeTower(Tower):
-    def __init__(self):
-        super().__init__(texture=ASSETS['sacred_oak'], scale=1.0, cooldown=2.0, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['sacred_oak'], scale=1.0, cooldown=2.0, 
                             range=112, damage=5, name="Sacred Oak", 
                             description="Fires at flying\nHoming", 
                             can_see_types=['flying'], 
@@ -482,12 +529,13 @@ class OakTreeTower(Tower):
                             attack_sound_name='Oak')
 
     def make_another(self):
-        return OakTreeTower()
+        return OakTreeTower(self.context)
 
     def attack(self, enemy: Enemy):
         super().attack(enemy)
-        leaf = Projectile(
-            texture=PROJECTILES['leaf'], scale=1.0, speed=2.0, angle_rate=360,
+        leaf = Projectile.make(
+            self.context,
+            texture=PROJECTILES['leaf'], scale=1.0, speed=120, angle_rate=360,
             center_x=self.center_x, center_y=self.center_y, 
             target=enemy, damage=self.damage, impact_sound='Hit'
         )
@@ -496,8 +544,8 @@ class OakTreeTower(Tower):
 
 
 class StoneHead(Tower):
-    def __init__(self):
-        super().__init__(texture=ASSETS['stone_head_top'], cooldown=3, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['stone_head_top'], cooldown=3, 
                          range=112, damage=0, name='Stone Head', 
                          description="Fires at flying & floating\nHoming. Slows down enemies", 
                          can_see_types=['flying', 'floating'], has_rotating_top=True, 
@@ -505,10 +553,10 @@ class StoneHead(Tower):
         self.base_sprite = None
         
     def make_another(self):
-        return StoneHead()
+        return StoneHead(self.context)
     
     def make_base_tower(self):
-        self.base_sprite = TowerBase(name='StoneHeadBase', texture=ASSETS['stone_head_base'])
+        self.base_sprite = TowerBase(self.context, name='StoneHeadBase', texture=ASSETS['stone_head_base'])
         self.base_sprite.center_x = self.center_x
         self.base_sprite.center_y = self.center_y
         return self.base_sprite
@@ -517,11 +565,12 @@ class StoneHead(Tower):
         super().attack(enemy)
         enemy_vector = (enemy.center_x-self.center_x, enemy.center_y-self.center_y)
         start_offset_x, start_offset_y = normalize_tuple(xytup=enemy_vector, new_length=13)
-        wind_gust = Projectile(
-            texture=PROJECTILES['wind_gust'], scale=1.0, speed=2.0, angle_rate=0,
+        wind_gust = Projectile.make(
+            self.context,
+            texture=PROJECTILES['wind_gust'], scale=1.0, speed=120, angle_rate=0,
             center_x=self.center_x+start_offset_x, 
             center_y=self.center_y+start_offset_y, 
-            target=enemy, damage=self.damage, effects=[SlowDown()]
+            target=enemy, damage=self.damage, effects=[SLOWDOWN]
         )
         wind_gust = self.make_runed_projectile(wind_gust)
         return 0, [wind_gust], ['Blow'] # effect will be dealt by projectile
@@ -532,15 +581,15 @@ class StoneHead(Tower):
 
 
 class SparklingPillar(Tower):
-    def __init__(self):
-        super().__init__(texture=ASSETS['sparkling_pillar'], cooldown=0.3, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['sparkling_pillar'], cooldown=0.3, 
                          range=75, damage=2, name='Sparkling Pillar', 
                          description="Fires at flying\nNever missies", 
                          can_see_types=['flying'], has_rotating_top=False,
                          attack_sound_name='Spark')
         
     def make_another(self):
-        return SparklingPillar()
+        return SparklingPillar(self.context)
     
     def attack(self, enemy: Enemy):
         self.attack_animation_remaining = 0.05
@@ -569,19 +618,19 @@ class SparklingPillar(Tower):
 
 
 class QuarryOfRage(Tower):
-    def __init__(self):
-        super().__init__(texture=ASSETS['quarry_of_rage'], cooldown=4.0, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['quarry_of_rage'], cooldown=4.0, 
                          range=208, damage=30, name='Quarry Of Rage', 
                          description='Fires at floating\nHoming. Fragmentation blast', 
                          can_see_types=['floating'], projectiles_are_homing=True,
                          attack_sound_name='Catapult')
     
     def make_another(self):
-        return QuarryOfRage()
+        return QuarryOfRage(self.context)
     
     def attack(self, enemy: Enemy):
         super().attack(enemy)
-        bomb = RageBlast(center_x=self.center_x, center_y=self.center_y, 
+        bomb = RageBlast.make(self.context, center_x=self.center_x, center_y=self.center_y, 
                          target=enemy, damage=self.damage)
         bomb = self.make_runed_projectile(bomb)
             
@@ -589,8 +638,8 @@ class QuarryOfRage(Tower):
 
 
 class SanctumOfTempest(Tower):
-    def __init__(self):
-        super().__init__(cooldown=0.5, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, cooldown=0.5, 
                          range=96, damage=10, name='Sanctum of Tempest', 
                          description="Fires at flying & floating\nEach 5th hit amplified", 
                          can_see_types=["floating", "flying"], attack_sound_name='Discharge')
@@ -600,7 +649,7 @@ class SanctumOfTempest(Tower):
         self.set_texture(0)
 
     def make_another(self):
-        return SanctumOfTempest()
+        return SanctumOfTempest(self.context)
     
     def attack(self, enemy: Enemy):
         self.hit_counter = self.hit_counter + 1
@@ -613,13 +662,14 @@ class SanctumOfTempest(Tower):
             return super().attack(enemy)
         else:
             # Special AoE giant hit
-            blast_effect = GrowingExplosion(
-                texture=ASSETS['zap_blast'], starting_scale=0.1, 
+            blast_effect = ExplosionTemplate(
+                GrowingExplosion, texture=ASSETS['zap_blast'], starting_scale=0.1, 
                 lifetime_seconds=0.15, 
                 scale_increase_rate = 10 if self.has_rune('tiwaz') else 6, 
+                angle=self.context.effect_rng.random()*360
             )
-            blast_effect.angle = random()*360
-            zap_blast = Projectile(
+            zap_blast = Projectile.make(
+                self.context,
                 texture=PROJECTILES['cannonball'], scale=0.1, speed=0,
                 center_x=self.center_x, center_y=self.center_y, 
                 target_x=self.center_x, target_y=self.center_y, 
@@ -654,13 +704,13 @@ class SanctumOfTempest(Tower):
 
 
 class BigBuilding(Tower):
-    def __init__(self, scale: float = 1, cooldown: float = 120, 
+    def __init__(self, context: GameContext, scale: float = 1, cooldown: float = 120, 
                     name: str = None, description: str = None, 
                     unlocked_rune_indxs: list = None, 
                     unlocked_power_indxs: list = None, 
                     animation_transition_times: list = None, 
                     texture: Texture = None):
-        super().__init__(scale=scale, cooldown=cooldown, 
+        super().__init__(context, scale=scale, cooldown=cooldown, 
                             name=name, description=description, is_2x2=True, 
                             animation_transition_times=animation_transition_times, 
                             texture=texture)
@@ -678,20 +728,20 @@ class BigBuilding(Tower):
         
 
 class TempleOfThor(BigBuilding):
-    def __init__(self):
-        super().__init__(texture=ASSETS['temple_of_thor'], scale=1.0, cooldown=120, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['temple_of_thor'], scale=1.0, cooldown=120, 
                             name="Temple of Thor", 
                             description="Grants Mjolnir ability\nGrants Raidho rune", 
                             unlocked_rune_indxs=[0], 
                             unlocked_power_indxs=[1])
 
     def make_another(self):
-        return TempleOfThor()
+        return TempleOfThor(self.context)
     
 
 class Forge(BigBuilding):
-    def __init__(self):
-        super().__init__(scale=1.0, cooldown=90, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, scale=1.0, cooldown=90, 
                             name="Forge", 
                             description="Grants Platform ability\nGrants Hagalaz rune", 
                             unlocked_rune_indxs=[1], 
@@ -703,38 +753,38 @@ class Forge(BigBuilding):
         self.set_texture(0)
 
     def make_another(self):
-        return Forge()
+        return Forge(self.context)
 
 
 class TempleOfOdin(BigBuilding):
-    def __init__(self):
-        super().__init__(texture=ASSETS['temple_of_odin'], scale=1.0, cooldown=0, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['temple_of_odin'], scale=1.0, cooldown=0, 
                             name="Temple of Odin", 
                             description="Grants Tiwaz, Kenaz and Isa runes", 
                             unlocked_rune_indxs=[2, 3, 4], 
                             unlocked_power_indxs=[])
 
     def make_another(self):
-        return TempleOfOdin()
+        return TempleOfOdin(self.context)
 
 
 class ChamberOfTheChief(BigBuilding):
-    def __init__(self):
-        super().__init__(texture=ASSETS['chamber_of_the_chief'], cooldown=60, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['chamber_of_the_chief'], cooldown=60, 
                          name='Chamber of the Chief', 
                          description='Grants Command ability\nGrants Sowil rune', 
                          unlocked_rune_indxs=[5], unlocked_power_indxs=[3])
         
     def make_another(self):
-        return ChamberOfTheChief()
+        return ChamberOfTheChief(self.context)
 
 
 class TempleOfFreyr(BigBuilding):
-    def __init__(self):
-        super().__init__(texture=ASSETS['temple_of_freyr'], cooldown=120, 
+    def __init__(self, context: GameContext):
+        super().__init__(context, texture=ASSETS['temple_of_freyr'], cooldown=120, 
                          name='Temple of Freyr', 
                          description='Grants Harvest ability\nGrants Laguz rune', 
                          unlocked_rune_indxs=[6], unlocked_power_indxs=[4])
     
     def make_another(self):
-        return TempleOfFreyr()
+        return TempleOfFreyr(self.context)
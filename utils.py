@@ -1,6 +1,8 @@
 from arcade import Sprite, Sound
+from bisect import bisect_right
 from math import floor, sqrt
 from pyglet.media import Player
+from random import Random
 import glb
 
 def timestr(seconds: float):
@@ -13,6 +15,14 @@ def timestr(seconds: float):
         s += str(floor(seconds)) + 'sec'
     return s
 
+def move_sprites(sprites: list, delta_time: float):
+    """Moves each sprite by its velocity, in pixels per second, for delta_time seconds. Use this
+    rather than SpriteList.update(), which moves sprites by their whole velocity on every call."""
+    for sprite in sprites:
+        x, y = sprite.position
+        vx, vy = sprite.velocity
+        sprite.position = (x + vx*delta_time, y + vy*delta_time)
+
 def normalize_tuple(xytup: tuple, new_length: float = 1.0):
     x0, y0 = xytup
     norm0 = sqrt(x0*x0 + y0*y0)
@@ -22,9 +32,112 @@ def normalize_tuple(xytup: tuple, new_length: float = 1.0):
     return newtup
 
 
-class AnimatedSprite(Sprite):
+class Pooled():
+    """Mixin for short-lived sprites (projectiles, explosions) that get recycled instead of 
+    being thrown away. New instances come from make(), which takes the same arguments as the
+    class constructor (the GameContext of the game, then keyword arguments), and go back to the
+    game's pool with recycle(). Pooled classes implement reset() with the same arguments as 
+    their constructor, and keep the context in self.context."""
+    @classmethod
+    def make(cls, context, **kwargs):
+        free_sprites = context.pools.get(cls)
+        if free_sprites:
+            sprite = free_sprites.pop()
+            sprite.reset(context, **kwargs)
+            return sprite
+        return cls(context, **kwargs)
+
+    def recycle(self):
+        """Removes the sprite from its SpriteLists, and keeps it for a later make()"""
+        if not self.sprite_lists:
+            return # already recycled, or never was in the game
+        self.remove_from_sprite_lists()
+        self.context.pools.setdefault(type(self), []).append(self)
+
+
+class Animation():
+    """Frame lookup for a looping animation, see AnimatedSprite for the meaning of transition 
+    times and indices. Use Animation.compile() so that all sprites (usually all instances of 
+    a class) with the same transitions share a single Animation."""
+    compiled = {}
+
+    @classmethod
+    def compile(cls, transition_times: list, transition_indxs: list):
+        key = (tuple(transition_times), tuple(transition_indxs))
+        if key not in cls.compiled:
+            cls.compiled[key] = cls(transition_times, transition_indxs)
+        return cls.compiled[key]
+
+    def __init__(self, transition_times: list, transition_indxs: list):
+        self.transition_times = list(transition_times)
+        self.transition_indxs = list(transition_indxs)
+        self.period = self.transition_times[-1] # return-to-zero time
+
+    def frame_at(self, animation_time: float) -> int:
+        """Index of the texture to show animation_time seconds after the animation started"""
+        if animation_time >= self.period:
+            animation_time %= self.period
+        # we are past the last transition whose time is <= animation_time
+        return self.transition_indxs[bisect_right(self.transition_times, animation_time) - 1]
+
+
+class AnimationClock():
+    """Time of one layer of animated sprites (enemies, buildings, effects). The game advances 
+    each layer's clock once per frame, and sprites read their animation time from it instead 
+    of accumulating it one by one."""
+    def __init__(self):
+        self.time = 0.0
+
+    def tick(self, delta_time: float):
+        self.time += delta_time
+
+
+class GameContext():
+    """What the sprites of one game share : a random stream per subsystem, so that drawing more
+    numbers in one of them (e.g. building enemies ahead of time) doesn't change what happens in
+    the others, the animation clock of each layer and the pools of recycled sprites. The
+    Simulation owns it, and hands it to what it builds, so that several games can run side by
+    side in the same process."""
+    def __init__(self, seed: int):
+        self.wave_rng = Random(str(seed) + ':wave') # freeplay wave generation
+        self.spawn_rng = Random(str(seed) + ':spawn') # spawn timing and location
+        self.enemy_rng = Random(str(seed) + ':enemy') # enemy movement
+        self.tower_rng = Random(str(seed) + ':tower') # tower effect procs
+        self.particle_rng = Random(str(seed) + ':particle') # Greek Fire flames
+        self.effect_rng = Random(str(seed) + ':effect') # effect and explosion looks
+        self.enemy_clock = AnimationClock()
+        self.building_clock = AnimationClock() # towers, miniature runes and the map
+        self.effect_clock = AnimationClock() # explosions and animated projectiles
+        self.pools = {} # recycled sprites, per class, waiting for Pooled.make() to reissue them
+
+
+class Animated():
+    """Mixin for sprites whose texture follows an Animation, timed by an AnimationClock"""
+    def start_animation(self, animation: Animation, clock: AnimationClock):
+        self.animation = animation
+        self.clock = clock
+        self.animation_start = clock.time
+        self.frame_indx = 0
+
+    @property
+    def animation_time(self) -> float:
+        return self.clock.time - self.animation_start
+
+    @animation_time.setter
+    def animation_time(self, new_time: float):
+        self.animation_start = self.clock.time - new_time
+
+    def update_frame(self):
+        new_frame_indx = self.animation.frame_at(self.animation_time)
+        if new_frame_indx != self.frame_indx:
+            self.set_texture(new_frame_indx)
+            self.frame_indx = new_frame_indx
+
+
+class AnimatedSprite(Animated, Sprite):
     def __init__(self, texture_list: list, transition_times: list, transition_indxs: list, 
-                 scale: float = 1, center_x: float = 0, center_y: float = 0, angle: float = 0):
+                 clock: AnimationClock, scale: float = 1, center_x: float = 0, center_y: float = 0, 
+                 angle: float = 0):
         """Adds easier/cleaner animations to a Sprite. 
         New args : 
         - texture_list : list of arcade.Texture objects corresponding to the different textures 
@@ -33,6 +146,7 @@ class AnimatedSprite(Sprite):
                              First element must be 0, last element must be time of return-to-zero.
         - transition_indxs : list of ints, represents the number of the texture that should be 
                              used after the corresponding transition time.
+        - clock : AnimationClock of the layer the sprite belongs to
         """
 
         if len(transition_times) != len(transition_indxs):
@@ -48,27 +162,11 @@ class AnimatedSprite(Sprite):
         for tx in texture_list:
             self.append_texture(tx)
         self.set_texture(0)
-        self.frame_indx = 0
-
-        self.transition_times = transition_times
-        self.transition_indxs = transition_indxs
-        self.animation_time = 0
+        self.start_animation(Animation.compile(transition_times, transition_indxs), clock)
 
     def on_update(self, delta_time: float = 1 / 60):
-        self.animation_time += delta_time
-        # animation time cannot exceed return-to-zero time
-        while self.animation_time  >= self.transition_times[-1]: 
-            self.animation_time  -= self.transition_times[-1]
-        # find the index of the texture we should be using from now on : 
-        for (k, transition_k_time) in enumerate(self.transition_times):
-            if self.animation_time < transition_k_time:
-                # we haven't passed transition k yet, but it's the next one 
-                new_frame_indx = self.transition_indxs[k-1]
-                break
-        # update the texture if needed
-        if new_frame_indx != self.frame_indx:
-            self.set_texture(new_frame_indx)
-            self.frame_indx = new_frame_indx
+        # the time itself comes from the clock, which the game already advanced for this frame
+        self.update_frame()
         return super().on_update(delta_time)
 
 class MutableSound(Sound):
@@ -1,10 +1,11 @@
 from enemies import Enemy, TinyBird, SmallShip, MediumDragon, BigDragon, TinyBoat, SmallSnake, MediumBoat, BigWhale
 from math import ceil, floor
-from random import random, randint
+from utils import GameContext
 
 class Wave():
-    def __init__(self, number: int, modifier: str, rank: int, type1: str, quant1: int, 
-                 type2: str, quant2: int, type3: str, quant3: int) -> None:
+    def __init__(self, context: GameContext, number: int, modifier: str, rank: int, type1: str, 
+                 quant1: int, type2: str, quant2: int, type3: str, quant3: int) -> None:
+        self.context = context # enemies are built with it
         self.number = int(number)
         rnk = int(rank)
         try:
@@ -28,32 +29,50 @@ class Wave():
         for k in range(q3):
             self.enemies_list.append((modifier, rnk, type3))
 
+        self.prepared_enemies = [] # built ahead of time by prepare(), handed out by spawn()
+
         self.quantities = [q1]
         if q2 > 0:
             self.quantities += [q2]
             if q3 > 0:
                 self.quantities += [q3]
         
+    def prepare(self, max_enemies: int = 1) -> bool:
+        """Builds up to max_enemies more of this wave's enemies ahead of time, so that spawning 
+        them is cheap. Returns True once all of them are ready."""
+        n = len(self.prepared_enemies)
+        for enemy_index in range(n, min(n+max_enemies, len(self.enemies_list))):
+            self.prepared_enemies.append(self.build(enemy_index))
+        return len(self.prepared_enemies) == len(self.enemies_list)
+
     def spawn(self, enemy_index: int) -> Enemy:
+        """Returns the enemy_index-th enemy of the wave, built ahead of time if possible"""
+        if enemy_index < len(self.prepared_enemies):
+            enemy = self.prepared_enemies[enemy_index]
+            self.prepared_enemies[enemy_index] = None # handed out, do not keep it alive
+            return enemy
+        return self.build(enemy_index)
+
+    def build(self, enemy_index: int) -> Enemy:
         enemy_type_name = self.enemies_list[enemy_index][2]
         if 'flying' in enemy_type_name:
             if 'tiny' in enemy_type_name:
-                enemy = TinyBird()
+                enemy = TinyBird(self.context)
             elif 'small' in enemy_type_name:
-                enemy = SmallShip()
+                enemy = SmallShip(self.context)
             elif 'medium' in enemy_type_name:
-                enemy = MediumDragon()
+                enemy = MediumDragon(self.context)
             elif 'big' in enemy_type_name:
-                enemy = BigDragon()
+                enemy = BigDragon(self.context)
         else:
             if 'tiny' in enemy_type_name:
-                enemy = TinyBoat()
+                enemy = TinyBoat(self.context)
             elif 'small' in enemy_type_name:
-                enemy = SmallSnake()
+                enemy = SmallSnake(self.context)
             elif 'medium' in enemy_type_name:
-                enemy = MediumBoat()
+                enemy = MediumBoat(self.context)
             elif 'big' in enemy_type_name:
-                enemy = BigWhale()
+                enemy = BigWhale(self.context)
         enemy.set_rank(self.enemies_list[enemy_index][1])
         enemy.set_modifier(self.enemies_list[enemy_index][0])
         return enemy
@@ -118,7 +137,9 @@ class Wave():
 # maybe this is the right time to learn buffers, also ??
 
 class WaveMaker():
-    def __init__(self) -> None:
+    def __init__(self, context: GameContext) -> None:
+        self.context = context
+        self.rng = context.wave_rng
         self.flying_wave_prob = 0.0
         self.modifier_prob = 0.0
         self.flying_wave_num = 0 # Careful, wave numbers can sometimes repeat and/or be skipped
@@ -135,7 +156,7 @@ class WaveMaker():
         self.wave_number += 1
 
         # 1. pick flying or swimming type
-        if random() < self.flying_wave_prob:
+        if self.rng.random() < self.flying_wave_prob:
             self.is_flying_wave = True
             self.flying_wave_prob -= 0.1
         else:
@@ -161,8 +182,8 @@ class WaveMaker():
         num_enemies = floor(budget/enemy_cost)
 
         # 4. Add modifiers if needed
-        if num_enemies > 2 and random() < self.modifier_prob:
-            modifier = self.modifiers[randint(0,3)]
+        if num_enemies > 2 and self.rng.random() < self.modifier_prob:
+            modifier = self.modifiers[self.rng.randint(0,3)]
             budget /= self.modifier_cost_factor
             num_enemies = floor(budget/enemy_cost)
             self.modifier_prob = 0.0
@@ -171,7 +192,7 @@ class WaveMaker():
             self.modifier_prob += 0.05 * progress_through_rank
 
         # 5. Split into two groups of different-sized enemies, if needed
-        if num_enemies > 5 and enemy_size > 0 and randint(0, 1): # make some smaller guys as well
+        if num_enemies > 5 and enemy_size > 0 and self.rng.randint(0, 1): # make some smaller guys as well
             big_guys_size = enemy_size
             big_guys_cost = self.costs_per_size[big_guys_size]
             num_big_guys = floor(num_enemies / 2)
@@ -180,7 +201,7 @@ class WaveMaker():
             small_guys_cost = self.costs_per_size[small_guys_size]
             num_small_guys = floor(budget_for_smalls/small_guys_cost)
 
-        elif num_enemies > 13 and enemy_size < 3 and randint(0, 1): # make some bigger guys as well
+        elif num_enemies > 13 and enemy_size < 3 and self.rng.randint(0, 1): # make some bigger guys as well
             small_guys_size = enemy_size
             small_guys_cost = self.costs_per_size[small_guys_size]
             num_small_guys = ceil(num_enemies / 2)
@@ -196,6 +217,7 @@ class WaveMaker():
 
         # 6. Make this into a Wave
         wave = Wave(
+            self.context,
             number=self.wave_number,
             modifier=modifier,
             rank=current_rank,
@@ -208,8 +230,8 @@ class WaveMaker():
         )
 
         # 7. increment counters
-        self.swimming_wave_num += randint(0, 1)
-        self.flying_wave_num += randint(0, 1)
+        self.swimming_wave_num += self.rng.randint(0, 1)
+        self.flying_wave_num += self.rng.randint(0, 1)
         if self.is_flying_wave:
             self.flying_wave_num += 1
         else: